@@ -0,0 +1,181 @@
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+import numpy as np
+from config import Config
+from lagrangian import schedule_solution
+from matrix_model import solution_arrays
+from merit_order import ScheduleEvaluator
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AnnealingResult:
+    """Best schedule of the simulated annealing chains"""
+    objective: Optional[float]          # Objective of x (None when no chain found a feasible schedule)
+    x: Optional[np.ndarray]             # MatrixModel column values of the best schedule
+    schedule: Optional[dict]            # Retirement by plant and year, as calculate_retirement_schedule returns it
+    chains: int
+    iterations: int                     # Iterations of each chain
+    seconds: float
+    chain_objectives: List[Optional[float]] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        """Best objective and chain statistics as reported with the results."""
+        found = [v for v in self.chain_objectives if v is not None]
+        return {"Objective": self.objective, "Chains": self.chains, "Iterations": self.iterations,
+                "WorstChainObjective": min(found) if found else None, "Seconds": self.seconds}
+
+def _score(evaluator, kept):
+    """Objective of a schedule, or None and its shortfall when it is infeasible."""
+    x = schedule_solution(evaluator.problem, kept)
+    if x is None:
+        return None, evaluator.shortfall(kept)
+    return float(evaluator.matrix.objective @ x + evaluator.matrix.objective_constant), 0.0
+
+def _kept(retire_at, years):
+    return years[None, :] < retire_at[:, None]
+
+def _propose(rng, retire_at, last, movable, peers):
+    """
+    Neighbour of a schedule: one plant moves its retirement a few decision years (or anywhere, now and then), or
+    two plants of the same technology exchange their retirement years.
+    """
+    candidate = retire_at.copy()
+    g = movable[rng.integers(len(movable))]
+    if rng.random() < Config.ANNEALING_SWAP_SHARE and len(peers[g]) > 1:
+        h = peers[g][rng.integers(len(peers[g]))]
+        candidate[g], candidate[h] = min(retire_at[h], last[g]), min(retire_at[g], last[h])
+    elif rng.random() < Config.ANNEALING_JUMP_SHARE:
+        candidate[g] = rng.integers(last[g] + 1)
+    else:
+        step = rng.integers(1, Config.ANNEALING_MAX_STEP + 1) * (1 if rng.random() < 0.5 else -1)
+        candidate[g] = min(max(retire_at[g] + step, 0), last[g])
+    return candidate
+
+def _better(objective, shortfall, best_objective, best_shortfall):
+    """Feasible beats infeasible, then higher objective or lower shortfall."""
+    if objective is not None:
+        return best_objective is None or objective > best_objective
+    return best_objective is None and shortfall < best_shortfall
+
+def run_chain(evaluator: ScheduleEvaluator, retire_at, iterations, seed, time_limit=None):
+    """
+    One simulated annealing chain over the retirement year of each plant.
+
+    From an infeasible schedule, moves are accepted when they reduce the shortfall of the technology rows (see
+    ScheduleEvaluator.shortfall); once feasible, moves to infeasible schedules are rejected and worse objectives
+    are accepted with probability exp(delta / T). The temperature starts where a typical worsening move is
+    accepted half of the time and decreases geometrically to ANNEALING_FINAL_TEMPERATURE of that.
+
+    Parameters:
+    evaluator (ScheduleEvaluator): Evaluator of the scenario
+    retire_at (ndarray): Start schedule: decision year position in which each plant retires (its number of
+        alive years when it is kept until it expires)
+    iterations (int): Moves tried
+    seed (int): Seed of the random moves
+    time_limit (float): Stop after this many seconds
+
+    Returns:
+    tuple: Best objective (None when infeasible), its retirement positions and the number of accepted moves
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    problem = evaluator.problem
+    years = np.arange(problem.alive.shape[1])
+    last = problem.alive.sum(axis=1)
+    movable = np.flatnonzero(last > 0)
+    peers = {g: movable[problem.tech_of[movable] == problem.tech_of[g]] for g in movable}
+    current = np.minimum(np.asarray(retire_at), last)
+    objective, shortfall = _score(evaluator, _kept(current, years))
+    best, best_objective, best_shortfall = current, objective, shortfall
+
+    # Initial temperature from the objective changes of a few moves around the start
+    worse = []
+    for _ in range(Config.ANNEALING_PROBES if objective is not None else 0):
+        probe, _ = _score(evaluator, _kept(_propose(rng, current, last, movable, peers), years))
+        if probe is not None and probe < objective:
+            worse.append(objective - probe)
+    temperature = (np.mean(worse) if worse else max(abs(objective or 0.0), 1.0) * Config.TOLERANCE) / math.log(2)
+    cooling = Config.ANNEALING_FINAL_TEMPERATURE ** (1.0 / max(iterations, 1))
+
+    accepted = 0
+    for _ in range(iterations):
+        if time_limit is not None and time.perf_counter() - start > time_limit:
+            break
+        candidate = _propose(rng, current, last, movable, peers)
+        cand_objective, cand_shortfall = _score(evaluator, _kept(candidate, years))
+        if objective is None:
+            accept = cand_objective is not None or cand_shortfall <= shortfall
+        elif cand_objective is None:
+            accept = False
+        else:
+            delta = cand_objective - objective
+            accept = delta >= 0 or rng.random() < math.exp(delta / temperature)
+        if accept:
+            current, objective, shortfall = candidate, cand_objective, cand_shortfall
+            accepted += 1
+            if _better(objective, shortfall, best_objective, best_shortfall):
+                best, best_objective, best_shortfall = current, objective, shortfall
+        temperature *= cooling
+    return best_objective, best, accepted
+
+def solve_annealing(evaluator: ScheduleEvaluator, initial=None, chains=Config.ANNEALING_CHAINS, workers=None,
+                    iterations=Config.ANNEALING_ITERATIONS, time_limit=None, seed=Config.ANNEALING_SEED):
+    """
+    Search retirement schedules with independent simulated annealing chains in parallel worker processes.
+
+    Every chain starts from the same schedule with its own random moves (see run_chain); the best feasible
+    schedule of all chains is dispatched by the evaluator.
+
+    Parameters:
+    evaluator (ScheduleEvaluator): Evaluator of the scenario
+    initial (ndarray): Start schedule as MatrixModel column values (e.g. the Lagrangian schedule); plants are
+        kept until they expire when None
+    chains (int): Independent chains
+    workers (int): Worker processes (default: one per chain, up to the CPU count; 1 runs the chains in turn)
+    iterations (int): Moves tried by each chain
+    time_limit (float): Stop each chain after this many seconds
+    seed (int): Seed the chain seeds are drawn from
+
+    Returns:
+    AnnealingResult: Best schedule, its dispatch and the objective of every chain
+    """
+    start = time.perf_counter()
+    problem, matrix = evaluator.problem, evaluator.matrix
+    retire_at = problem.alive.sum(axis=1)
+    if initial is not None:
+        retire_col = np.where(matrix.retire_col >= 0, np.asarray(initial)[matrix.retire_col], 0.0)
+        retired = retire_col.max(axis=1) > 0.5
+        retire_at = np.where(retired, retire_col.argmax(axis=1), retire_at)
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(chains)]
+    workers = workers or min(chains, os.cpu_count() or 1)
+    logger.info(f"{matrix.scenario}_{matrix.price_scenario}: {chains} annealing chains of {iterations} moves on "
+                f"{workers} worker(s)")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_chain, evaluator, retire_at, iterations, s, time_limit) for s in seeds]
+            outcomes = [future.result() for future in futures]
+    else:
+        outcomes = [run_chain(evaluator, retire_at, iterations, s, time_limit) for s in seeds]
+
+    chain_objectives = [objective for objective, _, _ in outcomes]
+    found = [(objective, best) for objective, best, _ in outcomes if objective is not None]
+    result = AnnealingResult(None, None, None, chains, iterations, 0.0, chain_objectives)
+    if found:
+        objective, best = max(found, key=lambda pair: pair[0])
+        x = schedule_solution(problem, _kept(best, np.arange(problem.alive.shape[1])))
+        _, _, retire = solution_arrays(matrix, x)
+        result.objective, result.x = objective, x
+        result.schedule = {g: dict(zip(matrix.params.years, row)) for g, row in zip(matrix.params.plants,
+                                                                                     retire.tolist())}
+    result.seconds = time.perf_counter() - start
+    logger.info(f"{matrix.scenario}_{matrix.price_scenario}: best annealing schedule "
+                + (f"{result.objective:,.2f}" if result.x is not None else "infeasible")
+                + f" ({sum(v is not None for v in chain_objectives)}/{chains} chains feasible) "
+                  f"in {result.seconds:.1f} s")
+    return result
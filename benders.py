@@ -0,0 +1,353 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from config import Config
+from matrix_model import MatrixModel
+from lagrangian import lagrangian_problem, best_dispatch, allocate_energy, max_violation
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BendersResult:
+    """Bounds of a Benders solve and its best solution"""
+    upper_bound: float                  # Best master bound
+    lower_bound: Optional[float]        # Objective of x (None when the master found no solution)
+    x: Optional[np.ndarray]             # Column values of the best solution
+    iterations: int
+    cuts: int
+    seconds: float
+
+    @property
+    def gap(self) -> Optional[float]:
+        """Relative gap of x."""
+        if self.lower_bound is None:
+            return None
+        return (self.upper_bound - self.lower_bound) / max(abs(self.lower_bound), Config.TOLERANCE)
+
+    def summary(self) -> dict:
+        """Bounds and gap as reported with the results."""
+        return {"UpperBound": self.upper_bound, "LowerBound": self.lower_bound, "Gap": self.gap,
+                "Iterations": self.iterations, "Cuts": self.cuts, "Seconds": self.seconds}
+
+def dispatch_value(density, segment, lo_rate, hi_rate, cap):
+    """
+    Best dispatch of plant-years of given capacities and its value as a function of the capacity.
+
+    A plant-year of capacity C generates between lo_rate * C and hi_rate * C, filling its blocks in decreasing
+    density (see best_dispatch). Its value V(C) is concave, and the returned slope is a supergradient:
+    V(C') <= V(C) + slope * (C' - C) for every capacity C'.
+
+    Parameters:
+    density (ndarray): Value per MW-year of energy in each block (..., B)
+    segment (ndarray): MW-year of energy each block can take (..., B)
+    lo_rate, hi_rate (ndarray): MinPLF and MaxPLF of the plant-years, 0 when they do not operate (...)
+    cap (ndarray): Capacity of the plant-years, MW (...)
+
+    Returns:
+    tuple: Block energy (..., B), value (...) and slope per MW (...)
+    """
+    energy = best_dispatch(density, segment, lo_rate * cap, hi_rate * cap)
+    level = energy.sum(axis=-1)
+    value = (density * energy).sum(axis=-1)
+    order = np.argsort(-density, axis=-1, kind="stable")
+    sorted_density = np.take_along_axis(density, order, axis=-1)
+    ends = np.cumsum(np.take_along_axis(segment, order, axis=-1), axis=-1)
+    wanted = np.where(density > 0, segment, 0.0).sum(axis=-1)
+    tolerance = Config.TOLERANCE * np.maximum(1.0, ends[..., -1])
+
+    def marginal(at):
+        """Density of the block holding the energy just above at."""
+        inside = ends > at[..., None]
+        block = np.take_along_axis(sorted_density, inside.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+        return np.where(inside.any(axis=-1), block, 0.0)
+
+    # MaxPLF binds while blocks worth more are left, MinPLF binds when it forces energy nobody wants
+    upper = (level >= hi_rate * cap - tolerance) & (level < wanted - tolerance)
+    lower = (level <= lo_rate * cap + tolerance) & (level > wanted + tolerance)
+    slope = np.where(upper, hi_rate * marginal(level + tolerance),
+                     np.where(lower, lo_rate * marginal(level - tolerance), 0.0))
+    return energy, value, slope
+
+def goal_dispatch(density, segment, lo_rate, hi_rate, cap, total):
+    """
+    Dispatch of the plants of a TechGenGoal row for given capacities, and a cut of its value.
+
+    The value of the row is min over prices p of p * total + sum of the plant values at densities minus p (each
+    plant dispatches alone against the price, see dispatch_value). The plant values are piecewise linear in p with
+    breakpoints at the block densities, so the best price is found by bisection over them: the highest density at
+    which the plants generate at most total. At that price the bound is the value of the row, and the plant slopes
+    give a cut valid for every capacity.
+
+    Parameters:
+    density, segment (ndarray): Block densities and energy of the plants (N, B)
+    lo_rate, hi_rate, cap (ndarray): MinPLF, MaxPLF and capacity of the plants (N,)
+    total (float): Energy of the row, MW-year
+
+    Returns:
+    tuple: Block energy (N, B) (None when the capacities cannot meet total), value, price and plant slopes (N,)
+    """
+    most = np.minimum(hi_rate * cap, segment.sum(axis=1))
+    tolerance = Config.TOLERANCE * max(1.0, abs(total))
+    if (lo_rate * cap).sum() > total + tolerance or most.sum() < total - tolerance:
+        return None, None, None, None
+    prices = np.unique(density[segment > 0])[::-1]
+    level = lambda price: best_dispatch(density - price, segment, lo_rate * cap, hi_rate * cap).sum()
+    first, last = 0, len(prices) - 1
+    while first < last:
+        middle = (first + last + 1) // 2
+        if level(prices[middle]) <= total + tolerance:
+            first = middle
+        else:
+            last = middle - 1
+    price = prices[first] if len(prices) else 0.0
+    _, values, slopes = dispatch_value(density - price, segment, lo_rate, hi_rate, cap)
+    energy = allocate_energy(density, segment, lo_rate * cap, most, total)
+    return energy, price * total + values.sum(), price, slopes
+
+def feasibility_cut(segment, lo_rate, hi_rate, cap, total):
+    """
+    Cut (coefficients, lower, upper) on the capacities of a TechGenGoal row its capacities cap violate:
+    sum(hi_rate * C) >= total, counting plants whose blocks are full at cap by their block energy instead,
+    or sum(lo_rate * C) <= total.
+    """
+    if (lo_rate * cap).sum() > total:
+        return lo_rate, -np.inf, total
+    room = segment.sum(axis=1)
+    full = hi_rate * cap > room
+    return np.where(full, 0.0, hi_rate), total - room[full].sum(), np.inf
+
+class _Master:
+    """Master MIP over the Cap and Retire columns of a MatrixModel, with one dispatch value column (theta) per
+    operating plant-year bounded by the cuts."""
+
+    def __init__(self, matrix: MatrixModel, problem, mip_gap, tee):
+        try:
+            import highspy
+        except ImportError:
+            raise RuntimeError("Benders decomposition solves the master with HiGHS: install the highspy package")
+        self.highspy = highspy
+        is_gen = np.zeros(matrix.num_cols, dtype=bool)
+        is_gen[matrix.gen_col[matrix.gen_col >= 0]] = True
+        self.columns = np.flatnonzero(~is_gen)
+        position = np.full(matrix.num_cols, -1)
+        position[self.columns] = np.arange(len(self.columns))
+        self.cap = np.where(matrix.cap_col >= 0, position[matrix.cap_col], -1)
+        self.theta = np.full(problem.operating.shape, -1)
+        self.theta[problem.operating] = len(self.columns) + np.arange(problem.operating.sum())
+        num_cols = len(self.columns) + problem.operating.sum()
+
+        # Rows without Gen columns stay in the master, the others are the dispatch subproblems
+        row_of = np.repeat(np.arange(matrix.num_rows), np.diff(matrix.indptr))
+        kept = np.bincount(row_of, weights=is_gen[matrix.indices], minlength=matrix.num_rows) == 0
+        entries = kept[row_of]
+        counts = np.diff(matrix.indptr)[kept]
+
+        # Dispatch values are at most the value of every block worth generating
+        best = np.where(problem.density > 0, problem.density * problem.segment, 0.0).sum(axis=2)
+        lp = highspy.HighsLp()
+        lp.num_col_, lp.num_row_ = num_cols, int(kept.sum())
+        lp.col_cost_ = np.concatenate([matrix.objective[self.columns], np.ones(problem.operating.sum())])
+        lp.offset_ = matrix.objective_constant
+        lp.col_lower_ = np.concatenate([matrix.col_lower[self.columns], np.full(problem.operating.sum(), -np.inf)])
+        lp.col_upper_ = np.concatenate([matrix.col_upper[self.columns], best[problem.operating]])
+        lp.row_lower_, lp.row_upper_ = matrix.row_lower[kept], matrix.row_upper[kept]
+        lp.sense_ = highspy.ObjSense.kMaximize
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_, lp.a_matrix_.num_row_ = num_cols, int(kept.sum())
+        lp.a_matrix_.start_ = np.concatenate([[0], np.cumsum(counts)])
+        lp.a_matrix_.index_ = position[matrix.indices[entries]]
+        lp.a_matrix_.value_ = matrix.data[entries]
+        lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous
+                           for i in np.concatenate([matrix.integer[self.columns],
+                                                    np.zeros(problem.operating.sum(), dtype=bool)])]
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue("output_flag", bool(tee))
+        if mip_gap is not None:
+            self.highs.setOptionValue("mip_rel_gap", float(mip_gap))
+        self.highs.passModel(lp)
+        self.integer = np.flatnonzero(matrix.integer[self.columns])
+        self.relaxed = False
+        self.cuts = []
+
+    def relax(self, relaxed):
+        """Solve the LP relaxation of the master (relaxed True) or the MIP."""
+        kind = self.highspy.HighsVarType.kContinuous if relaxed else self.highspy.HighsVarType.kInteger
+        self.highs.changeColsIntegrality(len(self.integer), self.integer, np.array([kind] * len(self.integer)))
+        self.relaxed = relaxed
+
+    def start(self, values):
+        """Start the next MIP solve from a known solution (column values of the master)."""
+        solution = self.highspy.HighsSolution()
+        solution.col_value = list(values)
+        solution.value_valid = True
+        self.highs.setSolution(solution)
+
+    def add_cut(self, columns, coefficients, lower, upper):
+        self.cuts.append((np.asarray(columns), np.asarray(coefficients, dtype=float), lower, upper))
+
+    def flush(self):
+        """Add the collected cuts to the master; returns their number."""
+        if not self.cuts:
+            return 0
+        starts = np.cumsum([0] + [len(c) for c, _, _, _ in self.cuts[:-1]])
+        self.highs.addRows(len(self.cuts), np.array([lo for _, _, lo, _ in self.cuts]),
+                           np.array([up for _, _, _, up in self.cuts]), sum(len(c) for c, _, _, _ in self.cuts),
+                           starts, np.concatenate([c for c, _, _, _ in self.cuts]),
+                           np.concatenate([v for _, v, _, _ in self.cuts]))
+        added, self.cuts = len(self.cuts), []
+        return added
+
+    def solve(self, time_limit=None):
+        """Solve the master; returns (solution, bound), solution None when none was found."""
+        if time_limit is not None:
+            self.highs.setOptionValue("time_limit", max(float(time_limit), 0.0))
+        self.highs.run()
+        info = self.highs.getInfo()
+        if info.primal_solution_status != 2:
+            return None, None
+        bound = info.objective_function_value if self.relaxed else info.mip_dual_bound
+        return np.asarray(self.highs.getSolution().col_value), bound
+
+def solve_benders(matrix: MatrixModel, mip_gap=None, time_limit=None, iterations=Config.BENDERS_ITERATIONS,
+                  initial=None, tee=False):
+    """
+    Solve a MatrixModel by Benders decomposition between the retirement decisions and the dispatch.
+
+    The master MIP keeps the Cap and Retire columns and the rows without Gen columns, and values the dispatch of
+    each plant-year with a column bounded by cuts. With the capacities fixed, the dispatch separates into the
+    plant-years without a TechGenGoal row, valued in merit order (see dispatch_value), and one problem per
+    TechGenGoal row (see goal_dispatch); both are solved in closed form and return cuts that are added to the
+    master until its bound and the best solution are within mip_gap. The cuts of the LP relaxation of the master
+    are collected first; a known solution (initial) starts the MIP solves.
+
+    Parameters:
+    matrix (MatrixModel): Model built by build_matrix_model
+    mip_gap (float): Relative gap of the master solves and of the Benders bounds
+    time_limit (float): Time limit in seconds
+    iterations (int): Maximum number of master solves
+    initial (ndarray): Column values of a feasible solution (e.g. a Lagrangian schedule), or None
+    tee (bool): Show the master solver output
+
+    Returns:
+    BendersResult: Bounds and the best solution
+    """
+    start = time.perf_counter()
+    problem = lagrangian_problem(matrix)
+    params = matrix.params
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    gap = Config.TOLERANCE if mip_gap is None else mip_gap
+    operating = problem.operating
+    lo_rate = params.min_plf[:, None] * operating
+    hi_rate = params.max_plf[:, None] * operating
+    rows = [(r, k, matrix.plants_by_tech[problem.techs[k]]) for r, k in
+            zip(*np.nonzero(~np.isnan(problem.goal[:, :len(problem.techs)])))]
+    rows = [(r, k, ids[operating[ids, r]]) for r, k, ids in rows]
+    master = _Master(matrix, problem, mip_gap, tee)
+
+    def evaluate(cap, theta=None):
+        """Dispatch of the capacities; adds the cuts theta violates (all cuts without theta). Returns the
+        dispatch value and block energy, value None when a TechGenGoal row cannot be met."""
+        energy, values, slopes = dispatch_value(problem.density, problem.segment, lo_rate, hi_rate, cap)
+        violated = operating if theta is None else operating & (
+            theta > values + Config.TOLERANCE * np.maximum(1.0, np.abs(values)))
+        for g, r in zip(*np.nonzero(violated)):
+            master.add_cut([master.theta[g, r], master.cap[g, r]], [1.0, -slopes[g, r]],
+                           -np.inf, values[g, r] - slopes[g, r] * cap[g, r])
+        total, feasible = values.sum(), True
+        for r, k, ids in rows:
+            target = problem.goal[r, k] / twh_per_mw
+            args = (problem.density[ids, r], problem.segment[ids, r], lo_rate[ids, r], hi_rate[ids, r], cap[ids, r])
+            fill, value, _, row_slopes = goal_dispatch(*args, target)
+            if fill is None:
+                coefficients, lower, upper = feasibility_cut(*args[1:], target)
+                master.add_cut(master.cap[ids, r], coefficients, lower, upper)
+                feasible = False
+                continue
+            total += value - values[ids, r].sum()
+            energy[ids, r] = fill
+            if theta is None or theta[ids, r].sum() > value + Config.TOLERANCE * max(1.0, abs(value)):
+                master.add_cut(np.concatenate([master.theta[ids, r], master.cap[ids, r]]),
+                               np.concatenate([np.ones(len(ids)), -row_slopes]), -np.inf,
+                               value - (row_slopes * cap[ids, r]).sum())
+        return (total if feasible else None), energy
+
+    upper_bound, lower_bound, best_x, best_start = np.inf, None, None, None
+
+    def record(values, dispatch, energy):
+        """Keep the master solution values (with its dispatch) when it is the best solution so far."""
+        nonlocal lower_bound, best_x, best_start
+        columns = np.where(matrix.integer[master.columns], np.round(values[:len(master.columns)]),
+                           values[:len(master.columns)])
+        objective = float(matrix.objective[master.columns] @ columns + matrix.objective_constant + dispatch)
+        if lower_bound is not None and objective <= lower_bound:
+            return
+        lower_bound = objective
+        best_x = np.zeros(matrix.num_cols)
+        best_x[master.columns] = columns
+        gen = np.divide(energy, problem.dur, out=np.zeros_like(energy), where=problem.dur > 0)
+        best_x[matrix.gen_col[operating]] = gen[operating]
+        # With its dispatch values the solution satisfies every cut: the next master solve starts from it
+        best_start = np.concatenate([columns, (problem.density * energy).sum(axis=2)[operating]])
+
+    # Cuts at the capacities of keeping every plant, of retiring them all and of the initial solution
+    full = np.where(problem.alive, problem.capacity[:, None], 0.0)
+    evaluate(full)
+    evaluate(np.zeros_like(full))
+    if initial is not None:
+        dispatch, energy = evaluate(np.where(matrix.cap_col >= 0, initial[matrix.cap_col], 0.0))
+        if dispatch is not None:
+            record(np.asarray(initial)[master.columns], dispatch, energy)
+    cuts = master.flush()
+    remaining = lambda: None if time_limit is None else time_limit - (time.perf_counter() - start)
+
+    # Cut loop on the LP relaxation of the master: its cuts are cheap and spare MIP solves
+    master.relax(True)
+    for _ in range(Config.BENDERS_LP_ITERATIONS):
+        solution, bound = master.solve(remaining())
+        if solution is None:
+            break
+        upper_bound = min(upper_bound, bound)
+        evaluate(np.where(master.cap >= 0, solution[master.cap], 0.0),
+                 np.where(master.theta >= 0, solution[master.theta], 0.0))
+        added = master.flush()
+        cuts += added
+        if not added:
+            break
+    master.relax(False)
+
+    iteration = 0
+    for iteration in range(1, iterations + 1):
+        if time_limit is not None and remaining() <= 0:
+            break
+        if best_start is not None:
+            master.start(best_start)
+        solution, bound = master.solve(remaining())
+        if solution is None:
+            logger.warning(f"{matrix.scenario}_{matrix.price_scenario}: Benders master found no solution "
+                           f"(status {master.highs.modelStatusToString(master.highs.getModelStatus())})")
+            break
+        upper_bound = min(upper_bound, bound)
+        dispatch, energy = evaluate(np.where(master.cap >= 0, solution[master.cap], 0.0),
+                                    np.where(master.theta >= 0, solution[master.theta], 0.0))
+        if dispatch is not None:
+            record(solution, dispatch, energy)
+        added = master.flush()
+        cuts += added
+        logger.info(f"Benders iteration {iteration}: bound {upper_bound:,.4f}, best "
+                    f"{'-' if lower_bound is None else f'{lower_bound:,.4f}'}, {added} cuts")
+        if lower_bound is not None and (not added or
+                                        upper_bound - lower_bound <= gap * max(abs(lower_bound), Config.TOLERANCE)):
+            break
+
+    result = BendersResult(upper_bound, lower_bound, best_x, iteration, cuts, time.perf_counter() - start)
+    if best_x is not None:
+        violation = max_violation(matrix, best_x)
+        if violation > Config.LAGRANGIAN_FEASIBILITY_TOL:
+            logger.warning(f"{matrix.scenario}_{matrix.price_scenario}: Benders solution violates a row by "
+                           f"{violation:.2e}")
+    logger.info(f"{matrix.scenario}_{matrix.price_scenario}: Benders bound {upper_bound:,.2f}, best solution "
+                f"{'-' if lower_bound is None else f'{lower_bound:,.2f}'} after {iteration} master solves and "
+                f"{cuts} cuts in {result.seconds:.1f} s")
+    return result
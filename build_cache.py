@@ -0,0 +1,126 @@
+import dataclasses
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyomo.version
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Modules whose code determines the generated artifacts: editing one of them invalidates the cache
+_BUILDER_MODULES = ("model.py", "model_parameters.py", "matrix_model.py", "presolve.py", "scaling.py", "config.py",
+                    "energy_data_processor.py")
+# ModelData fields derived from the others by energy_data_processor (covered by its code, not hashed themselves)
+_DERIVED_FIELDS = ("plant_table", "tech_availability")
+
+def _update_with(hasher, obj):
+    """Feed one value into the fingerprint; DataFrames are hashed by content, labels and dtypes."""
+    if isinstance(obj, pd.DataFrame):
+        hasher.update(repr((list(obj.columns), [str(d) for d in obj.dtypes], list(obj.index))).encode())
+        hasher.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    else:
+        hasher.update(repr(obj).encode())
+
+def fingerprint(model_data, scenario, price_scenario, options=None, artifact="matrix"):
+    """
+    Cache key of a generated model artifact.
+
+    The key covers the model data (not the derived plant table and availability), the scenario, the price
+    scenario, the build options, every Config constant, the code of the model builder modules (including the
+    data processing that derives the plant table and availability) and the Pyomo version, so any change that can
+    alter the artifact gives a new key.
+
+    Parameters:
+    model_data (ModelData): Model data the artifact is generated from
+    scenario (str): Scenario of the model
+    price_scenario (str): Price scenario of the model
+    options (dict): Build options and anything else that changes the artifact
+    artifact (str): Kind of artifact (e.g. "matrix", "mps", "lp")
+
+    Returns:
+    str: Hex digest
+    """
+    hasher = hashlib.sha256()
+    for field in dataclasses.fields(model_data):
+        if field.name not in _DERIVED_FIELDS:
+            hasher.update(field.name.encode())
+            _update_with(hasher, getattr(model_data, field.name))
+    _update_with(hasher, (scenario, price_scenario, artifact, sorted((options or {}).items())))
+    _update_with(hasher, sorted((k, v) for k, v in vars(Config).items() if k.isupper()))
+    for module in _BUILDER_MODULES:
+        path = Path(__file__).parent / module
+        if path.exists():
+            hasher.update(path.read_bytes())
+    hasher.update(pyomo.version.version.encode())
+    return hasher.hexdigest()
+
+class BuildCache:
+    """On-disk cache of generated model artifacts, evicting the least recently used ones above a size limit"""
+
+    def __init__(self, directory=Config.BUILD_CACHE_DIR, max_mb=Config.BUILD_CACHE_MAX_MB):
+        self.directory = Path(directory)
+        self.max_bytes = max_mb * 1e6
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return self.directory / f"{key}{suffix}"
+
+    def load(self, key):
+        """Cached object of a key, or None on a miss (unreadable entries are removed)."""
+        path = self._path(key, ".pkl")
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                artifact = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable build cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # most recently used
+        return artifact
+
+    def store(self, key, artifact):
+        """Pickle an object under a key."""
+        self._write(self._path(key, ".pkl"), lambda f: pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def fetch_file(self, key, suffix, target):
+        """Copy a cached file to target; returns False on a miss."""
+        path = self._path(key, suffix)
+        if not path.exists():
+            return False
+        shutil.copyfile(path, target)
+        os.utime(path)
+        return True
+
+    def store_file(self, key, suffix, source):
+        """Cache a copy of a generated file under a key."""
+        self._write(self._path(key, suffix), lambda f: f.write(Path(source).read_bytes()))
+
+    def _write(self, path, write):
+        # Write to a temporary file first so concurrent runs never read a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in its size limit."""
+        entries = sorted((p for p in self.directory.iterdir() if p.suffix != ".tmp"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            logger.info(f"Evicted {path.name} from the build cache")
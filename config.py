@@ -158,6 +158,7 @@ class Config:
     HOURS_PER_DAY = 24.0  # Hours in a day
     HOURS_PER_YEAR = 8760.0  # Hours in a year (365 * 24)
     DAYS_PER_YEAR = 365.0  # Days in a year
+    ANNUAL_DISPATCH_BLOCK = "Annual"  # Single dispatch block used when every time block has the same price
     
     # Conversion factors
     MW_TO_GW = 1000.0  # Convert MW to GW
@@ -165,6 +166,12 @@ class Config:
     USD_TO_THOUSANDS = 1000.0  # Convert USD to thousands
     USD_TO_MILLIONS = 1e6  # Convert USD to millions
     TWH_TO_MWH = 1e6  # Convert TWh to MWh
+
+    # Unit systems for the scaled solver model: units per TWh, per $m and per MW (the units of the model rows)
+    SCALE_ENERGY_UNITS = {'MWh': 1e6, 'GWh': 1e3, 'TWh': 1.0}
+    SCALE_MONEY_UNITS = {'USD': 1e6, 'kUSD': 1e3, 'mUSD': 1.0}
+    SCALE_CAPACITY_UNITS = {'kW': 1e3, 'MW': 1.0, 'GW': 1e-3}
+    DEFAULT_SCALE_UNITS = ('TWh', 'mUSD', 'GW')  # Energy, money, capacity
     
     # ============================================================================
     # NEW: Load Factor Constants (moved from hardcoded values)
@@ -202,6 +209,8 @@ class Config:
     # ============================================================================
     
     MAX_RETIREMENTS_PER_PLANT = 1  # Maximum number of retirements per plant
+    CLUSTER_CAPACITY_TOLERANCE = 0.0  # Relative capacity difference allowed within a plant cluster
+    CLUSTER_COST_TOLERANCE = 0.0  # Relative variable cost difference allowed within a plant cluster
     FIXED_CAPACITY_EXPIRED = 0.0  # Fixed capacity for expired plants
     
     # ============================================================================
@@ -218,6 +227,42 @@ class Config:
     DEFAULT_OUTPUT_FILE = "Results.xlsx"
     LP_FILE_TEMPLATE = "{scenario}_{price_scenario}.lp"
     SCENARIO_OUTPUT_TEMPLATE = "{key}_results.xlsx"
+
+    # Build cache of generated model artifacts (see build_cache.py)
+    BUILD_CACHE_DIR = ".ffrm_build_cache"
+    BUILD_CACHE_MAX_MB = 500  # Least recently used artifacts are evicted above this size
+    BUILD_PROFILE_FILE = "build_profile.json"  # Component and stage timings written by --profile-build
+
+    # Lagrangian relaxation of the technology rows (see lagrangian.py)
+    LAGRANGIAN_ITERATIONS = 500  # Maximum subgradient iterations
+    LAGRANGIAN_GAP = 1e-3  # Stop when the relative gap between the dual bound and the best schedule is below this
+    LAGRANGIAN_STEP = 2.0  # Initial Polyak step factor, halved when the bound stalls
+    LAGRANGIAN_STALL = 10  # Iterations without a better bound before the step factor is halved
+    LAGRANGIAN_REPAIR_EVERY = 10  # Iterations between repairs of the relaxed schedule into a feasible one
+    LAGRANGIAN_REPAIR_PASSES = 5  # Passes over the technology-years when repairing a schedule
+    LAGRANGIAN_FEASIBILITY_TOL = 1e-6  # Largest relative row violation of a repaired solution
+
+    # Benders decomposition between retirements and dispatch (see benders.py)
+    BENDERS_ITERATIONS = 200  # Maximum master solves
+    BENDERS_LP_ITERATIONS = 100  # Maximum solves of the master LP relaxation before the MIP solves
+
+    # Rolling-horizon solve (see rolling_horizon.py)
+    ROLLING_WINDOW = 10  # Years solved together
+    ROLLING_COMMIT = 5  # Years of each window whose retirements are kept before the next window
+
+    # LP-relaxation screening (see screening.py)
+    RELAX_ROUND_THRESHOLD = 0.9  # Cumulative fraction of a unit retired by the relaxation from which it is retired
+    RELAX_REPAIR_PASSES = 5  # Passes over the technology-years when repairing the rounded schedule
+
+    # Simulated annealing over retirement years (see annealing.py)
+    ANNEALING_CHAINS = 4  # Independent chains, run in parallel worker processes
+    ANNEALING_ITERATIONS = 2000  # Moves tried by each chain
+    ANNEALING_SEED = 2025  # Seed the chain seeds are drawn from
+    ANNEALING_SWAP_SHARE = 0.2  # Share of moves exchanging the retirement years of two plants of a technology
+    ANNEALING_JUMP_SHARE = 0.1  # Share of the other moves retiring a plant in any year rather than a few years away
+    ANNEALING_MAX_STEP = 3  # Decision years a plant retirement moves by at most
+    ANNEALING_PROBES = 20  # Moves sampled around the start schedule to set the initial temperature
+    ANNEALING_FINAL_TEMPERATURE = 1e-3  # Final temperature relative to the initial one
     
     # ============================================================================
     # NEW: Solver Configuration (moved from hardcoded values)
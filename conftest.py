@@ -0,0 +1,22 @@
+"""
+Shared fixtures of the model tests: the example input data and the build options of its representative-year runs.
+"""
+
+import contextlib
+import io
+import pytest
+from config import Config
+from energy_data_processor import load_excel_data, initialize_model_data
+from model_parameters import representative_years
+
+@pytest.fixture(scope="session")
+def model_data():
+    """Model data of the example input file."""
+    with contextlib.redirect_stdout(io.StringIO()):  # the loader prints every table it reads
+        return initialize_model_data(load_excel_data(Config.INPUT_FILE))
+
+@pytest.fixture(scope="session")
+def representative(model_data):
+    """Build options of every year to 2035, then one representative year every 5 years."""
+    last_year = min(max(model_data.years), Config.DEFAULT_END_YEAR)
+    return {"representative_years": representative_years(min(model_data.years), last_year, 2035, 5)}
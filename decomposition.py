@@ -0,0 +1,168 @@
+import dataclasses
+import logging
+import os
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from pyomo.environ import Constraint, Objective, Var
+from pyomo.core.expr.visitor import identify_variables
+from energy_data_processor import build_tech_availability
+from model_parameters import plant_table_of
+from model import build_model, initialize_solver, solver_succeeded
+from presolve import run_presolve
+from result_processor import objective_value
+from scaling import scale_model, unscale_model
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DecompositionOptions:
+    """How the per-technology sub-models are solved"""
+    solver_args: Namespace         # Command line arguments the workers configure their solver from
+    workers: Optional[int] = None  # Worker processes (default: one per technology, up to the CPU count)
+
+def technology_data(model_data, tech):
+    """
+    Model data restricted to the plants of one technology.
+
+    Parameters:
+    model_data (ModelData): Model data of the whole fleet
+    tech (str): Technology kept
+
+    Returns:
+    ModelData: The same data with only the plants of tech (technologies and targets are unchanged)
+    """
+    table = plant_table_of(model_data)
+    sub_table = table.subset(np.flatnonzero(table.technology == tech))
+    names = sub_table.names
+    fc_ppa = model_data.fc_ppa
+    if fc_ppa is not None and not fc_ppa.empty:
+        fc_ppa = fc_ppa[fc_ppa.index.isin(names)]
+    clusters = None
+    if model_data.clusters is not None:
+        clusters = {name: model_data.clusters[name] for name in names}
+    return dataclasses.replace(
+        model_data,
+        plants=names,
+        gen_data=model_data.gen_data.loc[names],
+        fc_ppa=fc_ppa,
+        plant_table=sub_table,
+        tech_availability=build_tech_availability(sub_table, model_data.tech_params, model_data.years),
+        clusters=clusters,
+    )
+
+def _plant_of(var, plants):
+    """Plant a variable belongs to (first index in the plant set), or None."""
+    index = var.index()
+    g = index[0] if isinstance(index, tuple) else index
+    return g if g in plants else None
+
+def coupling_rows(model, plant_tech):
+    """
+    Active rows that link the variables of more than one technology or variables of no plant, and the objective
+    when it is not a linear sum of plant variables.
+
+    The model separates into one independent model per technology exactly when this list is empty.
+
+    Parameters:
+    model (ConcreteModel): Built model
+    plant_tech (dict): Technology of every plant
+
+    Returns:
+    list: Names of the coupling components (the constraint name once, however many of its rows couple)
+    """
+    coupling = []
+    for component in model.component_objects(Constraint, active=True):
+        for row in component.values():
+            techs = {plant_tech.get(_plant_of(var, plant_tech)) for var in identify_variables(row.body)}
+            if len(techs) > 1 or None in techs:
+                coupling.append(component.local_name)
+                break
+    for component in model.component_objects(Objective, active=True):
+        for objective in component.values():
+            if not objective.active:
+                continue
+            plants = [_plant_of(var, plant_tech) for var in identify_variables(objective.expr)]
+            if objective.expr.polynomial_degree() not in (0, 1) or None in plants:
+                coupling.append(component.local_name)
+    return coupling
+
+def _solve_technology(model_data, tech, scenario, price_scenario, solver_args, build_options, presolve, scale_units,
+                      solver_tee=False):
+    """
+    Worker: build and solve the sub-model of one technology.
+
+    Returns:
+    tuple: Technology, variable values by component name and index (None when the solve failed), objective
+        value or termination condition
+    """
+    model = build_model(technology_data(model_data, tech), scenario, price_scenario, **build_options)
+    solver = initialize_solver(solver_args)
+    if presolve:
+        run_presolve(model, presolve, solver)
+    if scale_units:
+        scale_model(model, scale_units)
+    result = solver.solve(model, tee=solver_tee)
+    unscale_model(model)
+    if not solver_succeeded(result):
+        return tech, None, str(result.solver.termination_condition)
+    values = {var.local_name: {index: data.value for index, data in var.items()}
+              for var in model.component_objects(Var) if var.is_indexed()}
+    return tech, values, objective_value(model)
+
+def solve_by_technology(model, model_data, scenario, price_scenario, options, build_options=None, presolve=None,
+                        scale_units=None, solver_tee=False):
+    """
+    Solve a model as one independent sub-model per technology, in parallel worker processes.
+
+    Plants interact only through the technology rows (TechGenGoal, MinCapacityTech, ...) and the objective is a
+    sum over plants, so the model separates exactly by technology. This is checked on the built model: if any row
+    links technologies, nothing is solved and False is returned so the caller solves the whole model. Otherwise
+    every worker builds and solves the model of one technology and the values of the plant variables are loaded
+    into model. Each sub-model is solved to the MIP gap of the solver options; the merged solution is within the
+    sum of the absolute gaps of the sub-models of the optimum. The sub-objectives can have mixed signs, so the
+    relative gap of the sum can exceed the MIP gap.
+
+    Parameters:
+    model (ConcreteModel): Built model (with any presolve applied, not scaled), receives the solution
+    model_data (ModelData): Model data the model was built from
+    scenario (str): Scenario of the model
+    price_scenario (str): Price scenario of the model
+    options (DecompositionOptions): Solver arguments and number of worker processes
+    build_options (dict): Keyword options for build_model
+    presolve (list): Presolve steps applied to each sub-model
+    scale_units (UnitSystem): Units of the sub-models sent to the solver (unscaled when None)
+    solver_tee (bool): Show the solver output of every sub-model
+
+    Returns:
+    bool: True when the model was decomposed and solved, False when it does not separate by technology
+    """
+    table = plant_table_of(model_data)
+    plant_tech = dict(zip(table.names, table.technology))
+    coupling = coupling_rows(model, plant_tech)
+    if coupling:
+        logger.warning(f"{scenario}_{price_scenario}: {', '.join(coupling)} link technologies; "
+                       f"solving the model without decomposition")
+        return False
+    techs = list(dict.fromkeys(table.technology))
+    workers = options.workers or min(len(techs), os.cpu_count() or 1)
+    logger.info(f"{scenario}_{price_scenario}: solving {len(techs)} technologies in {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_solve_technology, model_data, tech, scenario, price_scenario,
+                                   options.solver_args, build_options or {}, presolve or [], scale_units,
+                                   solver_tee)
+                   for tech in techs]
+        solutions = [future.result() for future in futures]
+    failed = [f"{tech} ({status})" for tech, values, status in solutions if values is None]
+    if failed:
+        raise RuntimeError(f"Solver failed for scenario {scenario}_{price_scenario} in technologies "
+                           f"{', '.join(failed)}")
+    for tech, values, objective in solutions:
+        for name, component_values in values.items():
+            component = getattr(model, name)
+            for index, value in component_values.items():
+                component[index].set_value(value, skip_validation=True)
+        logger.info(f"{scenario}_{price_scenario}: {tech} objective {objective:,.2f}")
+    return True
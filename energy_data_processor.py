@@ -1,9 +1,10 @@
+import numpy as np
 import pandas as pd
 import logging
 from pathlib import Path
 from config import Config
-from typing import Dict, List
-from dataclasses import dataclass
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field, fields
 # from pyomo.environ import *
 
 # Configure logging
@@ -26,6 +27,82 @@ def setup_logging(output_dir=None):
 setup_logging()
 logger = logging.getLogger(__name__)
 
+@dataclass
+class PlantTable:
+    """Columnar, array-backed plant data indexed by integer plant id (position in gen_data)"""
+    names: List[str]              # g: Plant identifiers, names[i] is plant id i
+    technologies: List[str]       # tech: Technology list tech_code indexes into
+    technology: np.ndarray        # Technology string of each plant
+    tech_code: np.ndarray         # Position of the plant's technology in technologies (-1 if unknown)
+    capacity: np.ndarray          # CAPACITY (MW)
+    start_year: np.ndarray        # STARTYEAR
+    cost: Optional[np.ndarray]    # COST ($/MWh), None if the column is missing
+    market_price: Optional[np.ndarray]   # MarketPrice ($/MWh), None if the column is missing
+    avg_ppa_price: Optional[np.ndarray]  # AvgPPAPrice ($/MWh), None if the column is missing
+    contract_price: np.ndarray    # ContractPriceMW (0 when not provided)
+    units: Optional[np.ndarray] = None  # UNITS per row (clustered plants), None means one unit each
+    index: Dict[str, int] = field(init=False, repr=False)  # Plant name -> plant id
+
+    def __post_init__(self):
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if self.units is None:
+            self.units = np.ones(len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return np.arange(len(self.names))
+
+    @property
+    def total_capacity(self) -> np.ndarray:
+        """Nameplate capacity of each row: unit capacity times number of units."""
+        return self.capacity * self.units
+
+    def plants_of(self, tech: str) -> np.ndarray:
+        """Plant ids of one technology."""
+        if tech not in self.technologies:
+            return np.array([], dtype=int)
+        return np.flatnonzero(self.tech_code == self.technologies.index(tech))
+
+    def subset(self, ids: np.ndarray) -> "PlantTable":
+        """Table of the given plant ids, in that order (technologies are kept)."""
+        columns = {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+        columns = {name: v[ids] if isinstance(v, np.ndarray) else v for name, v in columns.items()}
+        columns['names'] = [self.names[i] for i in ids]
+        return PlantTable(**columns)
+
+    def revenue(self, price_scenario: str) -> np.ndarray:
+        """Revenue per MWh of each plant under a price scenario."""
+        if price_scenario == "MarketPrice":
+            values = self.market_price
+        elif price_scenario == "AvgPPAPrice":
+            values = self.avg_ppa_price
+        else:
+            raise NameError(f"Invalid price scenario: {price_scenario}")
+        if values is None:
+            raise ValueError(f"No {price_scenario} column found in plant data")
+        return values
+
+@dataclass
+class TechAvailability:
+    """Capacity available per technology and year (plants started and within MaxLife)"""
+    technologies: List[str]       # tech: Row order of capacity
+    years: List[int]              # y: Column order of capacity
+    capacity: np.ndarray          # Available MW (technologies x years)
+
+    def __post_init__(self):
+        self._tech_pos = {tech: k for k, tech in enumerate(self.technologies)}
+        self._year_pos = {y: i for i, y in enumerate(self.years)}
+
+    def available_mw(self, tech: str, year: int) -> float:
+        """MW of tech plants with start year <= year and age <= MaxLife in that year."""
+        available = float(self.capacity[self._tech_pos[tech], self._year_pos[year]])
+        if np.isnan(available):
+            raise ValueError(f"No MaxLife parameter found for technology {tech}")
+        return available
+
 @dataclass
 class ModelData:
     """Class to hold all model data structures"""
@@ -45,6 +122,9 @@ class ModelData:
     other: pd.DataFrame          # Other(*,*) Other parameters (now technology-specific)
     fc_ppa: pd.DataFrame         # FC_PPA(g,y) Mandatory capacity payment
     tech_params: pd.DataFrame    # Technology-specific parameters
+    plant_table: Optional[PlantTable] = None  # Array-backed view of gen_data used by the model
+    tech_availability: Optional[TechAvailability] = None  # Available MW per technology and year
+    clusters: Optional[Dict[str, List[str]]] = None  # Cluster name -> unit names (set by cluster_plants)
 
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """Clean dataframe by removing nonsense indices and handling duplicates."""
@@ -252,6 +332,8 @@ def normalize_plant_data(plant_df: pd.DataFrame) -> pd.DataFrame:
         'Start Year': 'STARTYEAR',
         'Plant Type': 'TECHNOLOGY',
         'Price Regime': 'PriceRegime',
+        'VARIABLE COST': 'COST',
+        'Contract Price (MW)': 'ContractPriceMW',
         'ContractPriceMW': 'ContractPriceMW',
     }
     for src, dst in rename_map.items():
@@ -260,7 +342,7 @@ def normalize_plant_data(plant_df: pd.DataFrame) -> pd.DataFrame:
     # Drop rows with empty index (no plant name)
     df = df[~df.index.isna()].copy()
     # Coerce numeric columns
-    for col in ['COST', 'FIXED_COST', 'PPAPrice', 'AvgPPAPrice', 'MarketPrice', 'CAPACITY', 'STARTYEAR', 'ContractPriceMW']:
+    for col in ['COST', 'FIXED_COST', 'PPAPrice', 'AvgPPAPrice', 'MarketPrice', 'CAPACITY', 'STARTYEAR', 'ContractPriceMW', 'UNITS']:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors='coerce')
     # Clean technology codes
@@ -268,6 +350,166 @@ def normalize_plant_data(plant_df: pd.DataFrame) -> pd.DataFrame:
         df['TECHNOLOGY'] = df['TECHNOLOGY'].astype(str).str.strip()
     return df
 
+def build_plant_table(plant_df: pd.DataFrame, technologies: List[str]) -> PlantTable:
+    """Build the array-backed PlantTable from normalized plant data."""
+    if plant_df is None or plant_df.empty:
+        plant_df = pd.DataFrame(columns=['TECHNOLOGY', 'CAPACITY', 'STARTYEAR'])
+    missing = [col for col in ('TECHNOLOGY', 'CAPACITY', 'STARTYEAR') if col not in plant_df.columns]
+    if missing:
+        raise ValueError(f"Plant data is missing required columns: {missing}")
+
+    def optional(col):
+        return plant_df[col].to_numpy(dtype=float) if col in plant_df.columns else None
+
+    technology = plant_df['TECHNOLOGY'].astype(str).to_numpy(dtype=object)
+    tech_position = {tech: i for i, tech in enumerate(technologies)}
+    contract_price = optional('ContractPriceMW')
+    return PlantTable(
+        names=plant_df.index.tolist(),
+        technologies=list(technologies),
+        technology=technology,
+        tech_code=np.array([tech_position.get(tech, -1) for tech in technology], dtype=int),
+        capacity=plant_df['CAPACITY'].to_numpy(dtype=float),
+        start_year=plant_df['STARTYEAR'].to_numpy(dtype=float),
+        cost=optional('COST'),
+        market_price=optional('MarketPrice'),
+        avg_ppa_price=optional('AvgPPAPrice'),
+        contract_price=contract_price if contract_price is not None else np.zeros(len(plant_df)),
+        units=optional('UNITS'),
+    )
+
+def build_tech_availability(plant_table: PlantTable, tech_params: pd.DataFrame, years: List[int]) -> TechAvailability:
+    """Build the technology-year availability index from start-year-sorted cumulative capacities."""
+    years_arr = np.asarray(years, dtype=float)
+    capacity = np.zeros((len(plant_table.technologies), len(years)))
+    for k, tech in enumerate(plant_table.technologies):
+        plants = plant_table.plants_of(tech)
+        if len(plants) == 0:
+            continue
+        if tech_params.empty or 'MaxLife' not in tech_params.columns or tech not in tech_params.index:
+            capacity[k] = np.nan  # reported when the availability is queried
+            continue
+        max_life = float(tech_params.loc[tech, 'MaxLife'])
+        order = np.argsort(plant_table.start_year[plants], kind='stable')
+        start = plant_table.start_year[plants][order]
+        cumulative = np.concatenate(([0.0], np.cumsum(plant_table.total_capacity[plants][order])))
+        # Plants with year - MaxLife <= start year <= year are available
+        newest = np.searchsorted(start, years_arr, side='right')
+        oldest = np.searchsorted(start, years_arr - max_life, side='left')
+        capacity[k] = cumulative[newest] - cumulative[oldest]
+    return TechAvailability(technologies=list(plant_table.technologies), years=list(years), capacity=capacity)
+
+def _cluster_key_value(value):
+    """Hashable, NaN-safe form of a plant attribute used in cluster keys."""
+    if value is None:
+        return None
+    try:
+        return None if pd.isna(value) else float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+def cluster_plants(model_data: ModelData,
+                   capacity_tolerance: float = Config.CLUSTER_CAPACITY_TOLERANCE,
+                   cost_tolerance: float = Config.CLUSTER_COST_TOLERANCE) -> ModelData:
+    """
+    Aggregate near-identical units into clusters retired an integer number of units at a time.
+
+    Units are clustered when technology, start year, revenue prices, contract price and FC_PPA row are
+    equal, and capacity and variable cost are within the relative tolerances of the cluster's first unit
+    (units are visited in increasing capacity, then cost). A cluster has the mean unit capacity and cost
+    of its units and keeps the name of its first unit in gen_data order, suffixed with the unit count.
+
+    Parameters:
+    model_data (ModelData): Unit-level model data.
+    capacity_tolerance (float): Maximum relative capacity difference within a cluster.
+    cost_tolerance (float): Maximum relative variable cost difference within a cluster.
+
+    Returns:
+    ModelData: Model data whose plants are the clusters; clusters maps each cluster to its units.
+    """
+    if model_data.clusters is not None:
+        raise ValueError("Plant data is already clustered")
+    plant_df = normalize_plant_data(model_data.gen_data)
+    table = model_data.plant_table
+    if table is None:
+        table = build_plant_table(plant_df, model_data.technologies)
+    cost = table.cost if table.cost is not None else np.zeros(len(table))
+    fc_ppa = model_data.fc_ppa
+    fc_rows = {}
+    if fc_ppa is not None and not fc_ppa.empty:
+        fc_rows = {name: tuple(_cluster_key_value(v) for v in row)
+                   for name, row in zip(fc_ppa.index, fc_ppa.itertuples(index=False))}
+
+    # Exact attributes, in order of first appearance
+    groups = {}
+    for i, name in enumerate(table.names):
+        key = (
+            table.technology[i],
+            _cluster_key_value(table.start_year[i]),
+            _cluster_key_value(table.market_price[i] if table.market_price is not None else None),
+            _cluster_key_value(table.avg_ppa_price[i] if table.avg_ppa_price is not None else None),
+            _cluster_key_value(table.contract_price[i]),
+            fc_rows.get(name),
+        )
+        groups.setdefault(key, []).append(i)
+
+    # Split each group on the capacity and cost tolerances
+    clusters = []
+    for members in groups.values():
+        members = sorted(members, key=lambda i: (table.capacity[i], cost[i], i))
+        current = [members[0]]
+        for i in members[1:]:
+            first = current[0]
+            if (abs(table.capacity[i] - table.capacity[first]) <= capacity_tolerance * abs(table.capacity[first])
+                    and abs(cost[i] - cost[first]) <= cost_tolerance * abs(cost[first])):
+                current.append(i)
+            else:
+                clusters.append(sorted(current))
+                current = [i]
+        clusters.append(sorted(current))
+    clusters.sort(key=lambda members: members[0])
+
+    rows, names, fc_index = [], [], []
+    for members in clusters:
+        first = table.names[members[0]]
+        name = first if len(members) == 1 else f"{first} (x{len(members)})"
+        row = plant_df.loc[first].copy()
+        row['CAPACITY'] = float(table.capacity[members].mean())
+        if 'COST' in plant_df.columns:
+            row['COST'] = float(cost[members].mean())
+        row['UNITS'] = len(members)
+        rows.append(row)
+        names.append(name)
+        if fc_ppa is not None and first in fc_ppa.index:
+            fc_index.append((first, name))
+    cluster_df = pd.DataFrame(rows, index=names)
+    cluster_fc_ppa = fc_ppa
+    if fc_ppa is not None and not fc_ppa.empty:
+        cluster_fc_ppa = fc_ppa.loc[[first for first, _ in fc_index]].copy()
+        cluster_fc_ppa.index = [name for _, name in fc_index]
+
+    plant_table = build_plant_table(cluster_df, model_data.technologies)
+    logger.info(f"Clustered {len(table)} units into {len(names)} plants "
+                f"(capacity tolerance {capacity_tolerance}, cost tolerance {cost_tolerance})")
+    return ModelData(
+        years=model_data.years,
+        plants=names,
+        time_blocks=model_data.time_blocks,
+        scenarios=model_data.scenarios,
+        price_scenarios=model_data.price_scenarios,
+        technologies=model_data.technologies,
+        gen_data=cluster_df,
+        price_gen=model_data.price_gen,
+        price_dist=model_data.price_dist,
+        price_dur=model_data.price_dur,
+        other=model_data.other,
+        fc_ppa=cluster_fc_ppa,
+        tech_params=model_data.tech_params,
+        plant_table=plant_table,
+        tech_availability=build_tech_availability(plant_table, model_data.tech_params, model_data.years),
+        clusters={name: [table.names[i] for i in members] for name, members in zip(names, clusters)},
+    )
+
 def initialize_model_data(data: dict) -> ModelData:
     """Initialize model data structures from loaded Excel data."""
     # Clean all DataFrames except price_gen (which needs special handling)
@@ -323,6 +565,7 @@ def initialize_model_data(data: dict) -> ModelData:
     logger.info(f"  EXCEL_READ: Scenarios: {len(scenarios)} scenarios - {list(scenarios.keys())}")
     logger.info(f"  EXCEL_READ: Price scenarios: {len(price_scenarios)} scenarios - {list(price_scenarios.keys())}")
     
+    plant_table = build_plant_table(plant_df, technologies)
     return ModelData(
         years=years,
         plants=plant_df.index.tolist() if not plant_df.empty else [],
@@ -338,7 +581,9 @@ def initialize_model_data(data: dict) -> ModelData:
         price_dur=data.get('price_dur', pd.DataFrame()),
         other=data.get('other', pd.DataFrame()),
         fc_ppa=data.get('fc_ppa', pd.DataFrame()),
-        tech_params=tech_params
+        tech_params=tech_params,
+        plant_table=plant_table,
+        tech_availability=build_tech_availability(plant_table, tech_params, years)
     )
 
 def generate_intermediate_scenarios(model_data: ModelData) -> ModelData:
@@ -423,7 +668,10 @@ def generate_intermediate_scenarios(model_data: ModelData) -> ModelData:
             price_dur=model_data.price_dur,
             other=model_data.other,
             fc_ppa=model_data.fc_ppa,
-            tech_params=model_data.tech_params
+            tech_params=model_data.tech_params,
+            plant_table=model_data.plant_table,
+            tech_availability=model_data.tech_availability,
+            clusters=model_data.clusters
         )
         
         print(f"\nSuccessfully processed scenarios: {list(all_scenarios.keys())}")
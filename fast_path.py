@@ -0,0 +1,104 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from config import Config
+from matrix_model import MatrixModel
+from lagrangian import lagrangian_problem, schedule_solution, solve_lagrangian
+
+logger = logging.getLogger(__name__)
+
+# Rows linking Cap and Retire; every other row only sees the capacity kept
+CAPACITY_BALANCE_ROWS = ("CapBal", "CapBal1", "MaxRetire")
+
+@dataclass
+class FastPathResult:
+    """Best schedule found without the retirement MIP, and how far it can be from the optimum"""
+    objective: Optional[float]          # Objective of x (None when no feasible schedule was found)
+    upper_bound: Optional[float]        # Bound on the optimum (equal to objective when the test is exact, None
+                                        # when it is not and the Lagrangian relaxation was not run)
+    exact: bool                         # No retirement can improve the objective (see keeping_dominates)
+    x: Optional[np.ndarray]             # MatrixModel column values
+    seconds: float
+    kept_all: bool = True               # x keeps every plant (otherwise it is the best Lagrangian schedule)
+
+    @property
+    def gap(self) -> Optional[float]:
+        if self.objective is None or self.upper_bound is None:
+            return None
+        return max(self.upper_bound - self.objective, 0.0) / max(abs(self.objective), Config.TOLERANCE)
+
+    def summary(self) -> dict:
+        """Objective, bound and gap as reported with the results."""
+        return {"Objective": self.objective, "UpperBound": self.upper_bound, "Gap": self.gap, "Exact": self.exact,
+                "KeptAll": self.kept_all, "Seconds": self.seconds}
+
+def capacity_is_free(matrix: MatrixModel) -> bool:
+    """True when Cap and Retire have no objective weight (fixed costs on nameplate capacity, as in BAU)."""
+    columns = np.concatenate([matrix.cap_col[matrix.cap_col >= 0], matrix.retire_col[matrix.retire_col >= 0]])
+    return not np.any(matrix.objective[columns])
+
+def keeping_dominates(matrix: MatrixModel) -> bool:
+    """
+    True when keeping every plant is optimal whatever the dispatch: Cap and Retire have no objective weight and
+    outside the capacity balance rows more capacity only loosens a row (MaxPLF, MinCapacityTech). MinPLF with
+    MinPLF > 0 and TechBlockMinGen are tightened by a kept plant, so retiring it can free the dispatch.
+    """
+    if not capacity_is_free(matrix):
+        return False
+    cap, retire = np.zeros(matrix.num_cols, dtype=bool), np.zeros(matrix.num_cols, dtype=bool)
+    cap[matrix.cap_col[matrix.cap_col >= 0]] = True
+    retire[matrix.retire_col[matrix.retire_col >= 0]] = True
+    rows = np.repeat(np.arange(matrix.num_rows), np.diff(matrix.indptr))
+    balance = np.array([key[0] in CAPACITY_BALANCE_ROWS for key in matrix.row_keys], dtype=bool)
+    if np.any(retire[matrix.indices] & ~balance[rows]):
+        return False  # Retire outside the capacity balance rows
+    entries = cap[matrix.indices] & ~balance[rows]
+    coefficient, row = matrix.data[entries], rows[entries]
+    tightens = ((coefficient > 0) & np.isfinite(matrix.row_upper[row])) | \
+               ((coefficient < 0) & np.isfinite(matrix.row_lower[row]))
+    return not tightens.any()
+
+def solve_fast_path(matrix: MatrixModel, time_limit=None, lagrangian=True) -> Optional[FastPathResult]:
+    """
+    Dispatch a scenario whose capacity has no objective weight with every plant kept, without a MIP.
+
+    With the retirements fixed to zero, the model is an LP that separates by year and technology, solved in closed
+    form by the merit order (see lagrangian.schedule_solution). When keeping every plant is not provably optimal
+    (see keeping_dominates), the Lagrangian relaxation (see lagrangian.solve_lagrangian) bounds the optimum and its
+    best repaired schedule is reported instead when it is better.
+
+    Parameters:
+    matrix (MatrixModel): Model of the scenario
+    time_limit (float): Time limit in seconds of the Lagrangian iterations
+    lagrangian (bool): Run the Lagrangian relaxation when keeping every plant is not provably optimal
+
+    Returns:
+    FastPathResult: The best schedule, its objective and bound, or None when the capacity has an objective weight
+    """
+    if not capacity_is_free(matrix):
+        return None
+    start = time.perf_counter()
+    problem = lagrangian_problem(matrix)
+    x = schedule_solution(problem, problem.alive)
+    objective = float(matrix.objective @ x + matrix.objective_constant) if x is not None else None
+    exact = x is not None and keeping_dominates(matrix)
+    upper, kept_all = objective if exact else None, True
+    if not exact and lagrangian:
+        relaxed = solve_lagrangian(matrix, time_limit=time_limit)
+        upper = relaxed.upper_bound
+        if relaxed.x is not None and (objective is None or relaxed.lower_bound > objective):
+            x, objective, kept_all = relaxed.x, relaxed.lower_bound, False
+    result = FastPathResult(objective, upper, exact, x, time.perf_counter() - start, kept_all)
+    name = f"{matrix.scenario}_{matrix.price_scenario}"
+    if x is None:
+        logger.info(f"{name}: no feasible schedule without the MIP")
+    elif exact:
+        logger.info(f"{name}: keeping every plant {objective:,.2f} is optimal ({result.seconds:.1f} s)")
+    else:
+        logger.info(f"{name}: " + ("keeping every plant" if kept_all else "best Lagrangian schedule")
+                    + f" {objective:,.2f}"
+                    + (f", bound {upper:,.2f} (gap {result.gap:.2%})" if upper is not None else ", no bound")
+                    + f" ({result.seconds:.1f} s)")
+    return result
@@ -0,0 +1,143 @@
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pyomo logs a ConstructionTimer on this logger after constructing each component
+_CONSTRUCTION_LOGGER = "pyomo.common.timing.construction"
+_IMPLICIT_SETS = "(implicit sets)"
+
+@dataclass
+class ComponentProfile:
+    """Construction of one Pyomo component"""
+    name: str
+    ctype: str                      # Var, Constraint, Param, Set, Objective, ...
+    indices: int                    # Number of component data objects (rows, variables, values)
+    seconds: float                  # Wall time of the construction
+    memory_mb: Optional[float]      # Memory allocated since the previous component (None when not traced)
+
+@dataclass
+class BuildProfile:
+    """Construction of each component, and wall time of each stage, of one scenario run"""
+    scenario: str
+    price_scenario: str
+    components: List[ComponentProfile] = field(default_factory=list)
+    stages: Dict[str, float] = field(default_factory=dict)  # Stage (build, lp_write, solve, ...) -> seconds
+    peak_memory_mb: Optional[float] = None                   # Peak traced memory during the build
+
+    def summary_table(self) -> str:
+        """Components by decreasing construction time, then the stage times, as a text table."""
+        lines = [f"Build profile {self.scenario}_{self.price_scenario}",
+                 f"{'Component':<24}{'Type':<12}{'Indices':>10}{'Seconds':>10}{'Memory MB':>11}"]
+        for c in sorted(self.components, key=lambda c: -c.seconds):
+            memory = "" if c.memory_mb is None else f"{c.memory_mb:.1f}"
+            lines.append(f"{c.name:<24}{c.ctype:<12}{c.indices:>10}{c.seconds:>10.3f}{memory:>11}")
+        if self.components:
+            other = self.stages.get("build", 0.0) - sum(c.seconds for c in self.components)
+            lines.append(f"{'(outside components)':<46}{other:>10.3f}")
+        lines.append("Stages: " + ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in self.stages.items()))
+        if self.peak_memory_mb is not None:
+            lines.append(f"Peak build memory: {self.peak_memory_mb:.1f} MB")
+        return "\n".join(lines)
+
+class _ConstructionHandler(logging.Handler):
+    """Records the ConstructionTimer of every component into a BuildProfile."""
+
+    def __init__(self, profile: BuildProfile):
+        super().__init__()
+        self.profile = profile
+        self.last_memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+    def emit(self, record):
+        timer = record.msg
+        obj = getattr(timer, "obj", None)
+        if obj is None:
+            return
+        memory_mb = None
+        if self.last_memory is not None:
+            current = tracemalloc.get_traced_memory()[0]
+            memory_mb, self.last_memory = (current - self.last_memory) / 1e6, current
+        try:
+            indices = len(obj)  # data objects of indexed components, members of scalar sets
+        except (AttributeError, TypeError):
+            indices = 1
+        ctype = getattr(getattr(obj, "ctype", None), "__name__", type(obj).__name__)
+        if obj.parent_block() is None:
+            if ctype == "Block":
+                return  # the model itself
+            # Anonymous index sets (products, Any, ...) are reported together
+            merged = next((c for c in self.profile.components if c.name == _IMPLICIT_SETS), None)
+            if merged is None:
+                merged = ComponentProfile(_IMPLICIT_SETS, "Set", 0, 0.0, None if memory_mb is None else 0.0)
+                self.profile.components.append(merged)
+            merged.indices += indices
+            merged.seconds += timer.timer
+            if memory_mb is not None:
+                merged.memory_mb += memory_mb
+            return
+        self.profile.components.append(ComponentProfile(
+            name=obj.local_name, ctype=ctype, indices=indices, seconds=timer.timer, memory_mb=memory_mb))
+
+@contextmanager
+def profile_build(profile: Optional[BuildProfile], trace_memory=True):
+    """
+    Record the construction time, size and memory of every Pyomo component built inside the block.
+
+    Memory is traced with tracemalloc, which slows construction down; the recorded times are comparable
+    between runs, not with untraced builds. Does nothing when profile is None.
+
+    Parameters:
+    profile (BuildProfile): Profile the components are added to
+    trace_memory (bool): Also record the memory allocated by each component
+    """
+    if profile is None:
+        yield
+        return
+    construction_logger = logging.getLogger(_CONSTRUCTION_LOGGER)
+    old_level, old_propagate = construction_logger.level, construction_logger.propagate
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    handler = _ConstructionHandler(profile)
+    construction_logger.addHandler(handler)
+    construction_logger.setLevel(logging.INFO)
+    construction_logger.propagate = False  # keep the per-component records out of the log
+    try:
+        yield
+    finally:
+        construction_logger.removeHandler(handler)
+        construction_logger.setLevel(old_level)
+        construction_logger.propagate = old_propagate
+        if trace_memory:
+            profile.peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        if started:
+            tracemalloc.stop()
+
+@contextmanager
+def timed(profile: Optional[BuildProfile], stage: str):
+    """Add the wall time of the block to a stage of the profile (nothing when profile is None)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.stages[stage] = profile.stages.get(stage, 0.0) + time.perf_counter() - start
+
+def write_profiles(profiles: Dict[str, BuildProfile], filename):
+    """
+    Write the build profiles of every scenario run as JSON.
+
+    Parameters:
+    profiles (dict): Profile by scenario key (e.g. AD_40_AvgPPAPrice)
+    filename (str): Path of the JSON file
+    """
+    with open(filename, "w") as f:
+        json.dump({key: asdict(profile) for key, profile in profiles.items()}, f, indent=2)
+    logger.info(f"Build profiles written to {filename}")
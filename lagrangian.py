@@ -0,0 +1,481 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+from config import Config
+from matrix_model import MatrixModel
+
+logger = logging.getLogger(__name__)
+
+# Rows of a single plant: kept in the plant problems
+_PLANT_ROWS = ("MinPLF", "MaxPLF", "CapBal", "CapBal1", "MaxRetire")
+# Technology rows relaxed with multipliers
+_RELAXED_ROWS = ("TechGenGoal", "MinCapacityTech", "TechBlockMinGen")
+
+@dataclass
+class LagrangianProblem:
+    """Plant-year arrays of a MatrixModel with its technology rows separated out (G plants, R decision years,
+    B dispatch blocks, K technologies with rows; technology K collects the plants of no row)"""
+    matrix: MatrixModel
+    techs: List[str]                # Technologies in row order
+    tech_of: np.ndarray             # Technology position of each plant (G,)
+    capacity: np.ndarray            # MW of each plant (G,)
+    alive: np.ndarray               # Cap/Retire columns exist (G, R), a prefix of the years of each plant
+    operating: np.ndarray           # Gen columns exist (G, R)
+    keepable: np.ndarray            # The plant can be kept in the year (MinPLF satisfiable) (G, R)
+    density: np.ndarray             # Objective value per MW-year of energy in each block (G, R, B)
+    segment: np.ndarray             # MW-year of energy each block can take from a kept plant (G, R, B)
+    dur: np.ndarray                 # Duration of each dispatch block (B,)
+    lo: np.ndarray                  # Minimum energy of a kept plant, MW-year (G, R)
+    hi: np.ndarray                  # Maximum energy of a kept plant, MW-year (G, R)
+    cap_value: np.ndarray           # Objective value of keeping the capacity (G, R)
+    block_min: np.ndarray           # TechBlockMinGen coefficient of a kept plant, TWh (G, R)
+    goal: np.ndarray                # TechGenGoal targets, TWh (R, K+1), NaN without a row
+    min_capacity: np.ndarray        # MinCapacityTech requirements, MW (R, K+1), NaN without a row
+    block_limit: np.ndarray         # TechBlockMinGen limits, TWh (R, K+1), NaN without a row
+    block_order: np.ndarray         # Blocks of each plant-year in decreasing density (G, R, B)
+    goal_pieces: np.ndarray         # Blocks of the plant-years of TechGenGoal rows, by row and decreasing density
+
+@dataclass
+class LagrangianResult:
+    """Bounds of a Lagrangian solve and its best feasible solution"""
+    upper_bound: float                  # Best Lagrangian dual bound
+    lower_bound: Optional[float]        # Objective of x (None when no feasible schedule was found)
+    x: Optional[np.ndarray]             # Column values of the best repaired schedule
+    iterations: int
+    seconds: float
+    multipliers: Dict[str, Dict[tuple, float]] = field(default_factory=dict)  # Row name -> (year, tech) -> value
+
+    @property
+    def gap(self) -> Optional[float]:
+        """Relative duality gap of x."""
+        if self.lower_bound is None:
+            return None
+        return (self.upper_bound - self.lower_bound) / max(abs(self.lower_bound), Config.TOLERANCE)
+
+    def summary(self) -> dict:
+        """Bounds and gap as reported with the results."""
+        return {"UpperBound": self.upper_bound, "LowerBound": self.lower_bound, "Gap": self.gap,
+                "Iterations": self.iterations, "Seconds": self.seconds}
+
+def lagrangian_problem(matrix: MatrixModel) -> LagrangianProblem:
+    """
+    Separate a MatrixModel into plant problems and the technology rows coupling them.
+
+    Parameters:
+    matrix (MatrixModel): Model built by build_matrix_model
+
+    Returns:
+    LagrangianProblem: The plant-year arrays and the right-hand sides of the technology rows
+    """
+    params = matrix.params
+    unknown = sorted({name for name, _ in matrix.row_keys} - set(_PLANT_ROWS) - set(_RELAXED_ROWS))
+    if unknown:
+        raise ValueError(f"Rows {unknown} are neither plant rows nor relaxed technology rows")
+    techs = [tech for tech in matrix.technologies if len(matrix.plants_by_tech[tech])]
+    tech_of = np.full(len(params.plants), len(techs))
+    for k, tech in enumerate(techs):
+        tech_of[matrix.plants_by_tech[tech]] = k
+
+    alive = matrix.cap_col >= 0
+    operating = matrix.gen_col[:, :, 0] >= 0
+    dur = np.array([params.price_dur.sum()]) if matrix.annual_dispatch else params.price_dur
+    capacity = params.total_capacity
+    gen_coef = np.where(matrix.gen_col >= 0, matrix.objective[matrix.gen_col], 0.0)
+    # Value per MW-year of energy: Gen[g,y,t] contributes dur[t] * Gen of energy
+    density = np.divide(gen_coef, dur, out=np.zeros_like(gen_coef), where=dur > 0)
+    segment = operating[:, :, None] * capacity[:, None, None] * dur[None, None, :]
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    lo = params.min_plf[:, None] * capacity[:, None] * alive
+    hi = params.max_plf[:, None] * capacity[:, None] * operating
+
+    rows = {name: np.full((len(matrix.rep_years), len(techs) + 1), np.nan) for name in _RELAXED_ROWS}
+    rep_pos = {y: r for r, y in enumerate(matrix.rep_years)}
+    for (name, index), lower, upper in zip(matrix.row_keys, matrix.row_lower, matrix.row_upper):
+        if name in _RELAXED_ROWS:
+            y, tech = index
+            rows[name][rep_pos[y], techs.index(tech)] = upper if name == "TechBlockMinGen" else lower
+    block_order = np.argsort(-density, axis=-1, kind="stable")
+    in_row, row = _goal_rows(rows["TechGenGoal"], tech_of, len(techs))
+    sorted_density = np.take_along_axis(density, block_order, axis=-1)[in_row]
+    goal_pieces = np.lexsort((-sorted_density.ravel(), np.repeat(row, sorted_density.shape[1])))
+    return LagrangianProblem(
+        matrix=matrix, techs=techs, tech_of=tech_of, capacity=capacity, alive=alive, operating=operating,
+        # A kept plant that does not operate yet must have MinPLF 0
+        keepable=alive & (operating | (params.min_plf[:, None] <= 0)),
+        density=density, segment=segment, dur=dur, lo=lo, hi=hi,
+        cap_value=np.where(alive, matrix.objective[matrix.cap_col], 0.0) * capacity[:, None],
+        block_min=params.min_plf[:, None] * twh_per_mw * capacity[:, None] * alive,
+        goal=rows["TechGenGoal"], min_capacity=rows["MinCapacityTech"], block_limit=rows["TechBlockMinGen"],
+        block_order=block_order, goal_pieces=goal_pieces)
+
+def _goal_rows(goal, tech_of, num_techs):
+    """Plant-years in a TechGenGoal row (G, R) and the position of their row in goal.ravel()."""
+    years = np.arange(goal.shape[0])
+    in_row = ~np.isnan(goal[years[None, :], tech_of[:, None]])
+    return in_row, (years[None, :] * (num_techs + 1) + tech_of[:, None])[in_row]
+
+def best_dispatch(density, segment, lo, hi, order=None):
+    """
+    Energy of each block maximizing sum(density * energy) with lo <= total energy <= hi.
+
+    The blocks are filled in decreasing density: every block worth more than nothing up to hi, and at least lo.
+
+    Parameters:
+    density (ndarray): Value per unit of energy of each block (..., B)
+    segment (ndarray): Energy each block can take (..., B)
+    lo, hi (ndarray): Bounds of the total energy (...)
+    order (ndarray): Blocks in decreasing density, when already sorted
+
+    Returns:
+    ndarray: Energy of each block (..., B)
+    """
+    if order is None:
+        order = np.argsort(-density, axis=-1, kind="stable")
+    sorted_density = np.take_along_axis(density, order, axis=-1)
+    sorted_segment = np.take_along_axis(segment, order, axis=-1)
+    wanted = np.where(sorted_density > 0, sorted_segment, 0.0).sum(axis=-1)
+    level = np.minimum(np.clip(wanted, lo, hi), sorted_segment.sum(axis=-1))
+    before = np.cumsum(sorted_segment, axis=-1) - sorted_segment
+    sorted_fill = np.clip(level[..., None] - before, 0.0, sorted_segment)
+    fill = np.empty_like(sorted_fill)
+    np.put_along_axis(fill, order, sorted_fill, axis=-1)
+    return fill
+
+def allocate_energy(density, segment, lo, hi, total):
+    """
+    Energy of each block of a group of plants with sum of energy == total (a TechGenGoal row), maximizing the
+    value: every plant generates lo with its best blocks, the rest goes to the best remaining blocks of the group.
+    Returns None when lo.sum() > total or hi.sum() < total.
+    """
+    tolerance = Config.TOLERANCE * max(1.0, abs(total))
+    remaining = total - lo.sum()
+    if remaining < -tolerance or remaining > (hi - lo).sum() + tolerance:
+        return None
+    fill = best_dispatch(density, segment, lo, lo)
+    order = np.argsort(-density, axis=-1, kind="stable")
+    sorted_density = np.take_along_axis(density, order, axis=-1)
+    room = np.take_along_axis(segment - fill, order, axis=-1)
+    # Each plant can take at most hi - lo more, from its blocks in decreasing density
+    allowed = np.minimum(np.cumsum(room, axis=-1), (hi - lo)[:, None])
+    room = np.diff(allowed, prepend=0.0, axis=-1)
+    pieces = np.argsort(-sorted_density, axis=None, kind="stable")
+    piece_room = room.ravel()[pieces]
+    before = np.cumsum(piece_room) - piece_room
+    take = np.zeros(room.size)
+    take[pieces] = np.clip(max(remaining, 0.0) - before, 0.0, piece_room)
+    extra = np.empty_like(fill)
+    np.put_along_axis(extra, order, take.reshape(room.shape), axis=-1)
+    return fill + extra
+
+def allocate_goals(problem: LagrangianProblem, kept, lo, hi):
+    """
+    Energy of every kept plant-year block with every TechGenGoal row met, maximizing the value: allocate_energy
+    for all the rows at once, with the block orders of the problem.
+
+    Parameters:
+    problem (LagrangianProblem): Separated model
+    kept (ndarray): Years kept (G, R)
+    lo, hi (ndarray): Bounds of the energy of each plant-year, zero where not kept (G, R)
+
+    Returns:
+    ndarray: Energy of each block (G, R, B), or None when a row cannot be met
+    """
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    order = problem.block_order
+    segment = problem.segment * kept[:, :, None]
+    energy = best_dispatch(problem.density, segment, lo, hi, order)
+    in_row, row = _goal_rows(problem.goal, problem.tech_of, len(problem.techs))
+    total = np.nan_to_num(problem.goal.ravel()) / twh_per_mw
+    remaining = total - np.bincount(row, lo[in_row], len(total))
+    tolerance = Config.TOLERANCE * np.maximum(1.0, np.abs(total))
+    if (remaining < -tolerance).any() or (remaining > np.bincount(row, (hi - lo)[in_row], len(total))
+                                          + tolerance).any():
+        return None
+
+    # Every plant generates lo in its best blocks; each can take at most hi - lo more, in decreasing density
+    fill = best_dispatch(problem.density, segment, lo, lo, order)
+    room = np.take_along_axis(segment - fill, order, axis=-1)[in_row]
+    room = np.diff(np.minimum(np.cumsum(room, axis=-1), (hi - lo)[in_row][:, None]), prepend=0.0, axis=-1)
+    # The rest of each row goes to its best pieces (goal_pieces: by row, then by decreasing density)
+    pieces = problem.goal_pieces
+    piece_row = np.repeat(row, room.shape[1])[pieces]
+    piece_room = room.ravel()[pieces]
+    before = np.cumsum(piece_room) - piece_room
+    starts = np.flatnonzero(np.diff(piece_row, prepend=-1))
+    before -= np.repeat(before[starts], np.diff(np.append(starts, len(pieces))))
+    take = np.zeros(room.size)
+    take[pieces] = np.clip(np.maximum(remaining, 0.0)[piece_row] - before, 0.0, piece_room)
+    extra = np.empty_like(room)
+    np.put_along_axis(extra, order[in_row], take.reshape(room.shape), axis=-1)
+    energy[in_row] = fill[in_row] + extra
+    return energy
+
+def by_row(problem, values):
+    """Sum of plant-year values by (decision year, technology) (R, K+1)."""
+    totals = np.zeros((values.shape[1], len(problem.techs) + 1))
+    np.add.at(totals.T, problem.tech_of, values)
+    return totals
+
+def plant_solutions(problem: LagrangianProblem, goal_price, capacity_price, block_price):
+    """
+    Best retirement year and dispatch of every plant for the multipliers of the technology rows.
+
+    A kept plant-year earns its dispatch (valued at the block margins minus the TechGenGoal multiplier), the value
+    of its capacity and the MinCapacityTech and TechBlockMinGen multipliers. A plant retired in decision year r is
+    kept in the years before r, so the value of every retirement year is a prefix sum over the kept-year values;
+    each plant takes the best one (or is never retired).
+
+    Parameters:
+    problem (LagrangianProblem): Separated model
+    goal_price, capacity_price, block_price (ndarray): Multipliers of the relaxed rows (R, K+1)
+
+    Returns:
+    tuple: Lagrangian value of each plant, years kept (G, R), block energy (G, R, B) and kept-year values
+        (G, R), the prefix sums of the kept-year values (G, R+1)
+    """
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    rows = (np.arange(problem.alive.shape[1])[None, :], problem.tech_of[:, None])  # (G, R) lookup of (R, K+1)
+    density = problem.density - goal_price[rows][:, :, None] * twh_per_mw
+    energy = best_dispatch(density, problem.segment, problem.lo * problem.operating, problem.hi)
+    kept_value = ((density * energy).sum(axis=2) + problem.cap_value
+                  + capacity_price[rows] * problem.capacity[:, None] - block_price[rows] * problem.block_min)
+    kept_value = np.where(problem.keepable, kept_value, -np.inf)
+    kept_value = np.where(problem.alive, kept_value, 0.0)
+    prefix = np.concatenate([np.zeros((len(kept_value), 1)), np.cumsum(kept_value, axis=1)], axis=1)
+    # Retiring after the last alive year means never retiring
+    choices = np.where(np.arange(prefix.shape[1])[None, :] <= problem.alive.sum(axis=1)[:, None], prefix, -np.inf)
+    retire_at = np.argmax(choices, axis=1)
+    kept = np.arange(problem.alive.shape[1])[None, :] < retire_at[:, None]
+    return prefix[np.arange(len(prefix)), retire_at], kept, energy * kept[:, :, None], kept_value, prefix
+
+def _row_activity(problem, kept, energy):
+    """Left-hand sides of the relaxed rows: generation (TWh), capacity (MW) and block minimum generation (TWh)."""
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    return (by_row(problem, energy.sum(axis=2) * twh_per_mw), by_row(problem, kept * problem.capacity[:, None]),
+            by_row(problem, kept * problem.block_min))
+
+def repair_schedule(problem: LagrangianProblem, kept, prefix):
+    """
+    Change the retirement year of the fewest-value plants until the technology rows can be met.
+
+    In each decision year, a technology short of generation or capacity keeps retired plants through that year,
+    and one with too much minimum generation retires kept plants in that year. The plants changed are those losing
+    the least value per MW according to prefix (the plant problem values of the last multipliers).
+
+    Parameters:
+    problem (LagrangianProblem): Separated model
+    kept (ndarray): Years kept (G, R) of the relaxed solution
+    prefix (ndarray): Value of each retirement year (G, R+1), as returned by plant_solutions
+
+    Returns:
+    ndarray: Years kept (G, R) of the repaired schedule, or None when it could not be repaired
+    """
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    retire_at = kept.sum(axis=1)
+    years = np.arange(problem.alive.shape[1])
+    # A plant retired in year a can be kept through year r when no year in [a, r] is unkeepable
+    blocked = np.concatenate([np.zeros((len(retire_at), 1), dtype=int),
+                              np.cumsum(~problem.keepable & problem.alive, axis=1)], axis=1)
+    for _ in range(Config.LAGRANGIAN_REPAIR_PASSES):
+        changed = False
+        for r in years:
+            for k in range(len(problem.techs)):
+                ids = problem.matrix.plants_by_tech[problem.techs[k]]
+                goal, required, limit = problem.goal[r, k], problem.min_capacity[r, k], problem.block_limit[r, k]
+                tolerance = Config.TOLERANCE * max(1.0, np.nan_to_num(abs(goal)), np.nan_to_num(abs(required)))
+                while True:
+                    kept_r = retire_at[ids] > r
+                    hi = (problem.hi[ids, r] * kept_r).sum() * twh_per_mw
+                    cap = (problem.capacity[ids] * kept_r).sum()
+                    short_energy = hi < goal - tolerance  # False for NaN (no row)
+                    if not (short_energy or cap < required - tolerance):
+                        break
+                    candidates = ids[~kept_r & problem.alive[ids, r]
+                                     & (blocked[ids, r + 1] == blocked[ids, retire_at[ids]])
+                                     & (problem.operating[ids, r] | ~short_energy)]
+                    if not len(candidates):
+                        return None
+                    loss = (prefix[candidates, retire_at[candidates]] - prefix[candidates, r + 1]) \
+                        / problem.capacity[candidates]
+                    retire_at[candidates[np.argmin(loss)]] = r + 1
+                    changed = True
+                while True:
+                    kept_r = retire_at[ids] > r
+                    lo = (problem.lo[ids, r] * problem.operating[ids, r] * kept_r).sum() * twh_per_mw
+                    block = (problem.block_min[ids, r] * kept_r).sum()
+                    if not (lo > goal + tolerance or block > limit + tolerance):
+                        break
+                    hi = (problem.hi[ids, r] * kept_r).sum() * twh_per_mw
+                    cap = (problem.capacity[ids] * kept_r).sum()
+                    candidates = ids[kept_r]
+                    # Retiring a plant must not leave the technology short in this year
+                    keep_goal = np.isnan(goal) | (hi - problem.hi[candidates, r] * twh_per_mw >= goal - tolerance)
+                    keep_cap = np.isnan(required) | (cap - problem.capacity[candidates] >= required - tolerance)
+                    candidates = candidates[keep_goal & keep_cap]
+                    if not len(candidates):
+                        return None
+                    loss = (prefix[candidates, retire_at[candidates]] - prefix[candidates, r]) \
+                        / problem.capacity[candidates]
+                    retire_at[candidates[np.argmin(loss)]] = r
+                    changed = True
+        if not changed:
+            return years[None, :] < retire_at[:, None]
+    return None
+
+def schedule_solution(problem: LagrangianProblem, kept):
+    """
+    Column values of the best dispatch of a retirement schedule, or None when the schedule is infeasible.
+
+    With the retirements fixed, the model separates into one dispatch problem per technology-year: plants without
+    a TechGenGoal row dispatch their best blocks, the others share the target (see allocate_goals). The solution
+    is checked against every row and bound of the MatrixModel.
+
+    Parameters:
+    problem (LagrangianProblem): Separated model
+    kept (ndarray): Years kept (G, R)
+
+    Returns:
+    ndarray: Column values, or None
+    """
+    matrix = problem.matrix
+    kept = kept & problem.alive
+    if (kept & ~problem.keepable).any():
+        return None
+    lo = problem.lo * problem.operating * kept
+    hi = problem.hi * kept
+    energy = allocate_goals(problem, kept, lo, hi)
+    if energy is None:
+        return None
+
+    x = np.zeros(matrix.num_cols)
+    gen = np.divide(energy, problem.dur, out=np.zeros_like(energy), where=problem.dur > 0)
+    x[matrix.gen_col[problem.operating]] = gen[problem.operating]
+    x[matrix.cap_col[problem.alive]] = (kept * problem.capacity[:, None])[problem.alive]
+    retire_at = kept.sum(axis=1)
+    retired = retire_at < problem.alive.sum(axis=1)
+    x[matrix.retire_col[retired, retire_at[retired]]] = 1.0
+    return x if max_violation(matrix, x) <= Config.LAGRANGIAN_FEASIBILITY_TOL else None
+
+def max_violation(matrix: MatrixModel, x):
+    """Largest violation of a row or column bound by x, relative to the bound (at least 1)."""
+    activity = np.bincount(np.repeat(np.arange(matrix.num_rows), np.diff(matrix.indptr)),
+                           matrix.data * x[matrix.indices], matrix.num_rows)
+    violation = np.concatenate([
+        (matrix.row_lower - activity) / np.maximum(1.0, np.abs(np.nan_to_num(matrix.row_lower, posinf=0, neginf=0))),
+        (activity - matrix.row_upper) / np.maximum(1.0, np.abs(np.nan_to_num(matrix.row_upper, posinf=0, neginf=0))),
+        (matrix.col_lower - x) / np.maximum(1.0, np.abs(matrix.col_lower)),
+        (x - matrix.col_upper) / np.maximum(1.0, np.abs(np.nan_to_num(matrix.col_upper, posinf=0))),
+    ])
+    return float(max(violation.max(initial=0.0), 0.0))
+
+def fixed_schedule_solution(matrix: MatrixModel, schedule):
+    """
+    Column values of the best dispatch of a retirement schedule (see schedule_solution).
+
+    Parameters:
+    matrix (MatrixModel): Model of the schedule (e.g. the annual model of a representative-year solution)
+    schedule (dict): Retirement by plant and year, as in the retire_sched results
+
+    Returns:
+    ndarray: Column values, or None when the schedule is infeasible in this model
+    """
+    problem = lagrangian_problem(matrix)
+    retire = np.array([[schedule[g][y] for y in matrix.rep_years] for g in matrix.params.plants], dtype=float)
+    kept = (np.cumsum(np.round(retire) * problem.alive, axis=1) == 0) & problem.alive
+    return schedule_solution(problem, kept)
+
+def _best_of(problem, kept, prefix, lower, best_x):
+    """Repair and dispatch a relaxed schedule; keep it when it improves the best feasible objective."""
+    repaired = repair_schedule(problem, kept, prefix)
+    x = schedule_solution(problem, repaired) if repaired is not None else None
+    if x is not None:
+        objective = float(problem.matrix.objective @ x + problem.matrix.objective_constant)
+        if lower is None or objective > lower:
+            return objective, x
+    return lower, best_x
+
+def solve_lagrangian(matrix: MatrixModel, iterations=Config.LAGRANGIAN_ITERATIONS, gap=Config.LAGRANGIAN_GAP,
+                     time_limit=None):
+    """
+    Bound and solve a MatrixModel by Lagrangian relaxation of its technology rows.
+
+    TechGenGoal, MinCapacityTech and TechBlockMinGen are moved into the objective with multipliers, so every plant
+    picks its retirement year and dispatch independently (see plant_solutions); the relaxed value is an upper
+    bound of the model. The multipliers follow projected subgradient steps of Polyak length towards the best
+    feasible objective, halved when the bound stops improving. Every LAGRANGIAN_REPAIR_EVERY iterations the
+    relaxed schedule is repaired (see repair_schedule) and dispatched (see schedule_solution) into a feasible
+    solution, whose objective is a lower bound.
+
+    Parameters:
+    matrix (MatrixModel): Model built by build_matrix_model
+    iterations (int): Maximum number of subgradient iterations
+    gap (float): Stop when the relative gap between the bounds is at most this
+    time_limit (float): Stop after this many seconds
+
+    Returns:
+    LagrangianResult: Bounds, best feasible solution and multipliers
+    """
+    start = time.perf_counter()
+    problem = lagrangian_problem(matrix)
+    rows = [problem.goal, problem.min_capacity, problem.block_limit]
+    has_row = [~np.isnan(rhs) for rhs in rows]
+    rhs = [np.nan_to_num(v) for v in rows]
+    # Steps are taken on rows scaled by their right-hand sides, so TWh and MW rows move at comparable rates
+    scale = [np.maximum(np.abs(v), 1.0) for v in rhs]
+    prices = [np.zeros_like(v) for v in rhs]  # goal (free), capacity (>= 0), block minimum (>= 0)
+    best_prices = [p.copy() for p in prices]
+    upper, lower, best_x = np.inf, None, None
+    step, stalled = Config.LAGRANGIAN_STEP, 0
+    iteration = 0
+    for iteration in range(1, iterations + 1):
+        plant_value, kept, energy, _, prefix = plant_solutions(problem, *prices)
+        bound = plant_value.sum() + matrix.objective_constant + (prices[0] * rhs[0]).sum() \
+            - (prices[1] * rhs[1]).sum() + (prices[2] * rhs[2]).sum()
+        if bound < upper - Config.TOLERANCE * max(1.0, abs(bound)):
+            upper, stalled = bound, 0
+            best_prices = [p.copy() for p in prices]
+        else:
+            stalled += 1
+            if stalled >= Config.LAGRANGIAN_STALL:
+                step, stalled = step / 2, 0
+        if (iteration - 1) % Config.LAGRANGIAN_REPAIR_EVERY == 0:
+            lower, best_x = _best_of(problem, kept, prefix, lower, best_x)
+        if lower is not None and upper - lower <= gap * max(abs(lower), Config.TOLERANCE):
+            break
+        if time_limit is not None and time.perf_counter() - start > time_limit:
+            break
+        generation, capacity, block = _row_activity(problem, kept, energy)
+        # Subgradients of the bound; minimizing it moves each multiplier against its subgradient
+        slopes = [np.where(has_row[0], rhs[0] - generation, 0.0),
+                  np.where(has_row[1], capacity - rhs[1], 0.0),
+                  np.where(has_row[2], rhs[2] - block, 0.0)]
+        # Projection: a multiplier at zero that would turn negative does not move
+        slopes[1] = np.where((prices[1] <= 0) & (slopes[1] > 0), 0.0, slopes[1])
+        slopes[2] = np.where((prices[2] <= 0) & (slopes[2] > 0), 0.0, slopes[2])
+        slopes = [slope / row_scale for slope, row_scale in zip(slopes, scale)]
+        norm = sum((slope ** 2).sum() for slope in slopes)
+        if norm == 0:
+            break  # the relaxed solution meets every technology row
+        target = lower if lower is not None else bound - Config.LAGRANGIAN_GAP * max(abs(bound), 1.0)
+        length = step * max(bound - target, Config.TOLERANCE) / norm
+        moves = [length * slope / row_scale for slope, row_scale in zip(slopes, scale)]
+        prices[0] = prices[0] - moves[0]
+        prices[1] = np.maximum(0.0, prices[1] - moves[1])
+        prices[2] = np.maximum(0.0, prices[2] - moves[2])
+
+    # The schedule of the best multipliers is repaired too
+    _, kept, _, _, prefix = plant_solutions(problem, *best_prices)
+    lower, best_x = _best_of(problem, kept, prefix, lower, best_x)
+
+    multipliers = {}
+    for name, price, present in zip(_RELAXED_ROWS, best_prices, has_row):
+        multipliers[name] = {(matrix.rep_years[r], problem.techs[k]): float(price[r, k])
+                             for r, k in zip(*np.nonzero(present)) if k < len(problem.techs)}
+    result = LagrangianResult(float(upper), lower, best_x, iteration, time.perf_counter() - start, multipliers)
+    logger.info(f"{matrix.scenario}_{matrix.price_scenario}: Lagrangian bound {result.upper_bound:,.2f}, "
+                + (f"best schedule {result.lower_bound:,.2f} (gap {result.gap:.2%})" if best_x is not None
+                   else "no feasible schedule")
+                + f" after {result.iterations} iterations in {result.seconds:.1f} s")
+    return result
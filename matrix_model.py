@@ -0,0 +1,621 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from pyomo.environ import Constraint, Objective, value
+from pyomo.repn import generate_standard_repn
+from config import Config
+from model_parameters import (ModelParameters, precompute_parameters, plant_table_of, tech_availability_of,
+                              year_blocks, technology_targets, target_rows, objective_arrays)
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MatrixModel:
+    """build_model as sparse arrays: maximize objective @ x + objective_constant, row_lower <= A x <= row_upper"""
+    scenario: str
+    price_scenario: str
+    params: ModelParameters
+    tech_params: pd.DataFrame             # TechParams of the model data (depreciated capex of the results)
+    technologies: List[str]               # tech: Technologies of the model data
+    plants_by_tech: Dict[str, np.ndarray]  # Plant ids of each technology
+    targets: Dict[tuple, float]           # PriceGenTech by (year, tech), missing means 0
+    year_map: Dict[int, int]              # Decision year of every model year
+    dispatch_blocks: List[str]            # Blocks of Gen (one annual block with annual dispatch)
+
+    # Columns: position of each variable, -1 where build_model creates no variable
+    gen_col: np.ndarray                   # Gen(g,y,t) (G, R, B)
+    cap_col: np.ndarray                   # Cap(g,y) (G, R)
+    retire_col: np.ndarray                # Retire(g,y) (G, R)
+    col_lower: np.ndarray
+    col_upper: np.ndarray
+    integer: np.ndarray                   # True for integer columns
+    objective: np.ndarray
+    objective_constant: float
+
+    # Rows in CSR form, named like the build_model constraints
+    row_keys: List[tuple]                 # (constraint name, index) of each row
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    row_lower: np.ndarray                 # -inf when the row has no lower bound
+    row_upper: np.ndarray                 # inf when the row has no upper bound
+
+    gen_goal_capped: List[dict]
+    min_cap_capped: List[dict]
+
+    @property
+    def rep_years(self) -> List[int]:
+        return sorted(set(self.year_map.values()))
+
+    @property
+    def annual_dispatch(self) -> bool:
+        return self.dispatch_blocks == [Config.ANNUAL_DISPATCH_BLOCK]
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.col_lower)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.row_keys)
+
+    def column_keys(self) -> List[tuple]:
+        """(variable name, index) of each column, like the build_model variables."""
+        keys = [None] * self.num_cols
+        plants, years = self.params.plants, self.rep_years
+        for name, cols in (("Gen", self.gen_col), ("Cap", self.cap_col), ("Retire", self.retire_col)):
+            for position in zip(*np.nonzero(cols >= 0)):
+                index = (plants[position[0]], years[position[1]])
+                if name == "Gen":
+                    index += (self.dispatch_blocks[position[2]],)
+                keys[cols[position]] = (name, index)
+        return keys
+
+@dataclass
+class MatrixSolution:
+    """Solution of a MatrixModel"""
+    status: str                 # HiGHS model status
+    x: np.ndarray               # Column values (None without a feasible solution)
+    objective: float
+    bound: float                # Best objective bound (MIP dual bound)
+
+    @property
+    def ok(self) -> bool:
+        return self.x is not None
+
+class _RowBuilder:
+    """Collects row blocks and assembles the CSR arrays."""
+
+    def __init__(self):
+        self.keys, self.counts, self.indices, self.data, self.lower, self.upper = [], [], [], [], [], []
+
+    def add_block(self, name, index, parts, lower, upper):
+        """
+        Add one row per index from parts of (columns, coefficients, present) arrays of shape (N, k).
+
+        Entries where present is False (or the column is -1) are left out of the row.
+        """
+        if not index:
+            return
+        cols = np.concatenate([np.broadcast_to(c, m.shape) for c, _, m in parts], axis=1)
+        coefs = np.concatenate([np.broadcast_to(v, m.shape) for _, v, m in parts], axis=1)
+        mask = np.concatenate([m for _, _, m in parts], axis=1) & (cols >= 0)
+        self.keys += [(name, k) for k in index]
+        self.counts.append(mask.sum(axis=1))
+        self.indices.append(cols[mask])
+        self.data.append(coefs[mask].astype(float))
+        self.lower.append(np.broadcast_to(np.asarray(lower, dtype=float), (len(index),)))
+        self.upper.append(np.broadcast_to(np.asarray(upper, dtype=float), (len(index),)))
+
+    def add_row(self, name, index, cols, coefs, lower, upper):
+        """Add a single row."""
+        cols = np.asarray(cols, dtype=int)[None, :]
+        self.add_block(name, [index], [(cols, np.asarray(coefs, dtype=float)[None, :], np.ones(cols.shape, bool))],
+                       lower, upper)
+
+    def arrays(self):
+        counts = np.concatenate(self.counts) if self.counts else np.zeros(0, int)
+        indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        join = lambda parts, dtype: np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype)
+        return (self.keys, indptr, join(self.indices, np.int64), join(self.data, float),
+                join(self.lower, float), join(self.upper, float))
+
+def build_matrix_model(model_data, scenario, price_scenario, collapse_blocks=True, revenue_curve=False,
+                       representative_years=None, cumulative_retirement=False):
+    """
+    Build the build_model formulation directly as sparse arrays, without Pyomo components.
+
+    Columns and rows are the variables and constraints build_model creates for the same options (see
+    matrix_differences). Plant clusters, revenue curves and cumulative retirement are only available in
+    build_model.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): The scenario to be used in the model
+    price_scenario (str): The price scenario to be used in the model
+    collapse_blocks, revenue_curve, representative_years, cumulative_retirement: As in build_model
+
+    Returns:
+    MatrixModel: The model arrays
+    """
+    if model_data is None:
+        raise ValueError("Model data cannot be None")
+    valid_scenarios = list(model_data.scenarios.keys())
+    if scenario not in valid_scenarios:
+        raise ValueError(f"Invalid scenario. Must be one of {valid_scenarios}")
+    if price_scenario not in ("MarketPrice", "AvgPPAPrice"):
+        raise ValueError("Invalid price scenario. Must be one of ['MarketPrice', 'AvgPPAPrice']")
+    if revenue_curve or cumulative_retirement:
+        raise ValueError("The matrix backend does not support --revenue-curve or --cumulative-retirement")
+
+    years = list(range(min(model_data.years), min(max(model_data.years), Config.DEFAULT_END_YEAR) + 1))
+    params = precompute_parameters(model_data, years)
+    if params.clustered:
+        raise ValueError("The matrix backend does not support plant clusters")
+    if price_scenario not in params.rev_unit:
+        raise ValueError(f"No {price_scenario} column found in plant data")
+    table = plant_table_of(model_data)
+    availability = tech_availability_of(model_data)
+
+    # Decision years, sparse index sets and dispatch blocks as in build_model
+    if representative_years is None:
+        rep_years = list(years)
+    else:
+        rep_years = sorted((set(representative_years) & set(years)) | {years[0]})
+    year_map = year_blocks(years, rep_years)
+    rep_pos = [y - years[0] for y in rep_years]
+    alive = ~params.expired[:, rep_pos]
+    operating = params.operating[:, rep_pos]
+    if collapse_blocks and params.uniform_blocks(price_scenario):
+        dispatch_blocks, dur = [Config.ANNUAL_DISPATCH_BLOCK], np.array([params.price_dur.sum()])
+    else:
+        dispatch_blocks, dur = list(params.time_blocks), params.price_dur
+    n_blocks = len(dispatch_blocks)
+
+    # Columns: Gen, then Cap, then Retire, each in plant-year(-block) order
+    gen_col = np.full(operating.shape + (n_blocks,), -1, dtype=np.int64)
+    gen_col[operating] = np.arange(operating.sum() * n_blocks).reshape(-1, n_blocks)
+    n_gen = operating.sum() * n_blocks
+    cap_col = np.full(alive.shape, -1, dtype=np.int64)
+    cap_col[alive] = n_gen + np.arange(alive.sum())
+    retire_col = np.full(alive.shape, -1, dtype=np.int64)
+    retire_col[alive] = n_gen + alive.sum() + np.arange(alive.sum())
+    n_cols = n_gen + 2 * alive.sum()
+    col_lower = np.zeros(n_cols)
+    col_upper = np.full(n_cols, np.inf)
+    col_upper[gen_col[operating]] = np.broadcast_to(
+        params.total_capacity[np.nonzero(operating)[0]][:, None], (operating.sum(), n_blocks))
+    col_upper[retire_col[alive]] = 1.0
+    integer = np.zeros(n_cols, dtype=bool)
+    integer[retire_col[alive]] = True
+
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    plants_by_tech = {tech: table.plants_of(tech) for tech in model_data.technologies}
+    techs = [tech for tech in model_data.technologies if len(plants_by_tech[tech])]
+    targets = {(y, tech): v for (y, tech), v in technology_targets(model_data, scenario).items()
+               if y in year_map and tech in plants_by_tech}
+    max_plf = {tech: model_data.tech_params.at[tech, "MaxPLF"] for tech in techs}
+    goal, min_capacity, block_min_gen, gen_goal_capped, min_cap_capped = target_rows(
+        targets, year_map, techs, max_plf, availability)
+
+    rows = _RowBuilder()
+    key = lambda i, r: (params.plants[i], rep_years[r])
+    # MinPLF and MaxPLF of each plant-year
+    plants, reps = np.nonzero(alive & (operating | (params.min_plf[:, None] > 0)))
+    rows.add_block("MinPLF", [key(i, r) for i, r in zip(plants, reps)], [
+        (gen_col[plants, reps], dur[None, :], np.broadcast_to(operating[plants, reps][:, None], (len(plants), n_blocks))),
+        (cap_col[plants, reps][:, None], -params.min_plf[plants][:, None], np.ones((len(plants), 1), bool)),
+    ], 0.0, np.inf)
+    plants, reps = np.nonzero(alive & operating)
+    rows.add_block("MaxPLF", [key(i, r) for i, r in zip(plants, reps)], [
+        (gen_col[plants, reps], dur[None, :] * twh_per_mw, np.ones((len(plants), n_blocks), bool)),
+        (cap_col[plants, reps][:, None], -params.max_plf[plants][:, None] * twh_per_mw, np.ones((len(plants), 1), bool)),
+    ], -np.inf, 0.0)
+
+    # Per-technology generation goal and, in representative years, minimum generation of the kept capacity
+    for r, y in enumerate(rep_years):
+        for tech in techs:
+            if (y, tech) not in goal:
+                continue
+            ids = plants_by_tech[tech]
+            cols = gen_col[ids, r][operating[ids, r]].ravel()
+            if not len(cols):
+                if goal[y, tech] > 0:
+                    raise ValueError(f"TechGenGoal[{y}, {tech}] is infeasible: no plant of the technology operates")
+                continue
+            rows.add_row("TechGenGoal", (y, tech), cols, np.tile(dur * twh_per_mw, len(cols) // n_blocks),
+                         goal[y, tech], goal[y, tech])
+    for r, y in enumerate(rep_years):
+        for tech in techs:
+            if (y, tech) not in block_min_gen:
+                continue
+            ids = plants_by_tech[tech]
+            ids = ids[alive[ids, r] & (params.min_plf[ids] > 0)]
+            if len(ids):
+                rows.add_row("TechBlockMinGen", (y, tech), cap_col[ids, r], params.min_plf[ids] * twh_per_mw,
+                             -np.inf, block_min_gen[y, tech])
+
+    # Capacity balance between consecutive decision years, and from nameplate capacity in the first one
+    plants, reps = np.nonzero(alive[:, 1:] & alive[:, :-1])
+    reps = reps + 1
+    ones = np.ones((len(plants), 1), bool)
+    rows.add_block("CapBal", [key(i, r) for i, r in zip(plants, reps)], [
+        (cap_col[plants, reps][:, None], 1.0, ones),
+        (cap_col[plants, reps - 1][:, None], -1.0, ones),
+        (retire_col[plants, reps][:, None], params.capacity[plants][:, None], ones),
+    ], 0.0, 0.0)
+    plants = np.nonzero(alive[:, 0])[0]
+    ones = np.ones((len(plants), 1), bool)
+    rows.add_block("CapBal1", [params.plants[i] for i in plants], [
+        (cap_col[plants, 0][:, None], 1.0, ones),
+        (retire_col[plants, 0][:, None], params.capacity[plants][:, None], ones),
+    ], params.total_capacity[plants], params.total_capacity[plants])
+
+    # At most MAX_RETIREMENTS_PER_PLANT retirements of each plant
+    plants = np.nonzero(alive.any(axis=1))[0]
+    limit = Config.MAX_RETIREMENTS_PER_PLANT * params.units[plants]
+    rows.add_block("MaxRetire", [params.plants[i] for i in plants],
+                   [(retire_col[plants], 1.0, alive[plants])], -np.inf, limit)
+
+    # Minimum capacity per technology and year
+    for r, y in enumerate(rep_years):
+        for tech in techs:
+            if (y, tech) not in min_capacity:
+                continue
+            ids = plants_by_tech[tech]
+            ids = ids[alive[ids, r]]
+            if not len(ids):
+                if min_capacity[y, tech] > 0:
+                    raise ValueError(f"MinCapacityTech[{y}, {tech}] is infeasible: no plant of the technology is available")
+                continue
+            rows.add_row("MinCapacityTech", (y, tech), cap_col[ids, r], np.ones(len(ids)),
+                         min_capacity[y, tech], np.inf)
+
+    # Objective: discounted dispatch margins, and fixed cost on the capacity kept (AD) or nameplate (BAU)
+    block_margin, fixed_coef, block_fixed_coef = objective_arrays(params, rep_pos, price_scenario)
+    gen_coef = block_margin * params.price_dur[None, None, :] * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    if dispatch_blocks == [Config.ANNUAL_DISPATCH_BLOCK]:
+        gen_coef = gen_coef.sum(axis=2, keepdims=True)
+    objective = np.zeros(n_cols)
+    objective[gen_col[operating]] = gen_coef[operating]
+    if scenario != "BAU":
+        objective[cap_col[alive]] = block_fixed_coef[alive]
+        objective_constant = 0.0
+    else:
+        objective_constant = float((fixed_coef * params.total_capacity[:, None]).sum())
+
+    row_keys, indptr, indices, data, row_lower, row_upper = rows.arrays()
+    return MatrixModel(
+        scenario=scenario, price_scenario=price_scenario, params=params, tech_params=model_data.tech_params,
+        technologies=list(model_data.technologies), plants_by_tech=plants_by_tech,
+        targets=technology_targets(model_data, scenario), year_map=year_map, dispatch_blocks=dispatch_blocks,
+        gen_col=gen_col, cap_col=cap_col, retire_col=retire_col, col_lower=col_lower, col_upper=col_upper,
+        integer=integer, objective=objective, objective_constant=objective_constant,
+        row_keys=row_keys, indptr=indptr, indices=indices, data=data, row_lower=row_lower, row_upper=row_upper,
+        gen_goal_capped=gen_goal_capped, min_cap_capped=min_cap_capped,
+    )
+
+def _mps_names(keys):
+    """MPS names of (component, index) keys in the style of symbolic solver labels, e.g. Gen(PLANT_2030_Peak)."""
+    names = []
+    for name, index in keys:
+        index = index if isinstance(index, tuple) else (index,)
+        names.append(f"{name}({re.sub(r'[^A-Za-z0-9_.-]', '_', '_'.join(str(i) for i in index))})")
+    if len(set(names)) < len(names):
+        names = [f"{n}_{k}" for k, n in enumerate(names)]  # labels collide after replacing special characters
+    return names
+
+def write_mps(matrix: MatrixModel, filename):
+    """
+    Write a MatrixModel as a free-format MPS file.
+
+    Parameters:
+    matrix (MatrixModel): Model to write
+    filename (str): Path of the MPS file
+    """
+    col_names = _mps_names(matrix.column_keys())
+    row_names = _mps_names(matrix.row_keys)
+    # Column-wise entries of the row-wise matrix
+    row_of = np.repeat(np.arange(matrix.num_rows), np.diff(matrix.indptr))
+    order = np.argsort(matrix.indices, kind="stable")
+    col_start = np.searchsorted(matrix.indices[order], np.arange(matrix.num_cols + 1))
+    lines = [f"NAME {matrix.scenario}_{matrix.price_scenario}", "OBJSENSE", "    MAX", "ROWS", " N  OBJ"]
+    for name, lower, upper in zip(row_names, matrix.row_lower, matrix.row_upper):
+        kind = "E" if lower == upper else "L" if lower == -np.inf else "G"
+        lines.append(f" {kind}  {name}")
+    lines.append("COLUMNS")
+    in_integer = False
+    for j, name in enumerate(col_names):
+        if matrix.integer[j] != in_integer:
+            in_integer = matrix.integer[j]
+            lines.append("    MARKER 'MARKER' 'INTORG'" if in_integer else "    MARKER 'MARKER' 'INTEND'")
+        entries = order[col_start[j]:col_start[j + 1]]
+        if matrix.objective[j] != 0 or not len(entries):
+            lines.append(f"    {name} OBJ {matrix.objective[j]:.17g}")
+        lines += [f"    {name} {row_names[row_of[e]]} {matrix.data[e]:.17g}" for e in entries]
+    if in_integer:
+        lines.append("    MARKER 'MARKER' 'INTEND'")
+    lines.append("RHS")
+    if matrix.objective_constant:
+        lines.append(f"    RHS OBJ {-matrix.objective_constant:.17g}")
+    ranges = []
+    for name, lower, upper in zip(row_names, matrix.row_lower, matrix.row_upper):
+        rhs = upper if lower == -np.inf else lower
+        if rhs != 0:
+            lines.append(f"    RHS {name} {rhs:.17g}")
+        if -np.inf < lower < upper < np.inf:
+            ranges.append(f"    RNG {name} {upper - lower:.17g}")
+    if ranges:
+        lines += ["RANGES"] + ranges
+    lines.append("BOUNDS")
+    for name, lower, upper in zip(col_names, matrix.col_lower, matrix.col_upper):
+        if lower != 0:
+            lines.append(f" MI BND {name}" if lower == -np.inf else f" LO BND {name} {lower:.17g}")
+        if upper != np.inf:
+            lines.append(f" UP BND {name} {upper:.17g}")
+    lines.append("ENDATA")
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def solve_matrix_model(matrix: MatrixModel, mip_gap=None, time_limit=None, tee=False, initial=None):
+    """
+    Solve a MatrixModel in memory with HiGHS (highspy package).
+
+    Parameters:
+    matrix (MatrixModel): Model to solve
+    mip_gap (float): Relative MIP gap
+    time_limit (float): Time limit in seconds
+    tee (bool): Show the solver output
+    initial (ndarray): Column values of a known solution the MIP search starts from
+
+    Returns:
+    MatrixSolution: The solution (x is None when no feasible solution was found)
+    """
+    try:
+        import highspy
+    except ImportError:
+        raise RuntimeError("The matrix backend solves with HiGHS: install the highspy package")
+    lp = highspy.HighsLp()
+    lp.num_col_, lp.num_row_ = matrix.num_cols, matrix.num_rows
+    lp.col_cost_, lp.offset_ = matrix.objective, matrix.objective_constant
+    lp.col_lower_, lp.col_upper_ = matrix.col_lower, matrix.col_upper
+    lp.row_lower_, lp.row_upper_ = matrix.row_lower, matrix.row_upper
+    lp.sense_ = highspy.ObjSense.kMaximize
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_, lp.a_matrix_.num_row_ = matrix.num_cols, matrix.num_rows
+    lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = matrix.indptr, matrix.indices, matrix.data
+    lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous
+                       for i in matrix.integer]
+    highs = highspy.Highs()
+    highs.setOptionValue("output_flag", bool(tee))
+    if mip_gap is not None:
+        highs.setOptionValue("mip_rel_gap", float(mip_gap))
+    if time_limit is not None:
+        highs.setOptionValue("time_limit", float(time_limit))
+    highs.passModel(lp)
+    if initial is not None:
+        solution = highspy.HighsSolution()
+        solution.col_value = list(initial)
+        solution.value_valid = True
+        highs.setSolution(solution)
+    highs.run()
+    status = highs.modelStatusToString(highs.getModelStatus())
+    info = highs.getInfo()
+    if info.primal_solution_status != 2:  # no feasible solution
+        return MatrixSolution(status, None, None, None)
+    bound = info.mip_dual_bound if matrix.integer.any() else info.objective_function_value
+    return MatrixSolution(status, np.asarray(highs.getSolution().col_value), info.objective_function_value, bound)
+
+def solution_arrays(matrix: MatrixModel, x):
+    """
+    Annual Gen (G, Y, T), Cap (G, Y) and Retire (G, Y) of a solution, as gen_value, cap_value and
+    retire_value report them for the Pyomo model.
+    """
+    params = matrix.params
+    x = np.asarray(x, dtype=float)
+    rep_years = matrix.rep_years
+    rep_of = np.array([rep_years.index(matrix.year_map[y]) for y in params.years])
+    rep_pos = [y - params.years[0] for y in rep_years]
+    gen = np.where(matrix.gen_col >= 0, x[matrix.gen_col], 0.0)
+    if gen.shape[2] != len(params.time_blocks):
+        gen = np.repeat(gen, len(params.time_blocks), axis=2)  # one annual level in every block
+    gen = gen[:, rep_of] * params.operating[:, :, None]
+    cap = np.where(matrix.cap_col >= 0, x[matrix.cap_col], Config.FIXED_CAPACITY_EXPIRED)[:, rep_of]
+    cap[params.expired] = Config.FIXED_CAPACITY_EXPIRED
+    retire = np.zeros(params.expired.shape)
+    retire[:, rep_pos] = np.where(matrix.retire_col >= 0, x[matrix.retire_col], 0.0)
+    # A plant still in service when it exceeds MaxLife retires its remaining units in its first expired year
+    first_expired = params.expired & ~np.pad(params.expired[:, :-1], ((0, 0), (1, 0)))
+    retired_before = np.cumsum(retire, axis=1) - retire
+    retire[first_expired] = (params.units[:, None] - retired_before)[first_expired]
+    return gen, cap, retire
+
+def net_revenue_arrays(matrix: MatrixModel, gen, cap):
+    """
+    Energy and net revenue of annual Gen and Cap arrays (see solution_arrays), with fixed costs charged as in
+    result_processor.fixed_cost_capacity and fixed_cost_rate.
+
+    Returns:
+    tuple: Energy by block in MWh (G, Y, T) and net revenue in $m (G, Y)
+    """
+    params = matrix.params
+    price = matrix.price_scenario
+    energy = gen * params.price_dur[None, None, :] * Config.HOURS_PER_YEAR  # MWh by block
+    fixed_capacity = params.total_capacity[:, None] if matrix.scenario != "AD" else cap
+    if price == "AvgPPAPrice":
+        fixed_rate = params.fc_ppa / Config.USD_TO_THOUSANDS
+    else:
+        fixed_rate = np.full(cap.shape, Config.DEFAULT_COST_PER_MW_MarketPrice)
+    margin = params.rev_unit[price][:, None, None] * params.price_dist1(price)[None, :, :] - params.cost[:, :, None]
+    netrev = (-fixed_capacity * fixed_rate + (margin * energy).sum(axis=2)) / Config.USD_TO_MILLIONS
+    return energy, netrev
+
+def annual_summary_of(matrix: MatrixModel, energy, cap, netrev):
+    """AnnualSummary results of the arrays of net_revenue_arrays, by year."""
+    params = matrix.params
+    return {y: {
+        "Total Coal Gen TWh": float(energy[:, j].sum() / Config.USD_TO_MILLIONS),
+        "Total Capacity GW": float(cap[:, j].sum() / Config.MW_TO_GW),
+        "Total Undiscounted Net Revenue $b": float(netrev[:, j].sum() / Config.USD_TO_THOUSANDS),
+        "Discounted Net Revenue $b": float((netrev[:, j] * params.discount[j]).sum() / Config.USD_TO_THOUSANDS),
+    } for j, y in enumerate(params.years)}
+
+def by_technology(matrix: MatrixModel, values):
+    """Plant-year values (G, Y) summed by technology, as {tech: {year: value}}."""
+    return {tech: dict(zip(matrix.params.years, values[matrix.plants_by_tech[tech]].sum(axis=0).tolist()))
+            for tech in matrix.technologies}
+
+def process_matrix_results(matrix: MatrixModel, x):
+    """
+    Result dicts of a MatrixModel solution, as process_model_results returns them for the Pyomo model.
+
+    Parameters:
+    matrix (MatrixModel): The solved model
+    x (ndarray): Column values
+
+    Returns:
+    dict: Processed results including generation, revenue, and capacity data
+    """
+    params = matrix.params
+    gen, cap, retire = solution_arrays(matrix, x)
+    years = params.years
+    energy, netrev = net_revenue_arrays(matrix, gen, cap)
+    plant_gen = energy.sum(axis=2) / Config.USD_TO_THOUSANDS  # GWh
+    tech_params = matrix.tech_params.reindex(params.technology)
+    capex = np.maximum(params.total_capacity * tech_params["CoalCapex $/kW"].to_numpy(dtype=float)
+                       * (1 - tech_params["Straight-line depreciation"].to_numpy(dtype=float) * params.life), 0)
+
+    by_plant = lambda values: {g: dict(zip(years, row)) for g, row in zip(params.plants, values.tolist())}
+    tech_gen = {tech: {y: round(v, 5) for y, v in series.items()}
+                for tech, series in by_technology(matrix, plant_gen).items()}
+    out = {
+        "PlantGen": {g: {y: round(v, 5) for y, v in series.items()} for g, series in by_plant(plant_gen).items()},
+        "retire_sched": by_plant(retire),
+        "plant_cap": by_plant(cap),
+        "AnnualSummary": annual_summary_of(matrix, energy, cap, netrev),
+        "plant_netrev": {"annual": by_plant(netrev),
+                         "depreciated_capex": dict(zip(params.plants, (capex / Config.USD_TO_THOUSANDS).tolist()))},
+        "TechGen": tech_gen,
+        "TechCap": by_technology(matrix, cap),
+        "TechNetRev": by_technology(matrix, netrev),
+        "TechTargets": {tech: {y: float(matrix.targets.get((y, tech), 0.0)) for y in years}
+                        for tech in matrix.technologies},
+    }
+    if matrix.min_cap_capped:
+        out["MinCapacityCapped"] = matrix.min_cap_capped
+    if matrix.gen_goal_capped:
+        out["GenGoalCapped"] = matrix.gen_goal_capped
+    return out
+
+def fix_matrix_retirements(matrix: MatrixModel, schedule):
+    """
+    Fix every Retire column to a retirement schedule (see model.fix_retirements).
+
+    Parameters:
+    matrix (MatrixModel): Model whose Retire columns are fixed
+    schedule (dict): Retirement by plant and year, as in the retire_sched results
+    """
+    rep_years = matrix.rep_years
+    for i, r in zip(*np.nonzero(matrix.retire_col >= 0)):
+        col = matrix.retire_col[i, r]
+        matrix.col_lower[col] = matrix.col_upper[col] = round(schedule[matrix.params.plants[i]][rep_years[r]])
+
+def _linear_terms(expr):
+    """Constant and {(variable name, index): coefficient} of a linear Pyomo expression."""
+    repn = generate_standard_repn(expr, compute_values=True)
+    terms = {}
+    for coef, var in zip(repn.linear_coefs, repn.linear_vars):
+        key = (var.parent_component().local_name, var.index())
+        terms[key] = terms.get(key, 0.0) + value(coef)
+    return value(repn.constant), terms
+
+def _close(a, b, tol):
+    if np.isinf(a) or np.isinf(b):
+        return a == b
+    return abs(a - b) <= tol * max(1.0, abs(a), abs(b))
+
+def matrix_differences(matrix: MatrixModel, model, tol=1e-9):
+    """
+    Differences between a MatrixModel and the Pyomo model of the same options (empty when equivalent).
+
+    Columns are compared with the variables of the active rows and objective, rows with the active
+    constraints by name and index, and the objective term by term.
+
+    Parameters:
+    matrix (MatrixModel): Model arrays
+    model (ConcreteModel): Model returned by build_model
+    tol (float): Relative tolerance of coefficients and bounds
+
+    Returns:
+    list: Description of each difference
+    """
+    differences = []
+    col_keys = matrix.column_keys()
+    col_of = {k: j for j, k in enumerate(col_keys)}
+    used = set()
+
+    pyomo_rows = {}
+    for con in model.component_data_objects(Constraint, active=True):
+        constant, terms = _linear_terms(con.body)
+        lower = -np.inf if con.lower is None else value(con.lower) - constant
+        upper = np.inf if con.upper is None else value(con.upper) - constant
+        pyomo_rows[con.parent_component().local_name, con.index()] = (terms, lower, upper)
+        used.update(terms)
+    for i, key in enumerate(matrix.row_keys):
+        if key not in pyomo_rows:
+            differences.append(f"Row {key} is not in the Pyomo model")
+            continue
+        terms, lower, upper = pyomo_rows.pop(key)
+        entries = range(matrix.indptr[i], matrix.indptr[i + 1])
+        row = {col_keys[matrix.indices[e]]: matrix.data[e] for e in entries}
+        if set(row) != set(terms) or not all(_close(row[k], terms[k], tol) for k in row):
+            differences.append(f"Row {key} has different coefficients")
+        if not (_close(matrix.row_lower[i], lower, tol) and _close(matrix.row_upper[i], upper, tol)):
+            differences.append(f"Row {key} bounds ({matrix.row_lower[i]}, {matrix.row_upper[i]}) != ({lower}, {upper})")
+    differences += [f"Row {key} is missing" for key in pyomo_rows]
+
+    obj = next(o for o in model.component_data_objects(Objective, active=True))
+    constant, terms = _linear_terms(obj.expr)
+    used.update(terms)
+    if not _close(constant, matrix.objective_constant, tol):
+        differences.append(f"Objective constant {matrix.objective_constant} != {constant}")
+    for key in set(terms) | {col_keys[j] for j in np.nonzero(matrix.objective)[0]}:
+        coef = matrix.objective[col_of[key]] if key in col_of else None
+        if coef is None or not _close(coef, terms.get(key, 0.0), tol):
+            differences.append(f"Objective coefficient of {key}: {coef} != {terms.get(key, 0.0)}")
+
+    for key in used | set(col_keys):
+        if key not in col_of:
+            differences.append(f"Variable {key} has no column")
+            continue
+        var = model.component(key[0])[key[1]] if key[0] in ("Gen", "Cap", "Retire") else None
+        if var is None:
+            differences.append(f"Column {key} is not a Pyomo variable")
+            continue
+        j = col_of[key]
+        lower, upper = -np.inf if var.lb is None else var.lb, np.inf if var.ub is None else var.ub
+        if not (_close(matrix.col_lower[j], lower, tol) and _close(matrix.col_upper[j], upper, tol)) \
+                or bool(matrix.integer[j]) != var.is_integer():
+            differences.append(f"Column {key} bounds or domain differ")
+    return differences
+
+def load_matrix_solution(matrix: MatrixModel, model, x):
+    """Set the variables of the Pyomo model to a MatrixModel solution."""
+    for (name, index), v in zip(matrix.column_keys(), np.asarray(x).tolist()):
+        model.component(name)[index].set_value(v, skip_validation=True)
+
+def result_differences(expected, actual, tol=1e-6, path=""):
+    """Paths where two result dicts differ beyond a relative tolerance (empty when they match)."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = [f"{path}/{k}: missing" for k in expected if k not in actual]
+        differences += [f"{path}/{k}: unexpected" for k in actual if k not in expected]
+        for k in expected:
+            if k in actual:
+                differences += result_differences(expected[k], actual[k], tol, f"{path}/{k}")
+        return differences
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return [] if _close(float(expected), float(actual), tol) else [f"{path}: {expected} != {actual}"]
+    return [] if expected == actual else [f"{path}: {expected} != {actual}"]
@@ -0,0 +1,161 @@
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+from config import Config
+from matrix_model import (MatrixModel, build_matrix_model, solution_arrays, net_revenue_arrays, annual_summary_of,
+                          by_technology)
+from lagrangian import LagrangianProblem, lagrangian_problem, schedule_solution, by_row
+
+@dataclass
+class ScheduleEvaluation:
+    """Merit-order dispatch of a fixed retirement schedule (arrays are None when the schedule is infeasible)"""
+    matrix: MatrixModel = field(repr=False)
+    objective: Optional[float]                  # Model objective, $m (None when infeasible)
+    shortfall: float                            # Relative violation of the technology rows, 0 when feasible
+    x: Optional[np.ndarray] = field(default=None, repr=False)           # MatrixModel column values
+    generation: Optional[np.ndarray] = field(default=None, repr=False)  # Gen by block, MW (G, Y, T)
+    capacity: Optional[np.ndarray] = field(default=None, repr=False)    # Cap, MW (G, Y)
+    energy: Optional[np.ndarray] = field(default=None, repr=False)      # Energy by block, MWh (G, Y, T)
+    net_revenue: Optional[np.ndarray] = field(default=None, repr=False)  # Net revenue, $m (G, Y)
+
+    @property
+    def feasible(self) -> bool:
+        return self.x is not None
+
+    def annual_summary(self) -> dict:
+        """AnnualSummary results of the dispatch, by year."""
+        return annual_summary_of(self.matrix, self.energy, self.capacity, self.net_revenue)
+
+    def tech_net_revenue(self) -> dict:
+        """TechNetRev results of the dispatch, by technology and year."""
+        return by_technology(self.matrix, self.net_revenue)
+
+class ScheduleEvaluator:
+    """
+    Objective and dispatch of retirement schedules of one scenario without a solver.
+
+    With the retirements fixed, the model separates into one dispatch problem per technology-year with a
+    merit-order solution (see lagrangian.schedule_solution). The model arrays are built once, so each
+    evaluation takes milliseconds; use it for heuristics, sensitivity sweeps and what-if schedules. Plant
+    clusters, revenue curves and cumulative retirement are not available (see build_matrix_model).
+    """
+
+    def __init__(self, model_data, scenario, price_scenario, **build_options):
+        """
+        Parameters:
+        model_data: Initialized model data
+        scenario (str): Scenario to evaluate
+        price_scenario (str): Price scenario to evaluate
+        build_options: Keyword options for build_matrix_model
+        """
+        self._attach(build_matrix_model(model_data, scenario, price_scenario, **build_options))
+
+    @classmethod
+    def from_matrix(cls, matrix: MatrixModel) -> "ScheduleEvaluator":
+        """Evaluator of an already built (e.g. cached) MatrixModel."""
+        evaluator = cls.__new__(cls)
+        evaluator._attach(matrix)
+        return evaluator
+
+    def _attach(self, matrix: MatrixModel):
+        self.matrix = matrix
+        self.problem: LagrangianProblem = lagrangian_problem(matrix)
+        rep_years = matrix.rep_years
+        # Decision year position of every model year
+        self._rep_of = np.array([rep_years.index(matrix.year_map[y]) for y in matrix.params.years])
+
+    @property
+    def plants(self):
+        return self.matrix.params.plants
+
+    @property
+    def years(self):
+        return self.matrix.params.years
+
+    def schedule_matrix(self, schedule) -> np.ndarray:
+        """
+        Retirement matrix of a schedule dict.
+
+        Parameters:
+        schedule (dict): Retirement by plant and year, as in the retire_sched results
+
+        Returns:
+        ndarray: 1 in the year each plant retires (plants x years)
+        """
+        return np.array([[schedule[g].get(y, 0.0) for y in self.years] for g in self.plants], dtype=float)
+
+    def kept_years(self, retire) -> np.ndarray:
+        """
+        Decision years in which each plant is kept (G, R).
+
+        A retirement in a year that is not a decision year counts from the decision year of its block; years
+        after the plant exceeds MaxLife are expired whatever the schedule says, and a retirement in an expired
+        year (as retire_sched records the expiry of a plant still in service) is ignored.
+        """
+        retire = np.asarray(retire, dtype=float)
+        if retire.shape != (len(self.plants), len(self.years)):
+            raise ValueError(f"The retirement matrix must be plants x years {(len(self.plants), len(self.years))}, "
+                             f"got {retire.shape}")
+        retire = np.where(self.matrix.params.expired, 0.0, retire)
+        retired = np.zeros(self.problem.alive.shape)
+        np.add.at(retired.T, self._rep_of, retire.T)
+        return (np.cumsum(retired, axis=1) < 0.5) & self.problem.alive
+
+    def shortfall(self, kept) -> float:
+        """
+        Relative violation of the technology rows by a schedule: generation the kept capacity cannot reach
+        (TechGenGoal between MinPLF and MaxPLF), capacity missing (MinCapacityTech), minimum generation above
+        TechBlockMinGen, each relative to its target, plus one for every kept plant-year that cannot run.
+        """
+        problem = self.problem
+        twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+        kept = kept & problem.alive
+        hi = by_row(problem, problem.hi * kept * twh_per_mw)
+        lo = by_row(problem, problem.lo * problem.operating * kept * twh_per_mw)
+        cap = by_row(problem, kept * problem.capacity[:, None])
+        block = by_row(problem, kept * problem.block_min)
+        scale = lambda rhs: np.maximum(np.abs(rhs), 1.0)
+        violation = [(problem.goal - hi) / scale(problem.goal), (lo - problem.goal) / scale(problem.goal),
+                     (problem.min_capacity - cap) / scale(problem.min_capacity),
+                     (block - problem.block_limit) / scale(problem.block_limit)]
+        total = sum(np.nan_to_num(np.maximum(v, 0.0)).sum() for v in violation)
+        return float(total + (kept & ~problem.keepable).sum())
+
+    def evaluate(self, retire) -> ScheduleEvaluation:
+        """
+        Best dispatch of a retirement schedule.
+
+        Parameters:
+        retire (ndarray): 1 in the year each plant retires (plants x years, in the order of plants and years)
+
+        Returns:
+        ScheduleEvaluation: Objective, dispatch and net revenue, or the shortfall of an infeasible schedule
+        """
+        kept = self.kept_years(retire)
+        x = schedule_solution(self.problem, kept)
+        if x is None:
+            return ScheduleEvaluation(self.matrix, None, max(self.shortfall(kept), Config.TOLERANCE))
+        gen, cap, _ = solution_arrays(self.matrix, x)
+        energy, netrev = net_revenue_arrays(self.matrix, gen, cap)
+        objective = float(self.matrix.objective @ x + self.matrix.objective_constant)
+        return ScheduleEvaluation(self.matrix, objective, 0.0, x, gen, cap, energy, netrev)
+
+def evaluate_schedule(model_data, scenario, price_scenario, retire, **build_options) -> ScheduleEvaluation:
+    """
+    Best dispatch of one retirement schedule (see ScheduleEvaluator, which builds the model arrays once for
+    many schedules).
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to evaluate
+    price_scenario (str): Price scenario to evaluate
+    retire (ndarray or dict): Retirement matrix (plants x years) or retire_sched dict
+    build_options: Keyword options for build_matrix_model
+
+    Returns:
+    ScheduleEvaluation: Objective, dispatch and net revenue of the schedule
+    """
+    evaluator = ScheduleEvaluator(model_data, scenario, price_scenario, **build_options)
+    if isinstance(retire, dict):
+        retire = evaluator.schedule_matrix(retire)
+    return evaluator.evaluate(retire)
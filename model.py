@@ -3,17 +3,132 @@ import logging
 from pyomo.util.infeasible import log_infeasible_constraints
 from pyomo.opt import SolverFactory
 from pyomo.core.util import quicksum
+from pyomo.core.expr.numeric_expr import LinearExpression
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from energy_data_processor import load_excel_data, initialize_model_data
-from result_processor import process_model_results, save_results_to_excel
+from model_parameters import (precompute_parameters, as_param_dict, plant_table_of, tech_availability_of,
+                              revenue_curve as build_revenue_curve, year_blocks, representative_years,
+                              technology_targets, target_rows, objective_arrays)
+from presolve import PRESOLVE_STEPS, run_presolve
+from scaling import UnitSystem, scale_model, unscale_model
+from build_cache import BuildCache, fingerprint
+from instrumentation import BuildProfile, profile_build, timed, write_profiles
+from result_processor import (process_model_results, save_results_to_excel, gen_value, cap_value, retire_value,
+                              calculate_retirement_schedule, objective_value)
 import argparse
+import time
 from datetime import datetime
 from config import Config  # NEW: Import Config class for constants
 
 logging.basicConfig(level=logging.INFO)
 
-def build_model(model_data, scenario, price_scenario):
+def linear_expression(coefs, variables, constant=0.0):
+    """
+    Build a Pyomo LinearExpression directly from coefficient and variable lists.
+
+    This avoids the repeated expression-tree construction of `+=` or sum() over
+    products, so expression generation is linear in the number of nonzeros.
+    """
+    return LinearExpression(constant=constant, linear_coefs=list(coefs), linear_vars=list(variables))
+
+def available_price_scenarios(params):
+    """Price scenarios the data supports: revenue per MWh and, for MarketPrice, a complete price table."""
+    available = []
+    for price_scenario in ["MarketPrice", "AvgPPAPrice"]:
+        try:
+            params.block_margin(price_scenario)
+        except ValueError:
+            continue
+        available.append(price_scenario)
+    return available
+
+def row_targets(model, availability):
+    """
+    Right-hand sides of the technology rows for the targets in model.PriceGenTech (see target_rows).
+
+    Parameters:
+    model (ConcreteModel): Model being built or re-targeted
+    availability: Technology availability (see tech_availability_of)
+
+    Returns:
+    tuple: As returned by target_rows
+    """
+    techs = [tech for tech in model.tech if any(True for _ in model.plants_by_tech[tech])]
+    targets = {(y, tech): value(model.PriceGenTech[y, tech]) for y in model.y for tech in techs}
+    max_plf = {tech: model.TechParams[tech, "MaxPLF"] for tech in techs}
+    return target_rows(targets, model._year_map, techs, max_plf, availability)
+
+def apply_row_targets(model):
+    """
+    Set the mutable right-hand sides of a re-targetable model from model.PriceGenTech, activating the rows
+    that have a target and deactivating the others.
+    """
+    goal, min_capacity, block_min_gen, model._gen_goal_capped, model._min_cap_capped = row_targets(
+        model, model._availability)
+    for rows, rhs, targets in ((model.TechGenGoal, model.TechGenGoalRHS, goal),
+                               (model.MinCapacityTech, model.MinCapacityRHS, min_capacity),
+                               (model.TechBlockMinGen, model.BlockMinGenRHS, block_min_gen)):
+        for index, con in rows.items():
+            if index in targets:
+                rhs[index] = targets[index]
+                con.activate()
+            else:
+                con.deactivate()
+    for name, rows, targets in (("TechGenGoal", model.TechGenGoal, goal),
+                                ("MinCapacityTech", model.MinCapacityTech, min_capacity)):
+        missing = [index for index, target in targets.items() if index not in rows and target > 0]
+        if missing:
+            raise ValueError(f"{name} targets {missing} cannot be met: no plant of the technology is available")
+
+def set_objective_weights(model, scenario, price_scenario):
+    """Discounted block margins and capacity cost per MW kept of the active objective (used by the presolve)."""
+    block_margin, fixed_coef, block_fixed_coef = model._objective_arrays[price_scenario]
+    model._block_margin = block_margin
+    model._capacity_coef = block_fixed_coef if scenario != "BAU" else np.zeros_like(block_fixed_coef)
+
+def retarget_model(model, model_data, scenario, price_scenario):
+    """
+    Re-target a model built with retargetable=True to another scenario and price scenario in place.
+
+    Only the PriceGenTech targets (and the row right-hand sides derived from them), the capacity cost of the
+    objective and the active price objective change, so the model does not need to be rebuilt.
+
+    Parameters:
+    model (ConcreteModel): Model returned by build_model(..., retargetable=True)
+    model_data: The data the model was built from
+    scenario (str): Scenario to switch to
+    price_scenario (str): Price scenario to switch to
+    """
+    if not getattr(model, "_retargetable", False):
+        raise ValueError("Only models built with retargetable=True can be re-targeted")
+    if getattr(model, "_presolved", False):
+        raise ValueError("A presolved model cannot be re-targeted: its cuts and fixings depend on the targets")
+    if scenario not in model_data.scenarios:
+        raise ValueError(f"Invalid scenario. Must be one of {list(model_data.scenarios.keys())}")
+    if price_scenario not in model.price_regimes:
+        raise ValueError(f"Invalid price scenario. Must be one of {list(model.price_regimes)}")
+    targets = technology_targets(model_data, scenario)
+    for y in model.y:
+        for tech in model.tech:
+            model.PriceGenTech[y, tech] = targets.get((y, tech), 0)
+    apply_row_targets(model)
+    model.FixedCostOnCapacity = 1 if scenario != "BAU" else 0
+    for p, objective in model.Obj.items():
+        if p == price_scenario:
+            objective.activate()
+        else:
+            objective.deactivate()
+    model.s.clear()
+    model.s.add(scenario)
+    model.p.clear()
+    model.p.add(price_scenario)
+    set_objective_weights(model, scenario, price_scenario)
+
+def build_model(model_data, scenario, price_scenario, collapse_blocks=True, revenue_curve=False,
+                representative_years=None, cumulative_retirement=False, retargetable=False, horizon=None,
+                initial_capacity=None):
     """
     Build a Pyomo optimization model based on the provided data and scenarios.
 
@@ -21,6 +136,24 @@ def build_model(model_data, scenario, price_scenario):
     model_data (DataFrame): The data required to build the model.
     scenario (str): The scenario to be used in the model.
     price_scenario (str): The price scenario to be used in the model.
+    collapse_blocks (bool): Dispatch a single annual block when every time block has the same price
+        (always the case for AvgPPAPrice). The dispatch is spread evenly over the blocks in the results.
+    revenue_curve (bool): Replace the block dispatch with one annual-energy variable per plant-year and its
+        concave revenue curve. The block dispatch is rebuilt greedily (highest margin first) in the results.
+    representative_years (list): Solve only these years (the first model year is always included). Each
+        one stands for the years up to the next one: its objective weights sum the discounted years it
+        represents, targets are the block mean, and results are expanded back to annual series.
+    cumulative_retirement (bool): Substitute Cap(g,y) = CAP0 - capacity * sum_{k<=y} Retire(g,k) into every
+        constraint and the objective instead of creating Cap variables and CapBal rows. model.Cap is then an
+        Expression with the same values.
+    retargetable (bool): Build a model that retarget_model can switch to any scenario and price scenario: the
+        targets and row right-hand sides are mutable Params, one objective is built per price scenario (model.Obj
+        is indexed by price scenario, one active) and time blocks are collapsed only when every price scenario
+        has identical block prices.
+    horizon (tuple): First and last model year (default: every data year up to Config.DEFAULT_END_YEAR). The
+        parameters depend on the calendar year only, so each year has the rows and objective terms of the full model.
+    initial_capacity (dict): Capacity (MW) of plants at the start of the first model year, e.g. carried over from
+        an earlier horizon (default: nameplate capacity CAP0)
 
     Returns:
     ConcreteModel: A Pyomo ConcreteModel object.
@@ -43,13 +176,18 @@ def build_model(model_data, scenario, price_scenario):
     
     if price_scenario not in valid_price_scenarios:
         raise ValueError(f"Invalid price scenario. Must be one of {valid_price_scenarios}")
+    if retargetable and revenue_curve:
+        raise ValueError("The revenue curve dispatch depends on the price scenario and cannot be re-targeted")
     # Create model
     try:
         model = ConcreteModel()
 
         # Sets
         model.g = Set(initialize=model_data.plants)
-        model.y = RangeSet(min(model_data.years), min(max(model_data.years), Config.DEFAULT_END_YEAR))
+        first_year, last_year = min(model_data.years), min(max(model_data.years), Config.DEFAULT_END_YEAR)
+        if horizon is not None:
+            first_year, last_year = max(first_year, horizon[0]), min(last_year, horizon[1])
+        model.y = RangeSet(first_year, last_year)
         model.t = Set(initialize=model_data.time_blocks)
         # print("Sets:===========")
         # model.t.pprint()
@@ -60,169 +198,147 @@ def build_model(model_data, scenario, price_scenario):
         model.p = Set(initialize=[price_scenario])
         
         # Parameters
-        model.GenData = Param(model.g, initialize=model_data.gen_data.to_dict('index'))
+        # All plant/year/block parameters are computed as dense arrays up front
+        params = precompute_parameters(model_data, list(model.y))
+        g_idx, y_idx, t_idx = params.plants, params.years, params.time_blocks
+        pos = params.position  # plant name -> plant id, rules index the arrays by position
+        availability = tech_availability_of(model_data)
+        model._params = params
+        model._availability = availability
+        # NEW: Capacity at the start of the first model year (nameplate unless carried over from an earlier horizon)
+        start_capacity = params.total_capacity.copy()
+        for g, capacity in (initial_capacity or {}).items():
+            start_capacity[pos[g]] = capacity
+        model._retargetable = retargetable
+
+        # NEW: Price scenarios with a prebuilt objective. A re-targetable model keeps every price scenario the
+        # data supports and activates one objective at a time (see retarget_model)
+        price_regimes = [price_scenario]
+        if retargetable:
+            price_regimes += [p for p in available_price_scenarios(params) if p != price_scenario]
+        model.price_regimes = Set(initialize=price_regimes, ordered=True)
+
+        model.CAP0 = Param(model.g, initialize=as_param_dict(params.total_capacity, g_idx))
         # Removed: Price_gen is no longer used, replaced by PriceGenTech
         # model.Price_gen = Param(model.y, initialize=model_data.price_gen.to_dict('index'))
-        model.Price_Dist = Param(model.y, model.t, initialize=model_data.price_dist.stack().to_dict())
-        model.Price_dur = Param(
-            model.t, 
-            initialize=lambda model, t: model_data.price_dur.loc[t, "PercentTime"] 
-            # if t in model_data.price_dur.index else 0
-            )
+        model.Price_Dist = Param(model.y, model.t, initialize={
+            k: v for k, v in as_param_dict(params.price_dist, y_idx, t_idx).items() if not pd.isna(v)})
+        model.Price_dur = Param(model.t, initialize=as_param_dict(params.price_dur, t_idx))
         # Technology-specific parameters
         model.TechParams = Param(
             model_data.tech_params.index.tolist(), 
             model_data.tech_params.columns.tolist(),
-            initialize=lambda model, tech, param: model_data.tech_params.loc[tech, param] 
-            if (tech in model_data.tech_params.index) and (param in model_data.tech_params.columns) else 0
+            initialize={
+                (tech, param): value
+                for tech, row in model_data.tech_params.to_dict('index').items()
+                for param, value in row.items()
+            }
             )
         
-        model.FC_PPA = Param(
-            model.g, model.y, 
-            initialize=lambda model, g, y: model_data.fc_ppa.loc[g, str(y)] 
-            if g in model_data.fc_ppa.index and str(y) in model_data.fc_ppa.columns else Config.DEFAULT_FC_PPA_VALUE
-            )#possible error here: 'HARDUAGANJ'
+        model.FC_PPA = Param(model.g, model.y, initialize=as_param_dict(params.fc_ppa, g_idx, y_idx))
         
-        # Helper to read GenData with fallback keys
-        def row_get(g, keys, default=None):
-            row = model.GenData[g]
-            for k in keys:
-                try:
-                    if k in row:
-                        return row[k]
-                except Exception:
-                    continue
-            if default is not None:
-                return default
-            raise ValueError(f"None of the keys {keys} found for plant {g}")
-
         # Define price_Dist1 parameter, this parameter is used classify different price scenarios
-        def price_dist1_init(model, y, p, t):
-            """
-            Initialize the price distribution parameter based on the price scenario.
-
-            Returns: float: The price distribution value based on the scenario.
-            """
-            if p == "MarketPrice":
-                return model.Price_Dist[y, t]  #  GAMS Price_Dist(y, t)
-            elif p == "AvgPPAPrice":
-                return 1  # NEW: Using 1 for AvgPPAPrice scenario (was hardcoded)
-            else:
-                raise NameError(f"Invalid price scenario: {p}")
-
-        model.Price_Dist1 = Param(model.y, model.p, model.t, initialize=price_dist1_init)
+        model.Price_Dist1 = Param(
+            model.y, model.price_regimes, model.t,
+            initialize=as_param_dict(np.stack([params.price_dist1(p) for p in price_regimes], axis=1),
+                                     y_idx, price_regimes, t_idx)
+            )
         # model.Price_Dist1.pprint()
         
         # NEW: Technology set and plant mapping by technology
         model.tech = Set(initialize=model_data.technologies)
-        model.plants_by_tech = Set(model.tech, initialize=lambda model, tech: [g for g in model.g if row_get(g, ["TECHNOLOGY", "Plant Type"]) == tech])
+        model.plants_by_tech = Set(model.tech, initialize=lambda model, tech: [g_idx[i] for i in plant_table_of(model_data).plants_of(tech)])
         
         # NEW: Per-technology generation targets (by year) for selected scenario
-        # Build a dict mapping (year, tech) -> target value
-        # price_gen index must be Technology_Scenario (e.g. PWRCOA001_BAU) or just Technology (same target for all scenarios)
-        price_gen_by_tech_year = {}
-        if hasattr(model_data, "price_gen") and not model_data.price_gen.empty:
-            for idx in model_data.price_gen.index:
-                idx_str = str(idx).strip()
-                tech_key = None
-                if idx_str.endswith(f"_{scenario}"):
-                    tech_key = idx_str[:-len(f"_{scenario}")]
-                elif scenario == "BAU" and idx_str.endswith("_BAU"):
-                    tech_key = idx_str[:-4]
-                elif "_" not in idx_str and idx_str in model_data.technologies:
-                    # Excel has only Technology column (no Scenario): use for all scenarios
-                    tech_key = idx_str
-                if tech_key is None:
-                    continue
-                for y in model_data.years:
-                    if y in model_data.price_gen.columns:
-                        val = model_data.price_gen.at[idx, y]
-                        if pd.notna(val):
-                            price_gen_by_tech_year[(y, tech_key)] = float(val)
-        model.PriceGenTech = Param(model.y, model.tech, initialize=price_gen_by_tech_year, default=0)
+        price_gen_by_tech_year = {(y, tech): v for (y, tech), v in technology_targets(model_data, scenario).items()
+                                  if y in model.y}
+        model.PriceGenTech = Param(model.y, model.tech, initialize=price_gen_by_tech_year, default=0,
+                                   mutable=retargetable)
         
         # We now compute those derived Parameters
-        def discount_rate_init(model, y):
-            """Calculate the discount rate for a given year."""
-            # Use a default technology for global discount rate (assuming all technologies have same rate)
-            default_tech = list(model_data.tech_params.index)[0]  # Use first technology as default
-            return 1 / (1 + model.TechParams[default_tech, "DiscountRate"]) ** (y - Config.BASE_YEAR)
+        model.DR = Param(model.y, initialize=as_param_dict(params.discount, y_idx), domain=NonNegativeReals)
+        model.life = Param(model.g, initialize=as_param_dict(params.life, g_idx), domain=NonNegativeIntegers)
+        model.cost = Param(model.g, model.y, initialize=as_param_dict(params.cost, g_idx, y_idx), domain=NonNegativeReals)
 
-        model.DR = Param(model.y, initialize=discount_rate_init, domain=NonNegativeReals)
-        
-        def initialize_life(model, g):
-            """Calculate the life of the plant based on its start year."""
-            start_year = row_get(g, ["STARTYEAR", "Start Year"])            
-            if start_year > Config.BASE_YEAR:
-                return 0  # For plants that haven't started yet
-            return Config.BASE_YEAR - start_year
-
-        model.life = Param(model.g, initialize=initialize_life, domain=NonNegativeIntegers)
-        
-        def initialize_cost(model, g, y):
-            """Initialize the cost parameter based on the plant's age and technology."""
-            # Get cost value, handling both 'COST' and 'VARIABLE COST' column names
-            cost = row_get(g, ["COST", "VARIABLE COST", "Variable Cost ($/MWh)"])
-            if cost is None:
-                raise ValueError(f"Neither 'COST' nor 'VARIABLE COST' found for plant {g}")
-            
-            # Get the technology type for this plant
-            tech_type = row_get(g, ["TECHNOLOGY", "Plant Type"])            
-            
-            if model.life[g] < Config.YOUNG_PLANT_THRESHOLD:
-                return cost * (1 + model.TechParams[tech_type, "CostEsc_Lessthan10"]) ** (y - Config.BASE_YEAR)
-            elif model.life[g] <= Config.OLD_PLANT_THRESHOLD:
-                return cost * (1 + model.TechParams[tech_type, "CostEsc_10-30years"]) ** (y - Config.BASE_YEAR)
-            else:
-                return cost * (1 + model.TechParams[tech_type, "CostEsc_30plus"]) ** (y - Config.BASE_YEAR)
 
-        model.cost = Param(model.g, model.y, initialize=initialize_cost, domain=NonNegativeReals)
+        # NEW: Decision years. Every model year by default, otherwise the representative years, each standing
+        # for the model years up to the next one (its block). Params stay annual so results can be expanded.
+        if representative_years is None:
+            rep_years = list(y_idx)
+        else:
+            rep_years = sorted((set(representative_years) & set(y_idx)) | {y_idx[0]})
+        model.y_rep = Set(initialize=rep_years, ordered=True)
+        model._year_map = year_blocks(y_idx, rep_years)
+        rep_pos = [y - y_idx[0] for y in rep_years]  # position of each representative year in y_idx
 
+        # Sparse index sets: Cap/Retire exist only until the plant exceeds MaxLife, Gen only while it is operating.
+        # Expired plant-years are fully determined (Cap = FIXED_CAPACITY_EXPIRED, Gen = 0), so they are never created.
+        alive = ~params.expired
+        model.gy = Set(dimen=2, ordered=True, initialize=[
+            (g_idx[i], rep_years[j]) for i, j in zip(*np.nonzero(alive[:, rep_pos]))])
+        # With identical block prices only the duration-weighted generation matters, so Gen is
+        # dispatched at one level per plant-year in a single block covering the whole year
+        uniform = all(params.uniform_blocks(p) for p in price_regimes)
+        model._annual_dispatch = (collapse_blocks and uniform) or revenue_curve
+        # NEW: With different block prices the annual level is valued through the plant-year revenue curve
+        model._revenue_curve = revenue_curve and not uniform
+        if model._annual_dispatch:
+            dispatch_blocks, dur = [Config.ANNUAL_DISPATCH_BLOCK], [float(params.price_dur.sum())]
+        else:
+            dispatch_blocks, dur = t_idx, params.price_dur.tolist()
+        operating = params.operating[:, rep_pos]
+        model.gyt = Set(dimen=3, ordered=True, initialize=[
+            (g_idx[i], rep_years[j], t) for i, j in zip(*np.nonzero(operating)) for t in dispatch_blocks])
+        years_of = {g: [] for g in g_idx}  # plant -> years in which Cap/Retire exist
+        for g, y in model.gy:
+            years_of[g].append(y)
 
         # Variables
-        def calculate_generation_bounds(model, g, y, t):
-            '''
-            This function is used to set the bounds for the 'generation' variable, model.Gen
-            '''
-            # Get the technology type for this plant
-            tech_type = row_get(g, ["TECHNOLOGY", "Plant Type"])            
-            max_life = model.TechParams[tech_type, "MaxLife"]
-            start_year = row_get(g, ["STARTYEAR", "Start Year"])            
-            
-            # If plant hasn't started yet or has exceeded max life, set generation to 0
-            if y < start_year or (y + model.life[g] - Config.BASE_YEAR) > max_life:
-                return (0, 0)
-            else:
-                return (0, row_get(g, ["CAPACITY", "Capacity (MW)"]))
-
-        model.Gen = Var(model.g, model.y, model.t, domain=NonNegativeReals,bounds=calculate_generation_bounds)
-        model.Cap = Var(model.g, model.y, domain=NonNegativeReals)
-        model.Retire = Var(model.g, model.y, domain=Binary)
+        # Generation is up to capacity while the plant operates
+        model.Gen = Var(model.gyt, domain=NonNegativeReals,
+                        bounds={(g, y, t): (0, params.total_capacity[pos[g]]) for g, y, t in model.gyt})
+        if not cumulative_retirement:
+            model.Cap = Var(model.gy, domain=NonNegativeReals)
+        if params.clustered:
+            # NEW: A cluster of identical units retires an integer number of units per year
+            model.Retire = Var(model.gy, domain=NonNegativeIntegers,
+                               bounds={(g, y): (0, params.units[pos[g]]) for g, y in model.gy})
+        else:
+            model.Retire = Var(model.gy, domain=Binary)
         model.TotNetRev = Var(domain=Reals)
+        model._clusters = getattr(model_data, "clusters", None)  # cluster name -> unit names
+
+        # NEW: Capacity kept in a decision year as (constant, coefficients, variables). With cumulative
+        # retirement it is CAP0 - capacity * (retirements up to y), which MaxRetire keeps non-negative.
+        retire_of = {g: [model.Retire[g, y] for y in years_of[g]] for g in g_idx} if cumulative_retirement else {}
+        rank = {(g, y): k for g in g_idx for k, y in enumerate(years_of[g])}  # position of y in years_of[g]
+
+        def cap_terms(g, y):
+            if not cumulative_retirement:
+                return 0.0, [1.0], [model.Cap[g, y]]
+            retired = retire_of[g][:rank[g, y] + 1]
+            return start_capacity[pos[g]], [-params.capacity[pos[g]]] * len(retired), retired
+
+        def cap_expression(g, y, scale=1.0):
+            """Coefficients, variables and constant of scale * Cap[g,y]."""
+            constant, coefs, variables = cap_terms(g, y)
+            return [c * scale for c in coefs], variables, constant * scale
+
+        if cumulative_retirement:
+            model.Cap = Expression(model.gy, rule=lambda model, g, y: linear_expression(*cap_expression(g, y)))
             
-        for g in model.g:
-            for y in model.y:
-                tech_type = row_get(g, ["TECHNOLOGY", "Plant Type"])                
-                if y + model.life[g] - Config.BASE_YEAR > model.TechParams[tech_type, 'MaxLife']:
-                    model.Cap[g, y].fix(Config.FIXED_CAPACITY_EXPIRED)
         # for g in model.g:
         #     if 2021 + model.life[g] - 2021 < model.Other["MaxLife", "Value"]:
         #         model.Retire[g, 2021].fix(0)     
 
-        def rev_unit_init(model, g, y, price_scenario):
-            '''
-            Here we initialize the revenue unit of generation based on the price scenario
-            '''
-            if price_scenario == "MarketPrice":
-                return row_get(g, ["MarketPrice", "Market Price ($/MWh)"])
-            elif price_scenario == "AvgPPAPrice":
-                return row_get(g, ["AvgPPAPrice", "AvgPPAPrice ($/MWh)"])
-            else:
-                raise NameError(f"Invalid price scenario: {price_scenario}")
-
+        if price_scenario not in params.rev_unit:
+            raise ValueError(f"No {price_scenario} column found in plant data")
         model.rev_unit = Param(
-            model.g, model.y, model.p,
-            initialize=rev_unit_init,
+            model.g, model.y, model.price_regimes,
+            initialize=as_param_dict(
+                np.broadcast_to(np.stack([params.rev_unit[p] for p in price_regimes], axis=1)[:, None, :],
+                                (len(g_idx), len(y_idx), len(price_regimes))),
+                g_idx, y_idx, price_regimes),
             within=NonNegativeReals
             )
         # print(model.GenData["UDUPI"])
@@ -246,74 +362,136 @@ def build_model(model_data, scenario, price_scenario):
         # Removed: global generation equality to undefined Price_gen totals
         # model.MaxCoalGen = Constraint(model.y, rule=max_coal_gen_rule)
         # print("OFFPEAK",model.Price_dur['Offpeak1'])
+        # Every per-plant row is a single LinearExpression built from the coefficient arrays
+        twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS  # MW over a year -> TWh
+
+        # Objective weights of each decision year (see objective_arrays)
+        model._objective_arrays = {p: objective_arrays(params, rep_pos, p) for p in price_regimes}
+        block_margin = model._objective_arrays[price_scenario][0]
+
+        # Right-hand sides of the technology rows (see row_targets). A re-targetable model has a row for every
+        # technology-year with plants, with a mutable right-hand side, and deactivates the rows without a target.
+        block_years = {y: [yy for yy in y_idx if model._year_map[yy] == y] for y in rep_years}
+        rep_goal, rep_min_capacity, rep_block_min, model._gen_goal_capped, model._min_cap_capped = row_targets(
+            model, availability)
+        if retargetable:
+            model.TechGenGoalRHS = Param(model.y_rep, model.tech, default=0, mutable=True)
+            model.MinCapacityRHS = Param(model.y_rep, model.tech, default=0, mutable=True)
+            model.BlockMinGenRHS = Param(model.y_rep, model.tech, default=0, mutable=True)
+
+        def annual_gen(g, y, scale=1.0):
+            """Coefficients and variables of sum_t Gen[g,y,t] * Price_dur[t] * scale (empty when not operating)."""
+            if not params.operating[pos[g], y - y_idx[0]]:
+                return [], []
+            return [d * scale for d in dur], [model.Gen[g, y, t] for t in dispatch_blocks]
+
         # Minimum PLF
         def min_plf_rule(model, g, y):
             """
             This function is used to set the MINIMUM PLF rule
             """
-            tech_type = row_get(g, ["TECHNOLOGY", "Plant Type"])            
-            return sum(
-            model.Gen[g, y, t] * model.Price_dur[t] #* Config.HOURS_PER_YEAR / Config.USD_TO_THOUSANDS
-            for t in model.t
-        ) >= model.Cap[g, y] * model.TechParams[tech_type, "MinPLF"]#* Config.HOURS_PER_YEAR / Config.USD_TO_THOUSANDS            
-        model.MinPLF = Constraint(model.g, model.y, rule=min_plf_rule)
+            coefs, variables = annual_gen(g, y)
+            if not variables and params.min_plf[pos[g]] <= 0:
+                return Constraint.Skip
+            cap_coefs, cap_vars, constant = cap_expression(g, y, -params.min_plf[pos[g]])
+            return linear_expression(coefs + cap_coefs, variables + cap_vars, constant) >= 0
+        model.MinPLF = Constraint(model.gy, rule=min_plf_rule)
         # Maximum PLF
         def max_plf_rule(model, g, y):
             """
             This function is used to set the MAXIMUM PLF rule
             """
-            tech_type = row_get(g, ["TECHNOLOGY", "Plant Type"])            
-            return sum(
-            model.Gen[g, y, t] * model.Price_dur[t] * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
-            for t in model.t
-        ) <= model.Cap[g, y] * model.TechParams[tech_type, "MaxPLF"]* Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
-            
-        model.MaxPLF = Constraint(model.g, model.y, rule=max_plf_rule)
+            coefs, variables = annual_gen(g, y, twh_per_mw)
+            if not variables:
+                return Constraint.Skip  # Cap >= 0 already satisfies it
+            cap_coefs, cap_vars, constant = cap_expression(g, y, -params.max_plf[pos[g]] * twh_per_mw)
+            return linear_expression(coefs + cap_coefs, variables + cap_vars, constant) <= 0
+        model.MaxPLF = Constraint(model.gy, rule=max_plf_rule)
         
+        # Revenue curve: GenRev(g,y) is bounded by one line per block segment of the concave revenue function
+        # of the annual energy Price_dur * Gen (see model_parameters.revenue_curve)
+        if model._revenue_curve:
+            if params.clustered:
+                raise ValueError("The revenue curve dispatch cannot be combined with plant clustering")
+            model._curve_margin = np.zeros((len(g_idx), len(y_idx), len(t_idx)))
+            model._curve_margin[:, rep_pos] = block_margin  # indexed like the annual arrays
+            op_plants, op_years = np.nonzero(operating)
+            slopes, intercepts = build_revenue_curve(
+                block_margin[operating], params.price_dur, params.capacity[op_plants])
+            model.gy_op = Set(dimen=2, ordered=True, initialize=[
+                (g_idx[i], rep_years[j]) for i, j in zip(op_plants, op_years)])
+            op_row = {gy: row for row, gy in enumerate(model.gy_op)}
+            model.GenRev = Var(model.gy_op, domain=Reals)
+
+            def revenue_curve_rule(model, g, y, k):
+                row = op_row[g, y]
+                if k > 0 and slopes[row, k] == slopes[row, k - 1]:
+                    return Constraint.Skip  # blocks with equal margins share one segment
+                return linear_expression(
+                    [1.0, -slopes[row, k] * dur[0]],
+                    [model.GenRev[g, y], model.Gen[g, y, Config.ANNUAL_DISPATCH_BLOCK]]) <= intercepts[row, k]
+            model.RevenueCurve = Constraint(model.gy_op, range(len(t_idx)), rule=revenue_curve_rule)
+
         # Per-technology generation goal (capped at max achievable when target exceeds fleet capability)
-        model._gen_goal_capped = []  # records where target exceeds max achievable generation
         def tech_generation_goal_rule(model, y, tech):
             if not any(True for _ in model.plants_by_tech[tech]):
                 return Constraint.Skip
-            if (y, tech) not in model.PriceGenTech or model.PriceGenTech[y, tech] <= 0:
+            if (y, tech) not in rep_goal and not retargetable:
                 return Constraint.Skip
-            max_possible_cap = 0.0
+            coefs, variables = [], []
             for g in model.plants_by_tech[tech]:
-                start_y = row_get(g, ["STARTYEAR", "Start Year"])
-                if start_y <= y and (y - start_y) <= model.TechParams[tech, "MaxLife"]:
-                    max_possible_cap += row_get(g, ["CAPACITY", "Capacity (MW)"])
-            max_gen_twh = max_possible_cap * Config.HOURS_PER_YEAR * model.TechParams[tech, "MaxPLF"] / Config.USD_TO_MILLIONS
-            target_twh = model.PriceGenTech[y, tech]
-            effective_target = min(target_twh, max_gen_twh)
-            if target_twh > max_gen_twh:
-                model._gen_goal_capped.append({
-                    "Year": y, "Technology": tech,
-                    "Target_TWh": round(target_twh, 4),
-                    "MaxPossible_TWh": round(max_gen_twh, 4),
-                    "Note": "Target exceeds max achievable generation",
-                })
-            return quicksum(
-                quicksum(model.Gen[g, y, t] * model.Price_dur[t] for t in model.t)
-                for g in model.plants_by_tech[tech]
-            ) * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS == effective_target
-        model.TechGenGoal = Constraint(model.y, model.tech, rule=tech_generation_goal_rule)
+                plant_coefs, plant_vars = annual_gen(g, y, twh_per_mw)
+                coefs += plant_coefs
+                variables += plant_vars
+            if not variables:
+                if retargetable:
+                    return Constraint.Skip  # checked against the targets by apply_row_targets
+                return Constraint.Feasible if rep_goal[y, tech] <= 0 else Constraint.Infeasible
+            target = model.TechGenGoalRHS[y, tech] if retargetable else rep_goal[y, tech]
+            return linear_expression(coefs, variables) == target
+        model.TechGenGoal = Constraint(model.y_rep, model.tech, rule=tech_generation_goal_rule)
+
+        # Representative years only: minimum generation of the capacity kept over a block <= its smallest target
+        def tech_block_min_gen_rule(model, y, tech):
+            if (y, tech) not in rep_block_min and not (retargetable and len(block_years[y]) > 1):
+                return Constraint.Skip
+            plants = [g for g in model.plants_by_tech[tech] if (g, y) in model.gy and params.min_plf[pos[g]] > 0]
+            if not plants:
+                return Constraint.Skip
+            coefs, variables, constant = [], [], 0.0
+            for g in plants:
+                cap_coefs, cap_vars, cap_constant = cap_expression(g, y, params.min_plf[pos[g]] * twh_per_mw)
+                coefs += cap_coefs
+                variables += cap_vars
+                constant += cap_constant
+            limit = model.BlockMinGenRHS[y, tech] if retargetable else rep_block_min[y, tech]
+            return linear_expression(coefs, variables, constant) <= limit
+        model.TechBlockMinGen = Constraint(model.y_rep, model.tech, rule=tech_block_min_gen_rule)
         
         # Capacity Balance
         def capacity_balance_rule(model, g, y):
             """
             This function is used to set the CAPACITY BALANCE rule
             """
-            if y > Config.BASE_YEAR:
-                return model.Cap[g, y] == model.Cap[g, y-1] - model.Retire[g, y] * row_get(g, ["CAPACITY"])
+            if y != model.y_rep.first() and (g, model.y_rep.prev(y)) in model.gy:
+                return linear_expression(
+                    [1.0, -1.0, params.capacity[pos[g]]],
+                    [model.Cap[g, y], model.Cap[g, model.y_rep.prev(y)], model.Retire[g, y]]) == 0
             else:
                 return Constraint.Skip
-        model.CapBal = Constraint(model.g, model.y, rule=capacity_balance_rule)
+        if not cumulative_retirement:
+            model.CapBal = Constraint(model.gy, rule=capacity_balance_rule)
         
         def capacity_balance_rule1(model,g):
-            cap0 = row_get(g, ["CAPACITY"])
-            return model.Cap[g, Config.BASE_YEAR] == cap0 - model.Retire[g, Config.BASE_YEAR]* cap0
+            first_year = model.y_rep.first()
+            if (g, first_year) not in model.gy:
+                return Constraint.Skip  # already expired in the first year
+            cap0 = start_capacity[pos[g]]
+            return linear_expression(
+                [1.0, params.capacity[pos[g]]], [model.Cap[g, first_year], model.Retire[g, first_year]]) == cap0
         
-        model.CapBal1 = Constraint(model.g, rule=capacity_balance_rule1)
+        if not cumulative_retirement:
+            model.CapBal1 = Constraint(model.g, rule=capacity_balance_rule1)
 
         
         # Retire Plants
@@ -321,88 +499,108 @@ def build_model(model_data, scenario, price_scenario):
             """
             This function is used to set the MAXIMUM RETIRE rule
             """
-            return sum(
-                model.Retire[g, y] for y in model.y
-            ) <= Config.MAX_RETIREMENTS_PER_PLANT
+            if not years_of[g]:
+                return Constraint.Skip
+            return linear_expression(
+                [1.0] * len(years_of[g]), [model.Retire[g, y] for y in years_of[g]]
+            ) <= Config.MAX_RETIREMENTS_PER_PLANT * params.units[pos[g]]
         model.MaxRetire = Constraint(model.g, rule=max_retire_rule)
 
+        # Clusters: generation in each block is limited by the capacity of the units still in service
+        # (a single unit is kept to zero generation after retirement by MaxPLF)
+        def cluster_gen_cap_rule(model, g, y, t):
+            if params.units[pos[g]] <= 1:
+                return Constraint.Skip
+            cap_coefs, cap_vars, constant = cap_expression(g, y, -1.0)
+            return linear_expression([1.0] + cap_coefs, [model.Gen[g, y, t]] + cap_vars, constant) <= 0
+        if params.clustered:
+            model.ClusterGenCap = Constraint(model.gyt, rule=cluster_gen_cap_rule)
+
         # Minimum capacity per technology and year (capped at max possible to avoid infeasibility)
-        model._min_cap_capped = []  # list of {year, tech, required_MW, max_possible_MW} where min capacity could not be fully satisfied
         def min_capacity_tech_rule(model, y, tech):
             """
             Ensure capacity >= min(required_capacity, max_possible). Record when required > max_possible.
             """
-            if (y, tech) not in model.PriceGenTech or model.PriceGenTech[y, tech] <= 0:
+            if (y, tech) not in rep_min_capacity and not retargetable:
                 return Constraint.Skip
             if not any(True for _ in model.plants_by_tech[tech]):
                 return Constraint.Skip
-            required_capacity = (
-                model.PriceGenTech[y, tech]
-                * Config.TWH_TO_MWH
-                / (Config.HOURS_PER_YEAR * Config.MAX_LOAD_FACTOR)
-            )
-            max_possible = 0.0
-            for g in model.plants_by_tech[tech]:
-                start_y = row_get(g, ["STARTYEAR", "Start Year"])
-                if start_y <= y and (y - start_y) <= model.TechParams[tech, "MaxLife"]:
-                    max_possible += row_get(g, ["CAPACITY", "Capacity (MW)"])
-            effective = min(required_capacity, max_possible)
-            if required_capacity > max_possible:
-                model._min_cap_capped.append({
-                    "Year": y, "Technology": tech,
-                    "Required_MW": round(required_capacity, 2),
-                    "MaxPossible_MW": round(max_possible, 2),
-                    "Note": "Minimum capacity requirement exceeds max possible capacity",
-                })
-            return sum(model.Cap[g, y] for g in model.plants_by_tech[tech]) >= effective
-        model.MinCapacityTech = Constraint(model.y, model.tech, rule=min_capacity_tech_rule)
+            plants = [g for g in model.plants_by_tech[tech] if (g, y) in model.gy]
+            if not plants:
+                if retargetable:
+                    return Constraint.Skip  # checked against the targets by apply_row_targets
+                return Constraint.Feasible if rep_min_capacity[y, tech] <= 0 else Constraint.Infeasible
+            coefs, variables, constant = [], [], 0.0
+            for g in plants:
+                cap_coefs, cap_vars, cap_constant = cap_expression(g, y)
+                coefs += cap_coefs
+                variables += cap_vars
+                constant += cap_constant
+            required = model.MinCapacityRHS[y, tech] if retargetable else rep_min_capacity[y, tech]
+            return linear_expression(coefs, variables, constant) >= required
+        model.MinCapacityTech = Constraint(model.y_rep, model.tech, rule=min_capacity_tech_rule)
+        if retargetable:
+            apply_row_targets(model)
         
         # Define objective function
-        # print("DR:::::")
-        # model.DR.pprint()
-        # model.Price_dur.pprint()
-        def objective_rule(model):
-            """
-            This function is used to set the OBJECTIVE function
-            """
-            total_objective = 0
+        # Discounted margin of each Gen[g,y,t] and fixed cost of each plant-year, in $m
+        def objective_terms(price):
+            """Dispatch terms, fixed cost on the kept capacity (AD) and fixed cost on nameplate (BAU) of a price."""
+            block_margin, fixed_coef, block_fixed_coef = model._objective_arrays[price]
+            gen_coef = block_margin * params.price_dur[None, None, :] * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+            if model._annual_dispatch:
+                gen_coef = gen_coef.sum(axis=2, keepdims=True)
+            if model._revenue_curve:
+                # The (discounted) block margins are valued through GenRev, Gen only sets the annual energy
+                coefs = [Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS] * len(model.GenRev)
+                variables = list(model.GenRev.values())
+            else:
+                coefs = gen_coef[operating].ravel().tolist()
+                variables = list(model.Gen.values())
+            # Fixed cost is paid on the capacity that is kept
+            # (expired plant-years have zero capacity and contribute nothing)
+            kept_coef = block_fixed_coef[alive[:, rep_pos]].tolist()
+            if cumulative_retirement:
+                # A retirement in year k removes its capacity from every later kept year:
+                # coefficient of Retire[g,k] = -capacity * sum_{y>=k} fixed_coef[g,y]
+                kept_constant = float((block_fixed_coef * alive[:, rep_pos] * start_capacity[:, None]).sum())
+                later = dict(zip(model.gy, kept_coef))
+                kept_coefs, kept_vars = [], []
+                for g in model.g:
+                    remaining = 0.0
+                    for k in reversed(years_of[g]):
+                        remaining += later[g, k]
+                        kept_coefs.append(-params.capacity[pos[g]] * remaining)
+                        kept_vars.append(model.Retire[g, k])
+            else:
+                kept_constant, kept_coefs, kept_vars = 0.0, kept_coef, list(model.Cap.values())
+            # Fixed cost is paid on nameplate capacity
+            nameplate_constant = float((fixed_coef * params.total_capacity[:, None]).sum())
+            return (coefs, variables), (kept_coefs, kept_vars, kept_constant), nameplate_constant
 
-            for y in model.y:
-                year_contribution =  0
+        # Objective value of a MW kept in each decision year, beside its dispatch margins (used by the presolve)
+        set_objective_weights(model, scenario, price_scenario)
+        ad_scenarios = [s for s in model_data.scenarios.keys() if s != "BAU"]
+        if retargetable:
+            # One objective per price scenario; FixedCostOnCapacity selects the AD or BAU fixed cost
+            model.FixedCostOnCapacity = Param(initialize=1 if scenario in ad_scenarios else 0, mutable=True)
 
-                # Calculate the first part of the objective function
-                capacity = 0
-                cost_per_mw= 0
-                cost = 0 
-                for g in model.g:
-                    ad_scenarios = [s for s in model_data.scenarios.keys() if s != "BAU"]
-                    if scenario in ad_scenarios:
-                        capacity = model.Cap[g, y]
-                    elif scenario == "BAU":
-                        capacity = row_get(g, ["CAPACITY"])
-                
-                    if price_scenario == "AvgPPAPrice":
-                        cost_per_mw = model.FC_PPA[g, y]/Config.USD_TO_THOUSANDS
-                    elif price_scenario == "MarketPrice":
-                        cost_per_mw = Config.DEFAULT_COST_PER_MW_MarketPrice
-                    # cost+=cost_per_mw * capacity
-                # year_contribution += -(capacity_sum * price_sum)  # to billion dollars
-                    contract_price = row_get(g, ["ContractPriceMW"], 0.0)
-                    cost += (cost_per_mw - contract_price) * capacity/1e6
-
-                # Calculate the second part of the objective function
-                revenue_sum = 0
-                for g in model.g:
-                    for t in model.t:
-                        revenue_sum +=  (model.rev_unit[g, y, price_scenario] *model.Price_Dist1[y, price_scenario, t]- 
-                                        model.cost[g, y])* model.Gen[g, y, t] * model.Price_dur[t]
-                        # print(t, model.Gen[g, y, t].value, model.Price_dur[t],model.Price_Dist1[y, price_scenario, t])
-                # year_contribution += # to billion dollars
-                
-                total_objective += model.DR[y]*(revenue_sum*Config.HOURS_PER_YEAR -cost)
-            
-            return total_objective/1e6
-        model.Obj = Objective(rule=objective_rule,sense=maximize)
+            def objective_rule(model, price):
+                (coefs, variables), (kept_coefs, kept_vars, kept_constant), nameplate_constant = objective_terms(price)
+                return (linear_expression(coefs, variables)
+                        + model.FixedCostOnCapacity * linear_expression(kept_coefs, kept_vars, kept_constant)
+                        + (1 - model.FixedCostOnCapacity) * nameplate_constant)
+            model.Obj = Objective(model.price_regimes, rule=objective_rule, sense=maximize)
+            for price in price_regimes[1:]:
+                model.Obj[price].deactivate()
+        else:
+            (coefs, variables), (kept_coefs, kept_vars, kept_constant), nameplate_constant = objective_terms(
+                price_scenario)
+            if scenario in ad_scenarios:
+                coefs, variables, constant = coefs + kept_coefs, variables + kept_vars, kept_constant
+            else:
+                constant = nameplate_constant
+            model.Obj = Objective(expr=linear_expression(coefs, variables, constant), sense=maximize)
 
         return model
     
@@ -443,8 +641,186 @@ def setup_argument_parser():
                        help='Generate intermediate AD scenarios only when explicitly requested.')
     parser.add_argument('--solver-tee', action='store_true',
                        help='Show detailed solver output (disabled by default).')
+    parser.add_argument('--revenue-curve', action='store_true',
+                       help='Replace the time-block dispatch with one annual-energy variable per plant-year '
+                            'and its concave revenue curve (smaller MarketPrice models).')
+    parser.add_argument('--representative-years', type=int, nargs=2, default=None,
+                       metavar=('ANNUAL_UNTIL', 'STEP'),
+                       help='Solve every year up to ANNUAL_UNTIL, then one representative year every STEP years '
+                            '(e.g. 2035 5). Results are expanded to annual series.')
+    parser.add_argument('--refine-annual', action='store_true',
+                       help='With --representative-years, re-solve the dispatch at annual resolution '
+                            'with the retirement schedule fixed.')
+    parser.add_argument('--cumulative-retirement', action='store_true',
+                       help='Write capacity as nameplate minus cumulative retirements instead of Cap variables '
+                            'and capacity balance rows.')
+    parser.add_argument('--presolve', type=str, nargs='+', default=[], choices=PRESOLVE_STEPS,
+                       help='Presolve steps applied before the solve: gen-cap (Gen <= Cap in every block), '
+                            'implied-bounds (Cap/Gen bounds from MaxPLF and the technology targets), '
+                            'cover-cuts (minimum number of units kept per technology-year), '
+                            'dominance (fix retirements decided by the plant economics and targets).')
+    parser.add_argument('--presolve-report', action='store_true',
+                       help='Solve the LP relaxation before and after the presolve and report the root gap.')
+    parser.add_argument('--scale-units', type=str, nargs=3, default=None, metavar=('ENERGY', 'MONEY', 'CAPACITY'),
+                       help='Rescale the model sent to the solver to these units, e.g. TWh mUSD GW. '
+                            f'Energy: {", ".join(Config.SCALE_ENERGY_UNITS)}; '
+                            f'money: {", ".join(Config.SCALE_MONEY_UNITS)}; '
+                            f'capacity: {", ".join(Config.SCALE_CAPACITY_UNITS)}. Results keep model units.')
+    parser.add_argument('--cluster-plants', action='store_true',
+                       help='Aggregate near-identical units into clusters retired an integer number of units '
+                            'at a time. Results are reported per unit.')
+    parser.add_argument('--cluster-capacity-tol', type=float, default=Config.CLUSTER_CAPACITY_TOLERANCE,
+                       help='Relative capacity difference allowed within a cluster (default: exact match).')
+    parser.add_argument('--cluster-cost-tol', type=float, default=Config.CLUSTER_COST_TOLERANCE,
+                       help='Relative variable cost difference allowed within a cluster (default: exact match).')
+    parser.add_argument('--retarget', action='store_true',
+                       help='Build the model once and re-target it to every scenario and price scenario instead of '
+                            'rebuilding it (not combined with --presolve or --revenue-curve).')
+    parser.add_argument('--backend', type=str, default='pyomo', choices=['pyomo', 'matrix'],
+                       help='Model generator: pyomo (reference) or matrix (sparse arrays written as MPS and solved '
+                            'in memory with HiGHS; requires highspy).')
+    parser.add_argument('--check-backend', action='store_true',
+                       help='With --backend matrix, also build the Pyomo model and check that both models and '
+                            'their results are identical.')
+    parser.add_argument('--no-build-cache', action='store_true',
+                       help=f'Do not read or write the build cache of generated models ({Config.BUILD_CACHE_DIR}).')
+    parser.add_argument('--profile-build', action='store_true',
+                       help='Record the construction time, size and memory of each model component and the time '
+                            f'of each stage (build, LP write, solve) in {Config.BUILD_PROFILE_FILE} and the log.')
+    parser.add_argument('--lagrangian', action='store_true',
+                       help='Solve by Lagrangian relaxation of the technology rows (no MIP solver): reports a '
+                            'dual bound, a repaired feasible schedule and their duality gap.')
+    parser.add_argument('--lagrangian-iterations', type=int, default=Config.LAGRANGIAN_ITERATIONS,
+                       help='Maximum subgradient iterations of --lagrangian.')
+    parser.add_argument('--benders', action='store_true',
+                       help='Solve by Benders decomposition: a master MIP over the retirements with HiGHS and the '
+                            'dispatch of each year and technology valued in closed form.')
+    parser.add_argument('--benders-iterations', type=int, default=Config.BENDERS_ITERATIONS,
+                       help='Maximum master solves of --benders.')
+    parser.add_argument('--rolling-horizon', action='store_true',
+                       help='Solve overlapping windows of years in turn, keep the retirements of the first years '
+                            'of each window and stitch them into one schedule.')
+    parser.add_argument('--rolling-window', type=int, default=Config.ROLLING_WINDOW,
+                       help='Years solved together by --rolling-horizon.')
+    parser.add_argument('--rolling-commit', type=int, default=Config.ROLLING_COMMIT,
+                       help='Years of each --rolling-horizon window whose retirements are kept (the window '
+                            'length minus the overlap).')
+    parser.add_argument('--rolling-compare', action='store_true',
+                       help='Also solve the full model and report the gap of the --rolling-horizon schedule.')
+    parser.add_argument('--relax', action='store_true',
+                       help='Screening: solve the LP relaxation, round the retirements to a feasible schedule and '
+                            're-solve the dispatch; reports the LP bound and the gap of the rounded schedule.')
+    parser.add_argument('--anneal', action='store_true',
+                       help='Search retirement years by simulated annealing chains in parallel worker processes, '
+                            'started from the Lagrangian schedule (no MIP solver).')
+    parser.add_argument('--anneal-chains', type=int, default=Config.ANNEALING_CHAINS,
+                       help='Independent chains of --anneal and --anneal-mip-start.')
+    parser.add_argument('--anneal-iterations', type=int, default=Config.ANNEALING_ITERATIONS,
+                       help='Moves tried by each chain of --anneal and --anneal-mip-start.')
+    parser.add_argument('--anneal-workers', type=int, default=None,
+                       help='Worker processes for the annealing chains (default: one per chain, up to the CPU '
+                            'count).')
+    parser.add_argument('--anneal-mip-start', action='store_true',
+                       help='Start the MIP solve (pyomo or matrix backend) from the best simulated annealing '
+                            'schedule.')
+    parser.add_argument('--fast-path', action='store_true',
+                       help='Skip the retirement MIP of scenarios whose capacity has no objective weight (BAU) when '
+                            'keeping every plant is provably optimal; the dispatch is solved without --solver.')
+    parser.add_argument('--fast-path-gap', type=float, default=None,
+                       help='With --fast-path, also skip the retirement MIP when the best of keeping every plant and '
+                            'the Lagrangian schedule is within this relative gap of the Lagrangian bound.')
+    parser.add_argument('--decompose', action='store_true',
+                       help='Solve one sub-model per technology in parallel worker processes when no constraint '
+                            'links technologies (falls back to the whole model otherwise).')
+    parser.add_argument('--decompose-workers', type=int, default=None,
+                       help='Worker processes for --decompose (default: one per technology, up to the CPU count).')
     return parser
 
+def get_build_options(args, model_data=None):
+    """
+    Collect the build_model keyword options selected on the command line.
+
+    Parameters:
+    args: Parsed command line arguments
+    model_data: Initialized model data (needed for --representative-years)
+
+    Returns:
+    dict: Keyword arguments for build_model
+    """
+    options = {
+        'revenue_curve': getattr(args, 'revenue_curve', False),
+        'cumulative_retirement': getattr(args, 'cumulative_retirement', False),
+    }
+    if getattr(args, 'representative_years', None):
+        annual_until, step = args.representative_years
+        first_year = min(model_data.years)
+        last_year = min(max(model_data.years), Config.DEFAULT_END_YEAR)
+        options['representative_years'] = representative_years(first_year, last_year, annual_until, step)
+    return options
+
+def fix_retirements(model, schedule):
+    """
+    Fix every Retire variable of a model to a retirement schedule.
+
+    Parameters:
+    model (ConcreteModel): Model whose Retire variables are fixed
+    schedule (dict): Retirement by plant and year, as returned by calculate_retirement_schedule
+    """
+    for g, y in model.Retire:
+        model.Retire[g, y].fix(round(schedule[g][y]))
+
+def set_mip_start(model, matrix, x):
+    """
+    Set the variables of a model to a MatrixModel solution the MIP solver starts from; variables fixed by the
+    presolve keep their values.
+
+    Parameters:
+    model (ConcreteModel): Model built with the build options of matrix
+    matrix (MatrixModel): Model of the solution
+    x (ndarray): Column values of the solution
+    """
+    for (name, index), v in zip(matrix.column_keys(), np.asarray(x).tolist()):
+        var = model.component(name)[index]
+        if not var.fixed:
+            var.set_value(v, skip_validation=True)
+
+def solver_succeeded(result):
+    """True when the solver returned a usable (optimal or feasible) solution."""
+    ok_terminations = (TerminationCondition.optimal, TerminationCondition.feasible)
+    return result.solver.status == SolverStatus.ok and result.solver.termination_condition in ok_terminations
+
+def refine_annual(model_data, scenario, price_scenario, rep_model, solver, solver_tee=False, build_options=None,
+                  scale_units=None):
+    """
+    Re-solve a representative-year solution at annual resolution.
+
+    The retirement schedule of rep_model is fixed in an annual model, so only dispatch and capacity are solved.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    rep_model (ConcreteModel): Solved representative-year model
+    solver: Configured solver instance
+    build_options (dict): Keyword options for build_model
+    scale_units (UnitSystem): Units of the model sent to the solver (unscaled when None)
+
+    Returns:
+    ConcreteModel: The solved annual model, or rep_model when its schedule is infeasible in some year
+    """
+    options = {k: v for k, v in (build_options or {}).items() if k != 'representative_years'}
+    model = build_model(model_data, scenario, price_scenario, **options)
+    fix_retirements(model, calculate_retirement_schedule(rep_model))
+    if scale_units:
+        scale_model(model, scale_units)
+    result = solver.solve(model, tee=solver_tee)
+    unscale_model(model)
+    if not solver_succeeded(result):
+        logging.warning(f"Annual refinement of {scenario}_{price_scenario} failed "
+                        f"(termination={result.solver.termination_condition}); keeping representative-year results")
+        return rep_model
+    return model
+
 def initialize_solver(args):
     """
     Initialize and configure the solver based on command line arguments.
@@ -483,7 +859,9 @@ def initialize_solver(args):
             solver.options[key] = value
     return solver
 
-def run_scenario(model_data, scenario, price_scenario, solver, output_dir=None, solver_tee=False):
+def run_scenario(model_data, scenario, price_scenario, solver, output_dir=None, solver_tee=False, build_options=None,
+                 refine=False, presolve=None, presolve_report=False, scale_units=None, model=None, cache=None,
+                 profile=None, decompose=None, mip_start=None):
     """
     Run a single scenario and return the results.
     
@@ -492,48 +870,436 @@ def run_scenario(model_data, scenario, price_scenario, solver, output_dir=None,
     scenario (str): Scenario to run
     price_scenario (str): Price scenario to run
     solver: Configured solver instance
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    refine (bool): Re-solve a representative-year solution at annual resolution (see refine_annual)
+    presolve (list): Presolve steps applied to the model before the solve (see presolve.PRESOLVE_STEPS)
+    presolve_report (bool): Report the LP relaxation bound and root gap before and after the presolve
+    scale_units (UnitSystem): Units of the model sent to the solver (unscaled when None)
+    model (ConcreteModel): Model built with retargetable=True, re-targeted to this scenario instead of a new build
+    cache (BuildCache): Cache of generated LP files (not used when None)
+    profile (BuildProfile): Records the construction of each component and the time of each stage
+    decompose (DecompositionOptions): Solve one sub-model per technology in parallel worker processes when the
+        model separates by technology (see decomposition.solve_by_technology)
+    mip_start (tuple): MatrixModel of the same build options and the column values the MIP solver starts from
+        (see set_mip_start); not used by the sub-models of decompose
     
     Returns:
     dict: Results for the scenario
     """
     # from model_check import check_plf_constraints, verify_cost_calculations,check_capacity_constraints,validate_retirement_economics
-    model = build_model(model_data, scenario, price_scenario)
+    retargeted = model is not None
+    if retargeted:
+        with timed(profile, "retarget"):
+            retarget_model(model, model_data, scenario, price_scenario)
+    else:
+        with profile_build(profile), timed(profile, "build"):
+            model = build_model(model_data, scenario, price_scenario, **(build_options or {}))
+    report = None
+    if presolve or presolve_report:
+        with timed(profile, "presolve"):
+            report = run_presolve(model, presolve or [], solver, presolve_report)
+    # NEW: a model that separates by technology is solved as one sub-model per technology
+    decomposed = False
+    if decompose:
+        from decomposition import solve_by_technology
+        with timed(profile, "solve"):
+            decomposed = solve_by_technology(model, model_data, scenario, price_scenario, decompose, build_options,
+                                             presolve, scale_units, solver_tee)
+    if not decomposed:
+        # NEW: warm start from a known solution, set before the scaling so its values are scaled with the model
+        solve_options = {}
+        if mip_start is not None:
+            if solver.warm_start_capable():
+                set_mip_start(model, *mip_start)
+                solve_options['warmstart'] = True
+            else:
+                logging.warning(f"Solver {solver.name} does not accept a MIP start; solving without it")
+        if scale_units:
+            with timed(profile, "scale"):
+                scale_model(model, scale_units)
 
-    # Write the model to an LP file before solving
-    lp_filename = f"{scenario}_{price_scenario}.lp"
-    if output_dir:
-        lp_filename = str(Path(output_dir) / lp_filename)
-    model.write(lp_filename, io_options={'symbolic_solver_labels': True})
+        # Write the model to an LP file before solving
+        lp_filename = f"{scenario}_{price_scenario}.lp"
+        if output_dir:
+            lp_filename = str(Path(output_dir) / lp_filename)
+        # NEW: an identical LP file (same data, options and code) is copied from the build cache
+        lp_key = None
+        if cache:
+            lp_key = fingerprint(model_data, scenario, price_scenario,
+                                 {**(build_options or {}), 'presolve': tuple(presolve or ()),
+                                  'scale_units': scale_units, 'retargetable': retargeted}, "lp")
+        with timed(profile, "lp_write"):
+            if not (cache and cache.fetch_file(lp_key, ".lp", lp_filename)):
+                model.write(lp_filename, io_options={'symbolic_solver_labels': True})
+                if cache:
+                    cache.store_file(lp_key, ".lp", lp_filename)
 
-    result = solver.solve(model, tee=solver_tee)
-    logging.getLogger('pyomo.core').setLevel(logging.INFO)
-
-    # FIXED: Removed problematic log_infeasible_constraints call with logger object
-    # log = logging.getLogger('pyomo.core')
-    # log.setLevel(logging.INFO)
-    # log_infeasible_constraints(model, log)
-
-    # if scenario == "AD":
-    # debug_AD_scenario(model,scenario)
-    # print("\nPost-solve checks:")    
-    # check_capacity_constraints(model)
-    # verify_cost_calculations(model)
-    # check_plf_constraints(model)
-    # validate_retirement_economics(model)
+        with timed(profile, "solve"):
+            result = solver.solve(model, tee=solver_tee, **solve_options)
+        unscale_model(model)
+        logging.getLogger('pyomo.core').setLevel(logging.INFO)
+
+        # FIXED: Removed problematic log_infeasible_constraints call with logger object
+        # log = logging.getLogger('pyomo.core')
+        # log.setLevel(logging.INFO)
+        # log_infeasible_constraints(model, log)
+
+        # if scenario == "AD":
+        # debug_AD_scenario(model,scenario)
+        # print("\nPost-solve checks:")    
+        # check_capacity_constraints(model)
+        # verify_cost_calculations(model)
+        # check_plf_constraints(model)
+        # validate_retirement_economics(model)
  
-    # check_constraints(model)
+        # check_constraints(model)
 
-    ok_terminations = (TerminationCondition.optimal, TerminationCondition.feasible)
-    if result.solver.status != SolverStatus.ok or result.solver.termination_condition not in ok_terminations:
+        if not solver_succeeded(result):
+            print(f"\nSolver did not find a usable solution.")
+            print(f"  status: {result.solver.status}, termination: {result.solver.termination_condition}")
+            print(f"  LP file written to: {lp_filename}")
+            log_infeasible_constraints(model, log_expression=True)
+            raise RuntimeError(
+                f"Solver failed for scenario {scenario}_{price_scenario} "
+                f"(status={result.solver.status}, termination={result.solver.termination_condition})"
+            )
+
+    if presolve_report:
+        summary = report.summary(objective_value(model))
+        logging.info(f"{scenario}_{price_scenario}: {summary}")
+        print(summary)
+    if refine and len(model.y_rep) < len(model.y):
+        with timed(profile, "refine"):
+            model = refine_annual(model_data, scenario, price_scenario, model, solver, solver_tee, build_options,
+                                  scale_units)
+    with timed(profile, "results"):
+        return process_model_results(model)
+
+def _matrix_for(model_data, scenario, price_scenario, build_options=None, cache=None, profile=None, stage="build"):
+    """
+    MatrixModel of a scenario, loaded from the build cache when it holds one with the same fingerprint.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to build
+    price_scenario (str): Price scenario to build
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    cache (BuildCache): Cache of generated models (not used when None)
+    profile (BuildProfile): Records the build time
+    stage (str): Profile stage the build time is recorded under
+
+    Returns:
+    tuple: The MatrixModel and its cache key (None without a cache)
+
+    Raises:
+    ValueError: For build options only the Pyomo model supports (plant clusters, revenue curves, cumulative
+        retirement)
+    """
+    from matrix_model import build_matrix_model
+    options = build_options or {}
+    key = fingerprint(model_data, scenario, price_scenario, options, "matrix") if cache else None
+    with timed(profile, stage):
+        matrix = cache.load(key) if cache else None
+        if matrix is None:
+            matrix = build_matrix_model(model_data, scenario, price_scenario, **options)
+            if cache:
+                cache.store(key, matrix)
+        else:
+            logging.info(f"{scenario}_{price_scenario}: matrix model loaded from the build cache")
+    return matrix, key
+
+def _matrix_results(model_data, scenario, price_scenario, build_options, matrix, x, summary=None, refine=False,
+                    profile=None):
+    """
+    Results of MatrixModel column values, dispatched at annual resolution when refine is set and the model has
+    representative years.
+
+    The annual model with the retirement schedule fixed separates by year and technology, so its dispatch is solved
+    in closed form (see lagrangian.fixed_schedule_solution) and its objective is added to summary as AnnualObjective.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario of the matrix
+    price_scenario (str): Price scenario of the matrix
+    build_options (dict): Keyword options the matrix was built with
+    matrix (MatrixModel): Model the column values belong to
+    x (ndarray): Column values
+    summary (dict): Solution summary reported with the results
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    profile (BuildProfile): Records the time of each stage
+
+    Returns:
+    dict: Results for the scenario (of the representative years when the schedule is infeasible in some year)
+    """
+    from matrix_model import build_matrix_model, process_matrix_results
+    from lagrangian import fixed_schedule_solution
+    with timed(profile, "results"):
+        results = process_matrix_results(matrix, x)
+    if not refine or len(matrix.rep_years) == len(matrix.year_map):
+        return results
+    annual = build_matrix_model(model_data, scenario, price_scenario,
+                                **{k: v for k, v in (build_options or {}).items() if k != 'representative_years'})
+    with timed(profile, "refine"):
+        annual_x = fixed_schedule_solution(annual, results["retire_sched"])
+    if annual_x is None:
+        logging.warning(f"Annual refinement of {scenario}_{price_scenario} failed (the schedule is infeasible "
+                        f"in some year); keeping representative-year results")
+        return results
+    if summary is not None:
+        summary["AnnualObjective"] = float(annual.objective @ annual_x + annual.objective_constant)
+    with timed(profile, "results"):
+        return process_matrix_results(annual, annual_x)
+
+def _remaining(time_limit, start):
+    """Seconds left of time_limit since start (time.perf_counter), or None without a time limit."""
+    if time_limit is None:
+        return None
+    return max(time_limit - (time.perf_counter() - start), 0.0)
+
+def run_matrix_scenario(model_data, scenario, price_scenario, output_dir=None, solver_tee=False, build_options=None,
+                        refine=False, mip_gap=None, time_limit=None, check=False, cache=None, profile=None,
+                        mip_start=None):
+    """
+    Run a single scenario with the matrix backend and return the results.
+
+    The model is assembled as sparse arrays, written to an MPS file and solved in memory with HiGHS.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    mip_gap (float): Relative MIP gap
+    time_limit (float): Solver time limit in seconds
+    check (bool): Also build the Pyomo model and check that the models and their results are identical
+    cache (BuildCache): Cache of generated models (not used when None)
+    profile (BuildProfile): Records the time of each stage
+    mip_start (tuple): MatrixModel of the same build options and the column values the MIP solver starts from
+
+    Returns:
+    dict: Results for the scenario
+    """
+    from matrix_model import (write_mps, solve_matrix_model, process_matrix_results, matrix_differences,
+                              load_matrix_solution, result_differences)
+    options = build_options or {}
+    matrix, key = _matrix_for(model_data, scenario, price_scenario, options, cache, profile)
+    mps_filename = f"{scenario}_{price_scenario}.mps"
+    if output_dir:
+        mps_filename = str(Path(output_dir) / mps_filename)
+    with timed(profile, "mps_write"):
+        if not (cache and cache.fetch_file(key, ".mps", mps_filename)):
+            write_mps(matrix, mps_filename)
+            if cache:
+                cache.store_file(key, ".mps", mps_filename)
+    model = None
+    if check:
+        model = build_model(model_data, scenario, price_scenario, **options)
+        differences = matrix_differences(matrix, model)
+        if differences:
+            raise RuntimeError(f"Matrix model of {scenario}_{price_scenario} differs from the Pyomo model: "
+                               + "; ".join(differences[:10]))
+        logging.info(f"{scenario}_{price_scenario}: matrix model identical to the Pyomo model")
+
+    with timed(profile, "solve"):
+        solution = solve_matrix_model(matrix, mip_gap, time_limit, solver_tee,
+                                      mip_start[1] if mip_start is not None else None)
+    if not solution.ok:
         print(f"\nSolver did not find a usable solution.")
-        print(f"  status: {result.solver.status}, termination: {result.solver.termination_condition}")
-        print(f"  LP file written to: {lp_filename}")
-        log_infeasible_constraints(model, log_expression=True)
-        raise RuntimeError(
-            f"Solver failed for scenario {scenario}_{price_scenario} "
-            f"(status={result.solver.status}, termination={result.solver.termination_condition})"
-        )
-    return process_model_results(model)
+        print(f"  status: {solution.status}")
+        print(f"  MPS file written to: {mps_filename}")
+        raise RuntimeError(f"Solver failed for scenario {scenario}_{price_scenario} (status={solution.status})")
+    if check:
+        load_matrix_solution(matrix, model, solution.x)
+        differences = result_differences(process_model_results(model), process_matrix_results(matrix, solution.x))
+        if differences:
+            raise RuntimeError(f"Matrix results of {scenario}_{price_scenario} differ from the Pyomo results: "
+                               + "; ".join(differences[:10]))
+    return _matrix_results(model_data, scenario, price_scenario, options, matrix, solution.x, refine=refine,
+                           profile=profile)
+
+def run_lagrangian_scenario(model_data, scenario, price_scenario, build_options=None, refine=False, iterations=None,
+                            time_limit=None, cache=None, profile=None):
+    """
+    Run a single scenario with the Lagrangian relaxation of the technology rows and return the results.
+
+    No MIP solver is used: the dual bound comes from the plant problems and the reported schedule is the best
+    repaired one (see lagrangian.solve_lagrangian). The bounds and gap are added to the results as DualityGap.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    iterations (int): Maximum subgradient iterations (Config.LAGRANGIAN_ITERATIONS when None)
+    time_limit (float): Time limit in seconds
+    cache (BuildCache): Cache of generated models (not used when None)
+    profile (BuildProfile): Records the time of each stage
+
+    Returns:
+    dict: Results for the scenario
+    """
+    from lagrangian import solve_lagrangian
+    matrix, _ = _matrix_for(model_data, scenario, price_scenario, build_options, cache, profile)
+    with timed(profile, "solve"):
+        result = solve_lagrangian(matrix, iterations or Config.LAGRANGIAN_ITERATIONS, time_limit=time_limit)
+    if result.x is None:
+        raise RuntimeError(f"No feasible schedule found for scenario {scenario}_{price_scenario} "
+                           f"(Lagrangian bound {result.upper_bound:,.2f}); solve it with the MIP solver")
+    summary = result.summary()
+    results = _matrix_results(model_data, scenario, price_scenario, build_options, matrix, result.x, summary,
+                              refine, profile)
+    results["DualityGap"] = summary
+    return results
+
+def run_benders_scenario(model_data, scenario, price_scenario, solver_tee=False, build_options=None, refine=False,
+                         mip_gap=None, time_limit=None, iterations=None, cache=None, profile=None):
+    """
+    Run a single scenario with Benders decomposition between the retirements and the dispatch and return the
+    results.
+
+    The master MIP over the retirement decisions is solved with HiGHS; the dispatch is valued in closed form (see
+    benders.solve_benders). The Lagrangian schedule (see lagrangian.solve_lagrangian) starts the master. The
+    bounds and gap are added to the results as DualityGap.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    mip_gap (float): Relative gap of the master and of the Benders bounds
+    time_limit (float): Time limit in seconds of the Lagrangian start and the master solves together
+    iterations (int): Maximum master solves (Config.BENDERS_ITERATIONS when None)
+    cache (BuildCache): Cache of generated models (not used when None)
+    profile (BuildProfile): Records the time of each stage
+
+    Returns:
+    dict: Results for the scenario
+    """
+    from lagrangian import solve_lagrangian
+    from benders import solve_benders
+    matrix, _ = _matrix_for(model_data, scenario, price_scenario, build_options, cache, profile)
+    with timed(profile, "solve"):
+        start = time.perf_counter()
+        initial = solve_lagrangian(matrix, time_limit=time_limit).x
+        result = solve_benders(matrix, mip_gap, _remaining(time_limit, start),
+                               iterations or Config.BENDERS_ITERATIONS, initial, solver_tee)
+    if result.x is None:
+        raise RuntimeError(f"Benders decomposition found no solution for scenario {scenario}_{price_scenario}")
+    summary = result.summary()
+    results = _matrix_results(model_data, scenario, price_scenario, build_options, matrix, result.x, summary,
+                              refine, profile)
+    results["DualityGap"] = summary
+    return results
+
+def run_annealing(model_data, scenario, price_scenario, build_options=None, chains=None, iterations=None,
+                  workers=None, time_limit=None, profile=None, cache=None):
+    """
+    Best retirement schedule of simulated annealing chains started from the Lagrangian schedule (see
+    annealing.solve_annealing), without a MIP solver.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    chains (int): Independent chains (Config.ANNEALING_CHAINS when None)
+    iterations (int): Moves tried by each chain (Config.ANNEALING_ITERATIONS when None)
+    workers (int): Worker processes (default: one per chain, up to the CPU count)
+    time_limit (float): Time limit in seconds; each chain gets the time left after the Lagrangian start
+    profile (BuildProfile): Records the time of each stage
+    cache (BuildCache): Cache of generated models (not used when None)
+
+    Returns:
+    tuple: The ScheduleEvaluator of the scenario and the AnnealingResult
+    """
+    from merit_order import ScheduleEvaluator
+    from lagrangian import solve_lagrangian
+    from annealing import solve_annealing
+    matrix, _ = _matrix_for(model_data, scenario, price_scenario, build_options, cache, profile)
+    evaluator = ScheduleEvaluator.from_matrix(matrix)
+    with timed(profile, "solve"):
+        start = time.perf_counter()
+        initial = solve_lagrangian(matrix, time_limit=time_limit).x
+        result = solve_annealing(evaluator, initial, chains or Config.ANNEALING_CHAINS, workers,
+                                 iterations or Config.ANNEALING_ITERATIONS, _remaining(time_limit, start))
+    return evaluator, result
+
+def run_annealing_scenario(model_data, scenario, price_scenario, build_options=None, refine=False, chains=None,
+                           iterations=None, workers=None, time_limit=None, profile=None, cache=None):
+    """
+    Run a single scenario with simulated annealing over the retirement years and return the results.
+
+    The reported schedule is the best of the chains (see run_annealing); the chain objectives are added to the
+    results as Annealing.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    chains, iterations, workers, time_limit, profile, cache: As in run_annealing
+
+    Returns:
+    dict: Results for the scenario
+    """
+    evaluator, result = run_annealing(model_data, scenario, price_scenario, build_options, chains, iterations,
+                                      workers, time_limit, profile, cache)
+    if result.x is None:
+        raise RuntimeError(f"No feasible schedule found for scenario {scenario}_{price_scenario} by simulated "
+                           f"annealing; solve it with the MIP solver")
+    summary = result.summary()
+    results = _matrix_results(model_data, scenario, price_scenario, build_options, evaluator.matrix, result.x,
+                              summary, refine, profile)
+    results["Annealing"] = summary
+    return results
+
+def run_fast_path_scenario(model_data, scenario, price_scenario, build_options=None, refine=False, gap=None,
+                           time_limit=None, cache=None, profile=None):
+    """
+    Run a single scenario whose capacity has no objective weight (BAU) without the retirement MIP, when keeping
+    every plant is provably optimal or, with a gap, a schedule is within it of the Lagrangian bound, and return
+    the results.
+
+    With the retirements fixed, the dispatch LP is solved in closed form for every year and technology (see
+    fast_path.solve_fast_path). The objective, its bound and gap are added to the results as FastPath.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    build_options (dict): Keyword options for build_model (see get_build_options)
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    gap (float): Largest relative gap between the Lagrangian bound and the best of keeping every plant and the
+        Lagrangian schedule (None: only keep every plant when that is provably optimal)
+    time_limit (float): Time limit in seconds of the bound
+    cache (BuildCache): Cache of generated models (not used when None)
+    profile (BuildProfile): Records the time of each stage
+
+    Returns:
+    dict: Results for the scenario, or None when the scenario needs the retirement MIP
+    """
+    from fast_path import solve_fast_path
+    try:
+        matrix, _ = _matrix_for(model_data, scenario, price_scenario, build_options, cache, profile, "fast_path")
+    except ValueError:
+        return None  # plant clusters, revenue curves and cumulative retirement need the Pyomo model
+    with timed(profile, "fast_path"):
+        result = solve_fast_path(matrix, time_limit, lagrangian=gap is not None)
+    if result is None or result.x is None or not (result.exact or (gap is not None and result.gap is not None
+                                                                   and result.gap <= gap)):
+        return None
+    summary = result.summary()
+    results = _matrix_results(model_data, scenario, price_scenario, build_options, matrix, result.x, summary,
+                              refine, profile)
+    logging.info(f"{scenario}_{price_scenario}: solved with "
+                 + ("every plant kept" if result.kept_all else "the Lagrangian schedule")
+                 + " (no LP file written), without the retirement MIP")
+    results["FastPath"] = summary
+    return results
 
 def check_constraints(model):
     """Check if key constraints are satisfied"""
@@ -543,16 +1309,16 @@ def check_constraints(model):
     for g in model.g:
         for y in model.y:
             plf = sum(
-                model.Gen[g, y, t].value * model.Price_dur[t]
+                gen_value(model, g, y, t) * model.Price_dur[t]
                 for t in model.t
-            ) / (model.Cap[g, y].value * 8760) if model.Cap[g, y].value > 0 else 0
+            ) / (cap_value(model, g, y) * 8760) if cap_value(model, g, y) > 0 else 0
             
-            if model.Retire[g, y].value == 0 and plf<0.25:  #
+            if retire_value(model, g, y) == 0 and plf<0.25:  #
                 print(f"Plant {g} Year {y} PLF: {plf:.2f}")
     
     # Check capacity constraints
     for y in model.y:
-        total_cap = sum(model.Cap[g, y].value for g in model.g)
+        total_cap = sum(cap_value(model, g, y) for g in model.g)
         required_cap = sum(model.PriceGenTech[y, tech] * 1e6 / (8760 * 0.75) for tech in model.tech)
         if total_cap < required_cap:
             print(f"Year {y} Capacity Check:")
@@ -596,6 +1362,9 @@ def main():
         if args.generate_intermediate_scenarios and any(scenario.startswith('AD_') for scenario in args.scenarios):
             from energy_data_processor import generate_intermediate_scenarios
             model_data = generate_intermediate_scenarios(model_data)
+        if args.cluster_plants:
+            from energy_data_processor import cluster_plants
+            model_data = cluster_plants(model_data, args.cluster_capacity_tol, args.cluster_cost_tol)
         output_dir = None
         if args.output_dir:
             output_dir = Path(args.output_dir)
@@ -611,18 +1380,130 @@ def main():
         
         # Initialize solver
         solver = initialize_solver(args)
+        build_options = get_build_options(args, model_data)
+        scale_units = UnitSystem(*args.scale_units) if args.scale_units else None
+        cache = None if args.no_build_cache else BuildCache()
+        # NEW: one re-targetable model shared by every scenario run (rebuilt per run when it cannot be shared)
+        shared_model = None
+        # NEW: per-technology decomposition, the workers rebuild the solver from the command line arguments
+        decompose = None
+        if args.decompose and args.backend == 'pyomo':
+            from decomposition import DecompositionOptions
+            decompose = DecompositionOptions(args, args.decompose_workers)
+        # NEW: rolling-horizon windows (pyomo backend)
+        rolling = None
+        if args.rolling_horizon and args.backend == 'pyomo':
+            from rolling_horizon import RollingHorizonOptions, run_rolling_horizon
+            rolling = RollingHorizonOptions(args.rolling_window, args.rolling_commit, args.rolling_compare)
+            if args.presolve or scale_units or args.retarget or args.decompose:
+                logging.warning("--presolve, --scale-units, --retarget and --decompose are not used with "
+                                "--rolling-horizon")
+        # NEW: LP-relaxation screening (pyomo backend)
+        relax = args.relax and args.backend == 'pyomo'
+        if relax and rolling:
+            logging.warning("--relax and --rolling-horizon are exclusive; solving with --rolling-horizon")
+            relax = False
+        elif relax and (args.presolve or scale_units or args.retarget or args.decompose):
+            logging.warning("--presolve, --scale-units, --retarget and --decompose are not used with --relax")
+        if relax:
+            from screening import run_relaxed_scenario
+        if args.lagrangian and args.benders:
+            logging.warning("--lagrangian and --benders are exclusive; solving with --lagrangian")
+        if args.anneal and (args.lagrangian or args.benders):
+            logging.warning("--anneal is not combined with --lagrangian or --benders; solving with "
+                            + ("--lagrangian" if args.lagrangian else "--benders"))
+        # NEW: MIP start from the best simulated annealing schedule (MIP solve of the pyomo and matrix backends)
+        anneal_start = args.anneal_mip_start and not (args.lagrangian or args.benders or args.anneal or rolling
+                                                      or relax)
+        # NEW: with --fast-path, scenarios where keeping every plant is provably optimal (or, with --fast-path-gap, a
+        # schedule is within the gap of the Lagrangian bound) skip the retirement MIP
+        fast_path = (args.fast_path or args.fast_path_gap is not None) and not (
+            args.lagrangian or args.benders or args.anneal or rolling or relax or args.check_backend or args.presolve
+            or args.presolve_report or scale_units or args.decompose or args.retarget)
+        if (args.fast_path or args.fast_path_gap is not None) and not fast_path:
+            logging.warning("--fast-path is not combined with --lagrangian, --benders, --anneal, --rolling-horizon, "
+                            "--relax, --check-backend, --presolve, --presolve-report, --scale-units, --decompose or "
+                            "--retarget; ignored")
+        if args.anneal_mip_start and not anneal_start:
+            logging.warning("--anneal-mip-start only applies to the MIP solve of the pyomo and matrix backends; "
+                            "ignored")
+        if (args.backend == 'matrix' or args.lagrangian or args.benders or args.anneal) and (
+                args.presolve or args.presolve_report or scale_units or args.retarget or args.decompose
+                or args.rolling_horizon or args.relax):
+            logging.warning("--presolve, --scale-units, --retarget, --decompose, --rolling-horizon and --relax only "
+                            "apply to the pyomo backend; ignored")
+        elif args.retarget and not (rolling or relax):
+            if args.presolve or args.presolve_report or build_options['revenue_curve']:
+                logging.warning("--retarget is not combined with --presolve or --revenue-curve; rebuilding each model")
+            else:
+                shared_model = build_model(model_data, args.scenarios[0], args.price_scenarios[0],
+                                           retargetable=True, **build_options)
         
         # Run scenarios
         results = {}
+        profiles = {}  # NEW: build profile by scenario key (--profile-build)
         for scenario in args.scenarios:
             for price_scenario in args.price_scenarios:
                 try:
                     key = f"{scenario}_{price_scenario}"
-                    results[key] = run_scenario(model_data, scenario,
-                                             price_scenario, solver, output_dir, args.solver_tee)
+                    profile = None
+                    if args.profile_build:
+                        profile = profiles[key] = BuildProfile(scenario, price_scenario)
+                    if fast_path:
+                        fast_results = run_fast_path_scenario(model_data, scenario, price_scenario, build_options,
+                                                              args.refine_annual, args.fast_path_gap,
+                                                              args.time_limit, cache, profile)
+                        if fast_results is not None:
+                            results[key] = fast_results
+                            continue
+                    mip_start = None
+                    if anneal_start:
+                        try:
+                            evaluator, annealed = run_annealing(model_data, scenario, price_scenario, build_options,
+                                                                args.anneal_chains, args.anneal_iterations,
+                                                                args.anneal_workers, args.time_limit, None, cache)
+                            if annealed.x is not None:
+                                mip_start = (evaluator.matrix, annealed.x)
+                        except ValueError as e:
+                            logging.warning(f"No annealing MIP start for {key}: {e}")
+                    if args.lagrangian:
+                        results[key] = run_lagrangian_scenario(model_data, scenario, price_scenario, build_options,
+                                                               args.refine_annual, args.lagrangian_iterations,
+                                                               args.time_limit, cache, profile)
+                    elif args.benders:
+                        results[key] = run_benders_scenario(model_data, scenario, price_scenario, args.solver_tee,
+                                                            build_options, args.refine_annual, args.mip_gap,
+                                                            args.time_limit, args.benders_iterations, cache, profile)
+                    elif args.anneal:
+                        results[key] = run_annealing_scenario(model_data, scenario, price_scenario, build_options,
+                                                              args.refine_annual, args.anneal_chains,
+                                                              args.anneal_iterations, args.anneal_workers,
+                                                              args.time_limit, profile, cache)
+                    elif args.backend == 'matrix':
+                        results[key] = run_matrix_scenario(model_data, scenario, price_scenario, output_dir,
+                                                           args.solver_tee, build_options, args.refine_annual,
+                                                           args.mip_gap, args.time_limit, args.check_backend, cache,
+                                                           profile, mip_start)
+                    elif rolling:
+                        results[key] = run_rolling_horizon(model_data, scenario, price_scenario, solver, rolling,
+                                                           build_options, args.solver_tee)
+                    elif relax:
+                        results[key] = run_relaxed_scenario(model_data, scenario, price_scenario, solver,
+                                                            build_options, args.refine_annual, args.solver_tee)
+                    else:
+                        results[key] = run_scenario(model_data, scenario,
+                                                 price_scenario, solver, output_dir, args.solver_tee,
+                                                 build_options, args.refine_annual,
+                                                 args.presolve, args.presolve_report, scale_units, shared_model,
+                                                 cache, profile, decompose, mip_start)
                 except Exception as e:
                     print(f"Error in scenario {key}: {str(e)}")
                     continue
+                finally:
+                    if profile is not None:
+                        logging.info("\n" + profile.summary_table())
+        if profiles:
+            write_profiles(profiles, output_dir / Config.BUILD_PROFILE_FILE)
         try:
             save_results_to_excel(results, output_file, output_dir)
             print(f"Results saved to {output_dir}")
@@ -646,8 +1527,8 @@ def debug_AD_scenario(model,s):
     for g in model.g:
         for y in model.y:
             print(f"Plant {g}, Year {y}:")
-            print(f"Cap: {model.Cap[g, y].value}")
-            print(f"GenData Capacity: {model.GenData[g]['CAPACITY']}")
+            print(f"Cap: {cap_value(model, g, y)}")
+            print(f"Nameplate Capacity: {model.CAP0[g]}")
     
     # 2. Check revenue calculation
     print("\nRevenue Calculation:")
@@ -659,7 +1540,7 @@ def debug_AD_scenario(model,s):
                         model.rev_unit[g, y, p] * 
                         model.Price_Dist1[y, p, t] - 
                         model.cost[g, y]
-                    ) * model.Gen[g, y, t].value * 
+                    ) * gen_value(model, g, y, t) * 
                     model.Price_dur[t] * 8.76 / 1000
                     for t in model.t
                 )
@@ -672,7 +1553,7 @@ def debug_AD_scenario(model,s):
         for y in model.y:
             fixed_cost = sum(
                 (
-                    model.Cap[g, y].value * 
+                    cap_value(model, g, y) * 
                     (
                         model.FC_PPA[g, y] * (1-model.SetPriceScenario[p])/1e3 +
                         100 * model.SetPriceScenario[p]
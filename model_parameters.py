@@ -0,0 +1,398 @@
+import itertools
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List
+from config import Config
+from energy_data_processor import build_plant_table, build_tech_availability, normalize_plant_data
+
+@dataclass
+class ModelParameters:
+    """Dense parameter arrays for build_model (plants x years x blocks)"""
+    # Index order of every array below
+    plants: List[str]             # g: Plant identifiers, in gen_data order
+    years: List[int]              # y: Model years
+    time_blocks: List[str]        # t: Time blocks
+
+    # Plant-level data (G,)
+    technology: np.ndarray        # Technology of each plant
+    tech_code: np.ndarray         # Position of the technology in model_data.technologies (-1 if unknown)
+    capacity: np.ndarray          # Nameplate capacity of one unit (MW)
+    units: np.ndarray             # Number of identical units (1 unless plants are clustered)
+    start_year: np.ndarray        # Start year of each plant
+    variable_cost: np.ndarray     # COST in the base year ($/MWh)
+    life: np.ndarray              # Age of the plant in the base year
+    contract_price: np.ndarray    # ContractPriceMW (0 when not provided)
+    min_plf: np.ndarray           # TechParams MinPLF of the plant's technology
+    max_plf: np.ndarray           # TechParams MaxPLF of the plant's technology
+    max_life: np.ndarray          # TechParams MaxLife of the plant's technology
+    rev_unit: Dict[str, np.ndarray]  # Revenue per MWh by price scenario
+
+    # Plant-year data (G, Y)
+    cost: np.ndarray              # Escalated variable cost ($/MWh)
+    fc_ppa: np.ndarray            # FC_PPA capacity payment
+    operating: np.ndarray         # True where Gen may be non-zero
+    expired: np.ndarray           # True where Cap is fixed to FIXED_CAPACITY_EXPIRED
+
+    # Year/block data
+    price_dist: np.ndarray        # Price_Dist(y,t), NaN where missing (Y, T)
+    price_dur: np.ndarray         # Price_dur(t) (T,)
+    discount: np.ndarray          # DR(y) (Y,)
+    position: Dict[str, int] = field(init=False, repr=False)  # Plant name -> plant id
+
+    def __post_init__(self):
+        self.position = {g: i for i, g in enumerate(self.plants)}
+
+    def price_dist1(self, price_scenario: str) -> np.ndarray:
+        """Price_Dist1(y,p,t) for one price scenario as a (Y, T) array."""
+        if price_scenario == "MarketPrice":
+            if np.isnan(self.price_dist).any():
+                raise ValueError("Price_Distribution does not cover every model year and time block")
+            return self.price_dist
+        elif price_scenario == "AvgPPAPrice":
+            return np.ones_like(self.price_dist)
+        else:
+            raise NameError(f"Invalid price scenario: {price_scenario}")
+
+    def uniform_blocks(self, price_scenario: str) -> bool:
+        """True when every time block of a year has the same price, so Gen is interchangeable across blocks."""
+        price = self.price_dist1(price_scenario)
+        return bool(np.all(price == price[:, :1]))
+
+    def block_margin(self, price_scenario: str) -> np.ndarray:
+        """Margin per MWh in each block, rev_unit * Price_Dist1 - cost, as a (G, Y, T) array."""
+        if price_scenario not in self.rev_unit:
+            raise ValueError(f"No {price_scenario} column found in plant data")
+        return (self.rev_unit[price_scenario][:, None, None] * self.price_dist1(price_scenario)[None, :, :]
+                - self.cost[:, :, None])
+
+    def revenue_coefficient(self, price_scenario: str) -> np.ndarray:
+        """Margin of one MW in each block, (rev_unit * Price_Dist1 - cost) * Price_dur, as a (G, Y, T) array."""
+        return self.block_margin(price_scenario) * self.price_dur[None, None, :]
+
+    def fixed_cost_per_mw(self, price_scenario: str) -> np.ndarray:
+        """Fixed cost per MW net of the contract price as a (G, Y) array."""
+        if price_scenario == "AvgPPAPrice":
+            cost_per_mw = self.fc_ppa / Config.USD_TO_THOUSANDS
+        elif price_scenario == "MarketPrice":
+            cost_per_mw = np.full_like(self.fc_ppa, Config.DEFAULT_COST_PER_MW_MarketPrice)
+        else:
+            raise NameError(f"Invalid price scenario: {price_scenario}")
+        return cost_per_mw - self.contract_price[:, None]
+
+    @property
+    def total_capacity(self) -> np.ndarray:
+        """Nameplate capacity of each plant (all of its units) as a (G,) array."""
+        return self.capacity * self.units
+
+    @property
+    def clustered(self) -> bool:
+        """True when some plant groups several units."""
+        return bool((self.units > 1).any())
+
+    def gen_upper_bound(self) -> np.ndarray:
+        """Upper bound of Gen(g,y,t) as a (G, Y) array (identical for every block)."""
+        return np.where(self.operating, self.total_capacity[:, None], 0.0)
+
+def revenue_curve(margin: np.ndarray, dur: np.ndarray, capacity: np.ndarray):
+    """
+    Piecewise-linear revenue of a plant-year as a function of its annual energy.
+
+    For an annual energy E = sum_t Gen[t] * dur[t] with 0 <= Gen[t] <= capacity, the best block
+    dispatch fills the highest-margin blocks first, so the revenue sum_t margin[t] * dur[t] * Gen[t]
+    is concave in E with one linear segment per block, in decreasing margin order.
+
+    Parameters:
+    margin (ndarray): Margin per MWh of each block, shape (N, T).
+    dur (ndarray): Duration of each block, shape (T,).
+    capacity (ndarray): Upper bound of Gen, shape (N,).
+
+    Returns:
+    tuple: (slopes, intercepts), each (N, T), so that revenue(E) = min_k intercepts[:, k] + slopes[:, k] * E.
+    """
+    order = np.argsort(-margin, axis=1, kind="stable")
+    slopes = np.take_along_axis(margin, order, axis=1)
+    length = capacity[:, None] * dur[order]  # energy covered by each segment
+    energy_start = np.cumsum(length, axis=1) - length
+    revenue_start = np.cumsum(slopes * length, axis=1) - slopes * length
+    return slopes, revenue_start - slopes * energy_start
+
+def greedy_dispatch(energy: np.ndarray, margin: np.ndarray, dur: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    """
+    Block dispatch that delivers the annual energy with the highest revenue (highest-margin blocks first).
+
+    Parameters:
+    energy (ndarray): Annual energy sum_t Gen[t] * dur[t], shape (N,).
+    margin (ndarray): Margin per MWh of each block, shape (N, T).
+    dur (ndarray): Duration of each block, shape (T,).
+    capacity (ndarray): Upper bound of Gen, shape (N,).
+
+    Returns:
+    ndarray: Gen of each block, shape (N, T).
+    """
+    order = np.argsort(-margin, axis=1, kind="stable")
+    sorted_dur = np.broadcast_to(dur[order], margin.shape)
+    length = capacity[:, None] * sorted_dur
+    energy_start = np.cumsum(length, axis=1) - length
+    filled = np.clip(energy[:, None] - energy_start, 0.0, length)
+    level = np.divide(filled, sorted_dur, out=np.zeros_like(filled), where=sorted_dur > 0)
+    gen = np.empty_like(level)
+    np.put_along_axis(gen, order, level, axis=1)
+    return gen
+
+def representative_years(first_year: int, last_year: int, annual_until: int, step: int) -> List[int]:
+    """
+    Representative years: every year up to annual_until, then one year every step years.
+
+    Parameters:
+    first_year (int): First model year (always representative).
+    last_year (int): Last model year.
+    annual_until (int): Last year solved at annual resolution.
+    step (int): Spacing of the representative years after annual_until.
+
+    Returns:
+    list: The representative years in increasing order.
+    """
+    if step < 1:
+        raise ValueError(f"Representative year step must be at least 1, got {step}")
+    annual_until = max(annual_until, first_year)
+    years = list(range(first_year, min(annual_until, last_year) + 1))
+    years += list(range(annual_until + step, last_year + 1, step))
+    return years
+
+def year_blocks(years: List[int], rep_years: List[int]) -> Dict[int, int]:
+    """Map every model year to the representative year that stands for it (the latest one not after it)."""
+    rep_years = sorted(rep_years)
+    if not rep_years or rep_years[0] != years[0]:
+        raise ValueError(f"Representative years must start with the first model year {years[0]}")
+    unknown = sorted(set(rep_years) - set(years))
+    if unknown:
+        raise ValueError(f"Representative years {unknown} are outside the model years")
+    block_of = np.searchsorted(rep_years, years, side="right") - 1
+    return {y: rep_years[b] for y, b in zip(years, block_of)}
+
+def as_param_dict(values, *axes) -> dict:
+    """Flatten a dense array into the {index: value} dict Pyomo components are initialized from.
+
+    The axes are the index lists of each array dimension, in the same order as the array.
+    """
+    values = np.asarray(values)
+    keys = axes[0] if len(axes) == 1 else itertools.product(*axes)
+    return dict(zip(keys, values.ravel().tolist()))
+
+def plant_table_of(model_data):
+    """Return the PlantTable of model_data, building it if the ModelData was created without one."""
+    if getattr(model_data, "plant_table", None) is not None:
+        return model_data.plant_table
+    return build_plant_table(normalize_plant_data(model_data.gen_data), model_data.technologies)
+
+def tech_availability_of(model_data):
+    """Return the TechAvailability index of model_data, building it if the ModelData was created without one."""
+    if getattr(model_data, "tech_availability", None) is not None:
+        return model_data.tech_availability
+    return build_tech_availability(plant_table_of(model_data), model_data.tech_params, model_data.years)
+
+def _tech_param(tech_params: pd.DataFrame, technology: np.ndarray, param: str) -> np.ndarray:
+    """Look up one TechParams column for every plant."""
+    unknown = sorted(set(technology) - set(tech_params.index))
+    if unknown:
+        raise ValueError(f"Technologies {unknown} have no parameters in the Other sheet")
+    return tech_params[param].reindex(technology).to_numpy(dtype=float)
+
+def precompute_parameters(model_data, years: List[int]) -> ModelParameters:
+    """
+    Compute every plant, year and block parameter of the model as dense NumPy arrays.
+
+    Parameters:
+    model_data (ModelData): The data required to build the model.
+    years (list): The model years (y set).
+
+    Returns:
+    ModelParameters: The precomputed parameter arrays.
+    """
+    table = plant_table_of(model_data)
+    tech_params = model_data.tech_params
+    plants = list(table.names)
+    years = list(years)
+    time_blocks = list(model_data.time_blocks)
+    year_offset = np.asarray(years, dtype=float) - Config.BASE_YEAR  # (Y,)
+
+    technology = table.technology
+    capacity = table.capacity
+    start_year = table.start_year
+    if table.cost is None:
+        raise ValueError("Neither 'COST' nor 'VARIABLE COST' found in plant data")
+    variable_cost = table.cost
+
+    rev_unit = {}
+    for price_scenario in ("MarketPrice", "AvgPPAPrice"):
+        try:
+            rev_unit[price_scenario] = table.revenue(price_scenario)
+        except ValueError:
+            continue  # only an error if this price scenario is actually run
+
+    # Plants that haven't started yet have life 0
+    life = np.where(start_year > Config.BASE_YEAR, 0.0, Config.BASE_YEAR - start_year)
+
+    # Cost escalation rate depends on plant age in the base year
+    escalation = np.select(
+        [life < Config.YOUNG_PLANT_THRESHOLD, life <= Config.OLD_PLANT_THRESHOLD],
+        [_tech_param(tech_params, technology, "CostEsc_Lessthan10"),
+         _tech_param(tech_params, technology, "CostEsc_10-30years")],
+        default=_tech_param(tech_params, technology, "CostEsc_30plus"),
+    )
+    cost = variable_cost[:, None] * (1 + escalation[:, None]) ** year_offset[None, :]
+
+    # A plant is expired once its age exceeds MaxLife, and generates nothing before its start year
+    max_life = _tech_param(tech_params, technology, "MaxLife")
+    expired = (year_offset[None, :] + life[:, None]) > max_life[:, None]
+    operating = ~expired & (np.asarray(years)[None, :] >= start_year[:, None])
+
+    # FC_PPA columns are looked up by str(year); missing plants/years use the default
+    fc_ppa = model_data.fc_ppa.reindex(
+        index=plants,
+        columns=[str(y) for y in years],
+        fill_value=Config.DEFAULT_FC_PPA_VALUE,
+    ).to_numpy(dtype=float)
+
+    price_dist = model_data.price_dist.reindex(index=years, columns=time_blocks).to_numpy(dtype=float)
+    price_dur = model_data.price_dur["PercentTime"].reindex(time_blocks).to_numpy(dtype=float)
+
+    # Use the first technology's discount rate as the global discount rate
+    default_tech = list(tech_params.index)[0]
+    discount = 1 / (1 + float(tech_params.loc[default_tech, "DiscountRate"])) ** year_offset
+
+    return ModelParameters(
+        plants=plants,
+        years=years,
+        time_blocks=time_blocks,
+        technology=technology,
+        tech_code=table.tech_code,
+        capacity=capacity,
+        units=table.units,
+        start_year=start_year,
+        variable_cost=variable_cost,
+        life=life,
+        contract_price=table.contract_price,
+        min_plf=_tech_param(tech_params, technology, "MinPLF"),
+        max_plf=_tech_param(tech_params, technology, "MaxPLF"),
+        max_life=max_life,
+        rev_unit=rev_unit,
+        cost=cost,
+        fc_ppa=fc_ppa,
+        operating=operating,
+        expired=expired,
+        price_dist=price_dist,
+        price_dur=price_dur,
+        discount=discount,
+    )
+
+def technology_targets(model_data, scenario):
+    """
+    Per-technology generation targets (TWh) of a scenario from the Price_Gen table.
+
+    Returns:
+    dict: Target by (year, technology)
+    """
+    # price_gen index must be Technology_Scenario (e.g. PWRCOA001_BAU) or just Technology (same target for all scenarios)
+    price_gen_by_tech_year = {}
+    if hasattr(model_data, "price_gen") and not model_data.price_gen.empty:
+        for idx in model_data.price_gen.index:
+            idx_str = str(idx).strip()
+            tech_key = None
+            if idx_str.endswith(f"_{scenario}"):
+                tech_key = idx_str[:-len(f"_{scenario}")]
+            elif scenario == "BAU" and idx_str.endswith("_BAU"):
+                tech_key = idx_str[:-4]
+            elif "_" not in idx_str and idx_str in model_data.technologies:
+                # Excel has only Technology column (no Scenario): use for all scenarios
+                tech_key = idx_str
+            if tech_key is None:
+                continue
+            for y in model_data.years:
+                if y in model_data.price_gen.columns:
+                    val = model_data.price_gen.at[idx, y]
+                    if pd.notna(val):
+                        price_gen_by_tech_year[(y, tech_key)] = float(val)
+    return price_gen_by_tech_year
+
+def target_rows(targets, year_map, techs, max_plf, availability):
+    """
+    Right-hand sides of the technology rows for per-year technology targets.
+
+    The target of a decision year is the mean of the targets of the years it represents. Capacity is held
+    over the whole block, so the capacity requirement uses the largest of them and the minimum generation of
+    the kept capacity must fit under the smallest (achievable) one. Targets above what the fleet can generate
+    or hold are capped at the maximum possible and recorded.
+
+    Parameters:
+    targets (dict): Generation target (TWh) by (year, tech) of every model year, missing means 0
+    year_map (dict): Decision year of every model year (see year_blocks)
+    techs (list): Technologies with plants, in model order
+    max_plf (dict): MaxPLF of each technology
+    availability: Technology availability (see tech_availability_of)
+
+    Returns:
+    tuple: TechGenGoal targets (TWh), MinCapacityTech requirements (MW) and TechBlockMinGen limits (TWh), as
+        dicts by (year, tech) holding only the rows that apply, then the capped generation goals and the
+        capped capacity requirements
+    """
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    rep_years = sorted(set(year_map.values()))
+    block_years = {y: [yy for yy in year_map if year_map[yy] == y] for y in rep_years}
+    goal, min_capacity, block_min_gen = {}, {}, {}
+    gen_goal_capped, min_cap_capped = [], []
+    for y in rep_years:
+        for tech in techs:
+            block = [(yy, targets.get((yy, tech), 0)) for yy in block_years[y]]
+            block = [(yy, v) for yy, v in block if v > 0]
+            if not block:
+                continue
+            targets_twh = [v for _, v in block]
+            max_possible = availability.available_mw(tech, y)
+            max_gen_twh = max_possible * Config.HOURS_PER_YEAR * max_plf[tech] / Config.USD_TO_MILLIONS
+            target_twh = sum(targets_twh) / len(targets_twh)
+            goal[y, tech] = min(target_twh, max_gen_twh)
+            if target_twh > max_gen_twh:
+                gen_goal_capped.append({
+                    "Year": y, "Technology": tech,
+                    "Target_TWh": round(target_twh, 4),
+                    "MaxPossible_TWh": round(max_gen_twh, 4),
+                    "Note": "Target exceeds max achievable generation",
+                })
+            required_capacity = max(targets_twh) * Config.TWH_TO_MWH / (Config.HOURS_PER_YEAR * Config.MAX_LOAD_FACTOR)
+            min_capacity[y, tech] = min(required_capacity, max_possible)
+            if required_capacity > max_possible:
+                min_cap_capped.append({
+                    "Year": y, "Technology": tech,
+                    "Required_MW": round(required_capacity, 2),
+                    "MaxPossible_MW": round(max_possible, 2),
+                    "Note": "Minimum capacity requirement exceeds max possible capacity",
+                })
+            if len(block_years[y]) > 1:
+                block_min_gen[y, tech] = min(
+                    min(v, availability.available_mw(tech, yy) * max_plf[tech] * twh_per_mw)
+                    for yy, v in block)
+    return goal, min_capacity, block_min_gen, gen_goal_capped, min_cap_capped
+
+def objective_arrays(params, rep_pos, price_scenario):
+    """
+    Objective weights of each decision year: the discounted margin (and fixed cost) of every model year it
+    represents, counted only while the plant operates (is alive). Equal to DR * margin in annual mode.
+
+    Parameters:
+    params (ModelParameters): Precomputed parameter arrays
+    rep_pos (list): Position of each decision year in params.years
+    price_scenario (str): Price scenario of the margins and fixed costs
+
+    Returns:
+    tuple: Discounted block margins (G, R, T), fixed cost per MW of every model year (G, Y) and fixed cost
+        per MW kept in each decision year (G, R)
+    """
+    alive = ~params.expired
+    block_margin = np.add.reduceat(
+        (params.discount[None, :] * params.operating)[:, :, None] * params.block_margin(price_scenario),
+        rep_pos, axis=1)
+    fixed_coef = -params.discount[None, :] * params.fixed_cost_per_mw(price_scenario) / 1e6 / Config.USD_TO_MILLIONS
+    block_fixed_coef = np.add.reduceat(fixed_coef * alive, rep_pos, axis=1)
+    return block_margin, fixed_coef, block_fixed_coef
@@ -0,0 +1,370 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from pyomo.environ import Constraint, Var, TransformationFactory, value
+from pyomo.opt import TerminationCondition
+from pyomo.core.expr.numeric_expr import LinearExpression
+from config import Config
+from model_parameters import greedy_dispatch
+from result_processor import objective_value
+
+logger = logging.getLogger(__name__)
+
+# Presolve steps, in the order they are applied
+PRESOLVE_STEPS = ("gen-cap", "implied-bounds", "cover-cuts", "dominance")
+
+# Rows that couple the plants of a technology in a decision year
+_COUPLING_ROWS = ("TechGenGoal", "MinCapacityTech", "TechBlockMinGen", "TechGenCover")
+
+@dataclass
+class PresolveReport:
+    """What a presolve pass changed, and the LP relaxation bound before and after it"""
+    counts: Dict[str, int] = field(default_factory=dict)  # Step -> rows added or bounds tightened
+    bound_before: Optional[float] = None   # LP relaxation objective of the model as built
+    bound_after: Optional[float] = None    # LP relaxation objective after the presolve
+
+    def summary(self, objective=None) -> str:
+        """One-line summary; with the objective of a solution, the root gap before and after the presolve."""
+        text = ", ".join(f"{step}: {count}" for step, count in self.counts.items()) or "no steps"
+        if self.bound_before is None or self.bound_after is None:
+            return f"Presolve ({text})"
+        text += f"; LP bound {self.bound_before:,.2f} -> {self.bound_after:,.2f}"
+        if objective is not None and objective != 0:
+            gap_before = (self.bound_before - objective) / abs(objective)
+            gap_after = (self.bound_after - objective) / abs(objective)
+            text += f"; root gap {gap_before:.2%} -> {gap_after:.2%}"
+        return f"Presolve ({text})"
+
+def _capacity_terms(model, g, y):
+    """Cap[g,y] as (constant, coefficients, variables), whether Cap is a variable or a cumulative expression."""
+    if model.Cap.ctype is Var:
+        return 0.0, [1.0], [model.Cap[g, y]]
+    expr = model.Cap[g, y].expr
+    return expr.constant, list(expr.linear_coefs), list(expr.linear_vars)
+
+def _dispatch_durations(model):
+    """Duration (fraction of the year) of each dispatch block of Gen."""
+    if model._annual_dispatch:
+        return {Config.ANNUAL_DISPATCH_BLOCK: sum(value(model.Price_dur[t]) for t in model.t)}
+    return {t: value(model.Price_dur[t]) for t in model.t}
+
+def _tech_targets(model):
+    """Generation target (TWh) of every active TechGenGoal row, by (year, tech)."""
+    targets = {}
+    for (y, tech), con in model.TechGenGoal.items():
+        if con.active and con.equality:
+            targets[y, tech] = value(con.upper)
+    return targets
+
+def add_gen_cap_bounds(model):
+    """
+    Add GenCapBound: Gen[g,y,t] <= Cap[g,y] in every dispatch block.
+
+    The annual MaxPLF row only limits the duration-weighted sum of the blocks, so without this row the LP
+    relaxation can dispatch a plant at full nameplate in its best blocks while keeping a fraction of it.
+    Clusters already have these rows (ClusterGenCap), and with a single annual block MaxPLF implies them.
+
+    Returns:
+    int: Number of rows added
+    """
+    if model._annual_dispatch:
+        return 0
+    params = model._params
+    pos = params.position
+
+    def gen_cap_rule(model, g, y, t):
+        if params.units[pos[g]] > 1:
+            return Constraint.Skip
+        constant, coefs, variables = _capacity_terms(model, g, y)
+        return LinearExpression(constant=-constant, linear_coefs=[1.0] + [-c for c in coefs],
+                                linear_vars=[model.Gen[g, y, t]] + variables) <= 0
+    model.GenCapBound = Constraint(model.gyt, rule=gen_cap_rule)
+    return len(model.GenCapBound)
+
+def tighten_implied_bounds(model):
+    """
+    Tighten variable bounds implied by the model rows.
+
+    - Cap[g,y] <= CAP0 (CapBal1 with Retire >= 0)
+    - Gen[g,y,t] <= MaxPLF * CAP0 / Price_dur[t] (MaxPLF row)
+    - Gen[g,y,t] <= target / Price_dur[t] (TechGenGoal row of the plant's technology, in MW)
+
+    Returns:
+    int: Number of bounds tightened
+    """
+    params = model._params
+    pos = params.position
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    tightened = 0
+    if model.Cap.ctype is Var:
+        for (g, y), cap in model.Cap.items():
+            cap0 = params.total_capacity[pos[g]]
+            if cap.ub is None or cap.ub > cap0:
+                cap.setub(cap0)
+                tightened += 1
+    dur = _dispatch_durations(model)
+    targets = _tech_targets(model)
+    for (g, y, t), gen in model.Gen.items():
+        i = pos[g]
+        bound = params.max_plf[i] * params.total_capacity[i] / dur[t]
+        target = targets.get((y, params.technology[i]))
+        if target is not None:
+            bound = min(bound, target / (twh_per_mw * dur[t]))
+        if gen.ub is None or bound < gen.ub - 1e-9:
+            gen.setub(max(bound, 0.0))
+            tightened += 1
+    return tightened
+
+def add_cover_cuts(model):
+    """
+    Add TechGenCover: the number of units kept in a technology-year is at least the smallest number of its
+    units whose MaxPLF generation can meet the TechGenGoal target.
+
+    Any set of fewer units generates at most the sum of the largest MaxPLF * capacity * 8760 terms, which is
+    below the target, so the cut is valid; the LP relaxation otherwise keeps fractions of many plants.
+
+    Returns:
+    int: Number of rows added
+    """
+    params = model._params
+    pos = params.position
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    operating = {(g, y) for g, y, t in model.gyt}
+    targets = _tech_targets(model)
+    required_units = {}
+    for (y, tech), target in targets.items():
+        plants = [g for g in model.plants_by_tech[tech] if (g, y) in operating]
+        if target <= 0 or not plants:
+            continue
+        unit_energy = np.repeat([params.max_plf[pos[g]] * params.capacity[pos[g]] * twh_per_mw for g in plants],
+                                [int(params.units[pos[g]]) for g in plants])
+        reach = np.cumsum(np.sort(unit_energy)[::-1])
+        count = int(np.searchsorted(reach, target * (1 - 1e-9))) + 1
+        if count <= len(unit_energy):
+            required_units[y, tech] = (plants, count)
+
+    def cover_rule(model, y, tech):
+        plants, count = required_units[y, tech]
+        constant, coefs, variables = 0.0, [], []
+        for g in plants:
+            cap_constant, cap_coefs, cap_vars = _capacity_terms(model, g, y)
+            unit = params.capacity[pos[g]]  # units kept = Cap / unit capacity
+            constant += cap_constant / unit
+            coefs += [c / unit for c in cap_coefs]
+            variables += cap_vars
+        return LinearExpression(constant=constant, linear_coefs=coefs, linear_vars=variables) >= count
+    model.TechGenCover = Constraint(list(required_units), rule=cover_rule)
+    return len(model.TechGenCover)
+
+def _years_of(model):
+    """Decision years in which each plant has Cap/Retire, in order."""
+    years_of = {g: [] for g in model.g}
+    for g, y in model.gy:
+        years_of[g].append(y)
+    return years_of
+
+def _coupled_tech_years(model):
+    """(year, tech) pairs with an active row coupling the plants of the technology."""
+    coupled = set()
+    for name in _COUPLING_ROWS:
+        rows = getattr(model, name, None)
+        if rows is None:
+            continue
+        coupled.update(index for index, con in rows.items() if con.active)
+    return coupled
+
+def retirement_npv(model) -> pd.DataFrame:
+    """
+    Objective value of each plant for every choice of retirement year, ignoring the technology rows.
+
+    A plant retiring in year k keeps its nameplate capacity in the decision years before k and earns, in each
+    of them, the best dispatch allowed by MinPLF/MaxPLF (highest-margin blocks first, negative-margin blocks
+    only up to MinPLF) plus the capacity cost of the objective. The values use the objective coefficients
+    of build_model (discounted, $m).
+
+    Parameters:
+    model (ConcreteModel): Model returned by build_model
+
+    Returns:
+    DataFrame: Plants x (decision years + "Never"); NaN where the plant cannot retire that year, -inf where
+        keeping it that long is infeasible (MinPLF in a year it cannot generate)
+    """
+    params = model._params
+    rep_years = list(model.y_rep)
+    column = {y: j for j, y in enumerate(rep_years)}
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    operating = {(g, y) for g, y, t in model.gyt}
+    years_of = _years_of(model)
+    table = pd.DataFrame(np.nan, index=list(model.g), columns=rep_years + ["Never"])
+    for g, years in years_of.items():
+        if not years:
+            continue
+        i = params.position[g]
+        cols = [column[y] for y in years]
+        margin = model._block_margin[i, cols]  # (years, blocks)
+        positive = (np.where(margin > 0, params.price_dur[None, :], 0.0)).sum(axis=1)
+        energy = np.clip(positive, params.min_plf[i], min(params.max_plf[i], params.price_dur.sum()))
+        gen = greedy_dispatch(energy, margin, params.price_dur, np.ones(len(years)))
+        kept = ((margin * params.price_dur[None, :] * gen).sum(axis=1) * twh_per_mw
+                + model._capacity_coef[i, cols]) * params.total_capacity[i]
+        can_run = np.array([(g, y) in operating for y in years])
+        kept[~can_run & (params.min_plf[i] > 0)] = -np.inf
+        kept[~can_run & (params.min_plf[i] <= 0)] = model._capacity_coef[i, cols][~can_run] * params.total_capacity[i]
+        value_before = np.concatenate([[0.0], np.cumsum(kept)])  # value when retiring at each year, then never
+        table.loc[g, years + ["Never"]] = value_before
+    return table
+
+def _required_plants(model, years_of):
+    """
+    Last decision year through which each plant must be kept whole: the rest of its technology cannot meet
+    a TechGenGoal target (at MaxPLF) or a MinCapacityTech requirement without all of its units.
+    """
+    params = model._params
+    pos = params.position
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    operating = {(g, y) for g, y, t in model.gyt}
+    keep_until = {}
+
+    def check(rows, unit_size):
+        if rows is None:
+            return
+        for (y, tech), con in rows.items():
+            if not con.active or con.lower is None:
+                continue
+            requirement = value(con.lower)
+            plants = [g for g in model.plants_by_tech[tech] if (g, y) in model.gy]
+            sizes = {g: unit_size(g, y) for g in plants}
+            total = sum(sizes[g] * params.units[pos[g]] for g in plants)
+            for g in plants:
+                # Without one of its units the technology falls short of the requirement
+                if sizes[g] > 0 and total - sizes[g] < requirement * (1 - 1e-9):
+                    keep_until[g] = max(keep_until.get(g, y), y)
+
+    check(getattr(model, "TechGenGoal", None), lambda g, y: (
+        params.max_plf[pos[g]] * params.capacity[pos[g]] * twh_per_mw if (g, y) in operating else 0.0))
+    check(getattr(model, "MinCapacityTech", None), lambda g, y: params.capacity[pos[g]])
+    return keep_until
+
+def fix_dominated_retirements(model):
+    """
+    Fix Retire variables whose value is decided before the solve.
+
+    - A plant that the rest of its technology cannot replace is kept through that year (Retire = 0).
+    - A plant that must have zero capacity in some year (MinPLF > 0 while it cannot generate) cannot retire
+      after it (Retire = 0 in later years).
+    - After the last year with a target or capacity row for its technology, a plant is independent of the
+      other plants: if it is still in service, it retires in the best of the remaining retirement_npv
+      columns (all of its units at once), so every other later year is fixed to Retire = 0. A plant without
+      such rows in any of its years has its whole retirement schedule fixed.
+
+    Returns:
+    int: Number of Retire variables fixed
+    """
+    params = model._params
+    years_of = _years_of(model)
+    coupled = _coupled_tech_years(model)
+    npv = retirement_npv(model)
+    keep_until = _required_plants(model, years_of)
+    fixed, decoupled, kept, forced = 0, 0, 0, 0
+
+    def fix(g, y, level):
+        nonlocal fixed
+        var = model.Retire[g, y]
+        if not var.fixed:
+            var.fix(level)
+            fixed += 1
+
+    for g, years in years_of.items():
+        if not years:
+            continue
+        tech = params.technology[params.position[g]]
+        row = npv.loc[g, years + ["Never"]].to_numpy()
+        # Latest year a retirement can happen: the first year the plant cannot be kept
+        infeasible = [y for y, v in zip(years, np.diff(row)) if v == -np.inf]
+        retire_by = infeasible[0] if infeasible else None
+        if g in keep_until and retire_by is not None and keep_until[g] >= retire_by:
+            logger.warning(f"Plant {g} must be kept through {keep_until[g]} but cannot operate in {retire_by}")
+            continue
+        coupled_years = [y for y in years if (y, tech) in coupled]
+        tail = years.index(coupled_years[-1]) + 1 if coupled_years else 0
+        if tail < len(years):
+            # Best choice among retiring in one of the tail years and never retiring
+            best = tail + int(np.argmax(row[tail:]))
+            for k in range(tail, len(years)):
+                if k != best:
+                    fix(g, years[k], 0)
+                elif not coupled_years:
+                    fix(g, years[k], params.units[params.position[g]])
+            decoupled += 1
+        if g in keep_until:
+            for y in years:
+                if y <= keep_until[g]:
+                    fix(g, y, 0)
+            kept += 1
+        if retire_by is not None:
+            for y in years:
+                if y > retire_by:
+                    fix(g, y, 0)
+            forced += 1
+    logger.info(f"Dominance presolve fixed {fixed} of {len(model.Retire)} Retire variables "
+                f"({decoupled} plants independent after their last technology row, {kept} plants kept for their technology targets, "
+                f"{forced} plants that must retire before they stop operating)")
+    return fixed
+
+_STEP_FUNCTIONS = {
+    "gen-cap": add_gen_cap_bounds,
+    "implied-bounds": tighten_implied_bounds,
+    "cover-cuts": add_cover_cuts,
+    "dominance": fix_dominated_retirements,
+}
+
+def relaxation_bound(model, solver):
+    """
+    Objective of the LP relaxation of a model, solved on a copy.
+
+    Returns:
+    float: LP relaxation objective, or None unless the relaxation is solved to optimality
+    """
+    relaxed = model.clone()
+    TransformationFactory('core.relax_integer_vars').apply_to(relaxed)
+    try:
+        result = solver.solve(relaxed)
+    except Exception as e:
+        logger.warning(f"LP relaxation could not be solved: {e}")
+        return None
+    termination = result.solver.termination_condition
+    if termination != TerminationCondition.optimal:
+        # A feasible but unfinished (e.g. time-limited) LP solve does not bound the MIP optimum
+        logger.warning(f"LP relaxation not solved to optimality (termination={termination}); no bound reported")
+        return None
+    return objective_value(relaxed)
+
+def run_presolve(model, steps: List[str], solver=None, report=False) -> PresolveReport:
+    """
+    Apply FFRM presolve steps to a built model.
+
+    Parameters:
+    model (ConcreteModel): Model returned by build_model
+    steps (list): Names from PRESOLVE_STEPS to apply
+    solver: Solver used for the LP relaxation bounds when report is set
+    report (bool): Solve the LP relaxation before and after the presolve
+
+    Returns:
+    PresolveReport: Rows and bounds changed by each step, and the relaxation bounds
+    """
+    unknown = set(steps) - set(PRESOLVE_STEPS)
+    if unknown:
+        raise ValueError(f"Unknown presolve steps {sorted(unknown)}. Must be among {list(PRESOLVE_STEPS)}")
+    result = PresolveReport()
+    if report and solver is not None:
+        result.bound_before = relaxation_bound(model, solver)
+    for step in PRESOLVE_STEPS:
+        if step in steps:
+            result.counts[step] = _STEP_FUNCTIONS[step](model)
+    model._presolved = bool(steps)  # cuts and fixings depend on the targets (see model.retarget_model)
+    if report and solver is not None:
+        result.bound_after = relaxation_bound(model, solver)
+    logger.info(result.summary())
+    return result
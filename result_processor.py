@@ -1,8 +1,147 @@
+import numpy as np
 import pandas as pd
 from pyomo.core.util import quicksum
 from pyomo.environ import value
 from pathlib import Path
 from config import Config  # NEW: Import Config class for constants
+from model_parameters import greedy_dispatch
+from scaling import unscale_model
+
+def decision_year(model, y):
+    """Year whose variables stand for model year y (the representative year of its block, else y itself)."""
+    year_map = getattr(model, "_year_map", None)
+    return year_map.get(y, y) if year_map else y
+
+def objective_value(model):
+    """Value of the active objective (model.Obj is indexed by price scenario in re-targetable models)."""
+    if model.Obj.is_indexed():
+        return next(value(obj) for obj in model.Obj.values() if obj.active)
+    return value(model.Obj)
+
+def gen_value(model, g, y, t):
+    """
+    Solved Gen(g,y,t); plant-years outside the plant's operating life have no variable and generate 0.
+
+    A model dispatched in a single annual block generates the same MW in every time block, unless it
+    values that level through revenue curves, in which case the highest-margin blocks are filled first.
+    Years that are not representative years repeat the dispatch of their representative year.
+    """
+    params = model._params
+    if not params.operating[params.position[g], y - params.years[0]]:
+        return 0.0
+    y = decision_year(model, y)
+    if getattr(model, "_revenue_curve", False):
+        return curve_dispatch(model, g, y).get(t, 0.0)
+    if getattr(model, "_annual_dispatch", False):
+        t = Config.ANNUAL_DISPATCH_BLOCK
+    return model.Gen[g, y, t].value if (g, y, t) in model.Gen else 0.0
+
+def curve_dispatch(model, g, y):
+    """Block dispatch {t: Gen} of a revenue-curve model, rebuilt from the solved annual level."""
+    if (g, y, Config.ANNUAL_DISPATCH_BLOCK) not in model.Gen:
+        return {}
+    level = model.Gen[g, y, Config.ANNUAL_DISPATCH_BLOCK].value
+    if not hasattr(model, "_curve_dispatch"):
+        model._curve_dispatch = {}
+    cached = model._curve_dispatch.get((g, y))
+    if cached is None or cached[0] != level:
+        params = model._params
+        i, j = params.position[g], y - params.years[0]
+        gen = greedy_dispatch(
+            np.array([level * params.price_dur.sum()]),
+            model._curve_margin[i, j][None, :],
+            params.price_dur,
+            params.capacity[i:i + 1],
+        )[0]
+        cached = (level, dict(zip(params.time_blocks, gen.tolist())))
+        model._curve_dispatch[(g, y)] = cached
+    return cached[1]
+
+def cap_value(model, g, y):
+    """
+    Solved Cap(g,y); expired plant-years have no variable and hold FIXED_CAPACITY_EXPIRED.
+
+    With cumulative retirement Cap is an expression of the Retire variables.
+    """
+    params = model._params
+    if params.expired[params.position[g], y - params.years[0]]:
+        return Config.FIXED_CAPACITY_EXPIRED
+    y = decision_year(model, y)
+    return value(model.Cap[g, y], exception=False) if (g, y) in model.Cap else Config.FIXED_CAPACITY_EXPIRED
+
+def retire_value(model, g, y):
+    """
+    Solved Retire(g,y), including the expired plant-years that have no variable.
+
+    A plant still in service when it exceeds MaxLife retires (all of its remaining units) in its first
+    expired year. Retirements
+    are only decided in representative years, every other year of their block retires nothing.
+    """
+    params = model._params
+    i, j = params.position[g], y - params.years[0]
+    if params.expired[i, j]:
+        if j > 0 and params.expired[i, j - 1]:
+            return 0.0  # expired in an earlier year
+        return params.units[i] - sum(model.Retire[g, yy].value for yy in model.y if yy < y and (g, yy) in model.Retire)
+    if (g, y) not in model.Retire:
+        return 0.0
+    return model.Retire[g, y].value
+
+def fixed_cost_on_nameplate(model):
+    """True when fixed costs are reported on nameplate capacity rather than on the capacity kept."""
+    return model.s.at(1) != "AD"
+
+def fixed_cost_capacity(model, g, y):
+    """Capacity (MW) the fixed cost of plant g is charged on in year y."""
+    # Use the corresponding capacity based on scenario
+    return model.CAP0[g] if fixed_cost_on_nameplate(model) else cap_value(model, g, y)
+
+def fixed_cost_rate(model, g, y):
+    """Fixed cost per MW of plant g in year y under the model's price scenario."""
+    # NEW: Using Config constants for price scenario handling (was hardcoded /1e3 and 100)
+    return model.FC_PPA[g, y]/Config.USD_TO_THOUSANDS if model.p.at(1) == "AvgPPAPrice" else Config.DEFAULT_COST_PER_MW_MarketPrice
+
+def disaggregate_clusters(model, results):
+    """
+    Expand the plant-level results of a clustered model to its units.
+
+    Units of a cluster retire in gen_data order: the first unit retires with the first retired unit of
+    the cluster, and so on. Generation, capacity and net revenue of the units still in service are split
+    evenly between them; fixed costs on nameplate capacity are split between all units.
+
+    Parameters:
+    model (ConcreteModel): The solved clustered model
+    results (dict): Results of process_model_results at cluster level
+
+    Returns:
+    dict: The results with unit-level PlantGen, retire_sched, plant_cap and plant_netrev
+    """
+    params = model._params
+    years = list(model.y)
+    gen, retire, cap = {}, {}, {}
+    netrev = {"annual": {}, "depreciated_capex": {}}
+    for cluster, units in model._clusters.items():
+        n = len(units)
+        retired = np.cumsum([round(results["retire_sched"][cluster][y]) for y in years])  # units retired so far
+        for k, unit in enumerate(units):
+            gen[unit], retire[unit], cap[unit], netrev["annual"][unit] = {}, {}, {}, {}
+            netrev["depreciated_capex"][unit] = results["plant_netrev"]["depreciated_capex"][cluster] / n
+        for j, y in enumerate(years):
+            in_service = [k for k in range(n) if k >= retired[j]]
+            before = retired[j - 1] if j > 0 else 0
+            fixed_rate = fixed_cost_rate(model, cluster, y) / Config.USD_TO_MILLIONS
+            # Generation margin of the cluster, shared by the units in service
+            margin = results["plant_netrev"]["annual"][cluster][y] + fixed_cost_capacity(model, cluster, y) * fixed_rate
+            for k, unit in enumerate(units):
+                share = 1 / len(in_service) if k in in_service else 0.0
+                retire[unit][y] = 1.0 if before <= k < retired[j] else 0.0
+                gen[unit][y] = results["PlantGen"][cluster][y] * share
+                cap[unit][y] = results["plant_cap"][cluster][y] * share
+                unit_capacity = model.CAP0[cluster] / n if fixed_cost_on_nameplate(model) else cap[unit][y]
+                netrev["annual"][unit][y] = margin * share - unit_capacity * fixed_rate
+    results = dict(results)
+    results.update({"PlantGen": gen, "retire_sched": retire, "plant_cap": cap, "plant_netrev": netrev})
+    return results
 
 def process_model_results(model):
     """
@@ -15,6 +154,7 @@ def process_model_results(model):
     dict: Processed results including generation, revenue, and capacity data
     """
     try:
+        unscale_model(model)  # NEW: results are always reported in model units
         gen = calculate_total_generation(model)
         # net_rev = calculate_net_revenue(model)
         # total_cap = calculate_total_capacity(model)
@@ -45,6 +185,8 @@ def process_model_results(model):
             out["MinCapacityCapped"] = min_cap_capped
         if gen_goal_capped:
             out["GenGoalCapped"] = gen_goal_capped
+        if getattr(model, "_clusters", None):
+            out = disaggregate_clusters(model, out)
         return out
     except Exception as e:
         raise RuntimeError(f"Error processing model results: {str(e)}")
@@ -180,7 +322,7 @@ def calculate_annual_summary(model):
                 # Total Coal Generation (TWh)
                 # NEW: Using Config constants for time conversion (was hardcoded 8.76/1000)
                 "Total Coal Gen TWh": sum(
-                    model.Gen[g, y, t].value * model.Price_dur[t] * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+                    gen_value(model, g, y, t) * model.Price_dur[t] * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
                     for g in model.g 
                     for t in model.t
                 ),
@@ -188,7 +330,7 @@ def calculate_annual_summary(model):
                 # Total Capacity (GW)
                 # NEW: Using Config constant for MW to GW conversion (was hardcoded /1000)
                 "Total Capacity GW": sum(
-                    model.Cap[g, y].value for g in model.g
+                    cap_value(model, g, y) for g in model.g
                 ) / Config.MW_TO_GW,
                 
                 # Total Undiscounted Net Revenue ($b)
@@ -219,6 +361,7 @@ def calculate_plant_netrev(model):
     """
     try:
         plant_netrev = {"annual": {}, "depreciated_capex": {}}
+        params = model._params
         
         # Calculate annual net revenue for each plant
         for g in model.g:
@@ -239,18 +382,12 @@ def calculate_plant_netrev(model):
                     print("--------------------------------") 
                     print
                 '''
-                netrev = -(
-                            # Use the corresponding capacity based on scenario
-                            model.Cap[g, y].value if model.s.at(1) == "AD" else model.GenData[g]["CAPACITY"]
-                        ) *(
-                            # NEW: Using Config constants for price scenario handling (was hardcoded /1e3 and 100)
-                            model.FC_PPA[g, y]/Config.USD_TO_THOUSANDS if model.p.at(1) == "AvgPPAPrice" else Config.DEFAULT_COST_PER_MW_MarketPrice
-                        ) + quicksum(
+                netrev = -fixed_cost_capacity(model, g, y) * fixed_cost_rate(model, g, y) + quicksum(
                         (
                             model.rev_unit[g, y, model.p.at(1)] * 
                             model.Price_Dist1[y, model.p.at(1), t] - 
                             model.cost[g, y]
-                        ) * model.Gen[g, y, t].value * model.Price_dur[t] * Config.HOURS_PER_YEAR
+                        ) * gen_value(model, g, y, t) * model.Price_dur[t] * Config.HOURS_PER_YEAR
                         for t in model.t
                     )
                
@@ -260,9 +397,9 @@ def calculate_plant_netrev(model):
             # Calculate depreciated capex
             # NEW: Using Config constant for conversion to thousands (was hardcoded /1000)
             # Get technology type for this plant
-            tech_type = value(model.GenData[g]["TECHNOLOGY"])
+            tech_type = params.technology[params.position[g]]
             plant_netrev["depreciated_capex"][g] = max(
-                model.GenData[g]["CAPACITY"] * 
+                model.CAP0[g] * 
                 model.TechParams[tech_type, "CoalCapex $/kW"] *
                 (1 - model.TechParams[tech_type, "Straight-line depreciation"] * model.life[g]), 
                 0
@@ -337,7 +474,7 @@ def calculate_total_generation(model):
             #             print(model.Gen[g, y, t])
                 # NEW: Using Config constant for hours per year (was hardcoded 8.76)
                 gen[g][y] = round(sum(
-                    model.Gen[g, y, t].value * model.Price_dur[t] * Config.HOURS_PER_YEAR/Config.USD_TO_THOUSANDS for t in model.t),5)
+                    gen_value(model, g, y, t) * model.Price_dur[t] * Config.HOURS_PER_YEAR/Config.USD_TO_THOUSANDS for t in model.t),5)
         
         return gen
     except Exception as e:
@@ -373,7 +510,7 @@ def calculate_total_capacity(model):
         total_capacity = {}
         for y in model.y:    
             total_capacity_mw = sum(
-                model.Cap[g, y].value for g in model.g
+                cap_value(model, g, y) for g in model.g
             )
             # print(f"Total Capacity: {total_capacity_mw}")
             # NEW: Using Config constant for MW to GW conversion (was hardcoded /1000)
@@ -398,7 +535,7 @@ def calculate_plant_capacity(model):
         for g in model.g:
             plant_capacity[g] = {}
             for y in model.y:
-                plant_capacity[g][y] = model.Cap[g, y].value
+                plant_capacity[g][y] = cap_value(model, g, y)
         return plant_capacity
     except Exception as e:
         raise RuntimeError(f"Error calculating plant capacity: {str(e)}")
@@ -419,7 +556,7 @@ def calculate_retirement_schedule(model):
         for g in model.g:
             retirement[g] = {}
             for y in model.y:
-                retirement[g][y] = model.Retire[g, y].value
+                retirement[g][y] = retire_value(model, g, y)
         return retirement
     except Exception as e:
         raise RuntimeError(f"Error calculating retirement schedule: {str(e)}")
@@ -432,7 +569,7 @@ def calculate_generation_by_technology(model):
             gen_by_tech[tech] = {}
             for y in model.y:
                 gen_by_tech[tech][y] = round(sum(
-                    sum(model.Gen[g, y, t].value * model.Price_dur[t] * Config.HOURS_PER_YEAR/Config.USD_TO_THOUSANDS for t in model.t)
+                    sum(gen_value(model, g, y, t) * model.Price_dur[t] * Config.HOURS_PER_YEAR/Config.USD_TO_THOUSANDS for t in model.t)
                     for g in model.plants_by_tech[tech]
                 ), 5)
         return gen_by_tech
@@ -445,7 +582,7 @@ def calculate_capacity_by_technology(model):
         for tech in model.tech:
             cap_by_tech[tech] = {}
             for y in model.y:
-                cap_by_tech[tech][y] = sum(model.Cap[g, y].value for g in model.plants_by_tech[tech])
+                cap_by_tech[tech][y] = sum(cap_value(model, g, y) for g in model.plants_by_tech[tech])
         return cap_by_tech
     except Exception as e:
         raise RuntimeError(f"Error calculating capacity by technology: {str(e)}")
@@ -0,0 +1,117 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+from config import Config
+from model import build_model, fix_retirements, solver_succeeded
+from result_processor import cap_value, calculate_retirement_schedule, objective_value, process_model_results
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RollingHorizonOptions:
+    """Window lengths of a rolling-horizon solve"""
+    window: int = Config.ROLLING_WINDOW   # Years solved together
+    commit: int = Config.ROLLING_COMMIT   # Years of each window whose retirements are kept (window - overlap)
+    compare: bool = False                 # Also solve the full model and report the gap of the stitched schedule
+
+def horizon_windows(first_year, last_year, window, commit) -> List[Tuple[int, int, int]]:
+    """
+    Overlapping windows covering first_year..last_year.
+
+    Parameters:
+    first_year, last_year (int): Model years
+    window (int): Years solved together
+    commit (int): Years committed from each window, the next window starts after them
+
+    Returns:
+    list: (first year, last year, last committed year) of each window; the last window commits all its years
+    """
+    if not 0 < commit <= window:
+        raise ValueError(f"The committed years ({commit}) must be between 1 and the window length ({window})")
+    windows = []
+    start = first_year
+    while True:
+        end = min(start + window - 1, last_year)
+        if end == last_year:
+            windows.append((start, end, end))
+            return windows
+        windows.append((start, end, start + commit - 1))
+        start += commit
+
+def run_rolling_horizon(model_data, scenario, price_scenario, solver, options=None, build_options=None,
+                        solver_tee=False):
+    """
+    Solve a scenario over overlapping windows of years and stitch the committed retirements into one result.
+
+    Each window is built for its years only (see build_model horizon) and starts from the capacity left by the
+    retirements committed so far. The retirements of its first options.commit years are kept and the next window
+    starts after them. The stitched schedule is then fixed in the full model, whose dispatch is solved as an LP
+    to report the results and the stitched objective.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    solver: Configured solver instance
+    options (RollingHorizonOptions): Window lengths
+    build_options (dict): Keyword options for build_model (representative years are not used)
+    solver_tee (bool): Show the solver output
+
+    Returns:
+    dict: Results for the scenario, with the windows and objectives under RollingHorizon
+    """
+    options = options or RollingHorizonOptions()
+    build_options = dict(build_options or {})
+    if build_options.pop('representative_years', None):
+        logger.warning("--representative-years is not used with --rolling-horizon; every year is solved")
+    start = time.perf_counter()
+    first_year = min(model_data.years)
+    last_year = min(max(model_data.years), Config.DEFAULT_END_YEAR)
+    windows = horizon_windows(first_year, last_year, options.window, options.commit)
+
+    schedule = {g: {} for g in model_data.plants}
+    capacity = None
+    for number, (window_start, window_end, commit_end) in enumerate(windows, 1):
+        model = build_model(model_data, scenario, price_scenario, horizon=(window_start, window_end),
+                            initial_capacity=capacity, **build_options)
+        result = solver.solve(model, tee=solver_tee)
+        if not solver_succeeded(result):
+            raise RuntimeError(
+                f"Window {window_start}-{window_end} of {scenario}_{price_scenario} has no solution "
+                f"(termination={result.solver.termination_condition}); if it is infeasible, the retirements "
+                f"committed before it may leave too little capacity for its targets, try a longer window")
+        logger.info(f"{scenario}_{price_scenario}: window {number}/{len(windows)} {window_start}-{window_end} "
+                    f"objective {objective_value(model):,.2f}, committed to {commit_end}")
+        for g, retirements in calculate_retirement_schedule(model).items():
+            schedule[g].update({y: r for y, r in retirements.items() if y <= commit_end})
+        capacity = {g: cap_value(model, g, commit_end) for g in model.g}
+
+    # Stitched schedule in the full model: only the dispatch is left to solve
+    model = build_model(model_data, scenario, price_scenario, **build_options)
+    fix_retirements(model, schedule)
+    result = solver.solve(model, tee=solver_tee)
+    if not solver_succeeded(result):
+        raise RuntimeError(f"The stitched schedule of {scenario}_{price_scenario} is infeasible in the full model "
+                           f"(termination={result.solver.termination_condition})")
+    stitched = objective_value(model)
+    report = {"Windows": len(windows), "WindowYears": options.window, "CommittedYears": options.commit,
+              "StitchedObjective": stitched, "FullObjective": None, "Gap": None}
+    results = process_model_results(model)
+    if options.compare:
+        full = build_model(model_data, scenario, price_scenario, **build_options)
+        result = solver.solve(full, tee=solver_tee)
+        if solver_succeeded(result):
+            report["FullObjective"] = objective_value(full)
+            report["Gap"] = (report["FullObjective"] - stitched) / max(abs(report["FullObjective"]), Config.TOLERANCE)
+        else:
+            logger.warning(f"Full solve of {scenario}_{price_scenario} failed "
+                           f"(termination={result.solver.termination_condition}); no comparison")
+    report["Seconds"] = time.perf_counter() - start
+    message = f"{scenario}_{price_scenario}: rolling horizon objective {stitched:,.2f} over {len(windows)} windows"
+    if report["Gap"] is not None:
+        message += f", full solve {report['FullObjective']:,.2f} (gap {report['Gap']:.3%})"
+    logger.info(message)
+    print(message)
+    results["RollingHorizon"] = report
+    return results
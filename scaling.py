@@ -0,0 +1,145 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict
+from pyomo.environ import Constraint, Objective, Var, value
+from pyomo.core.expr.numeric_expr import LinearExpression
+from pyomo.repn import generate_standard_repn
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Unit of every row and variable component of build_model and the presolve (others are left unscaled)
+_CAPACITY_ROWS = ("MinPLF", "CapBal", "CapBal1", "ClusterGenCap", "GenCapBound", "MinCapacityTech")
+_ENERGY_ROWS = ("MaxPLF", "TechGenGoal", "TechBlockMinGen")
+_MONEY_ROWS = ("RevenueCurve",)
+_CAPACITY_VARS = ("Gen", "Cap")
+_MONEY_VARS = ("GenRev",)
+
+@dataclass(frozen=True)
+class UnitSystem:
+    """Units the solver sees: energy rows, money (objective) and capacity (MW rows and variables)"""
+    energy: str = Config.DEFAULT_SCALE_UNITS[0]
+    money: str = Config.DEFAULT_SCALE_UNITS[1]
+    capacity: str = Config.DEFAULT_SCALE_UNITS[2]
+
+    def __post_init__(self):
+        for name, units in (("energy", Config.SCALE_ENERGY_UNITS), ("money", Config.SCALE_MONEY_UNITS),
+                            ("capacity", Config.SCALE_CAPACITY_UNITS)):
+            if getattr(self, name) not in units:
+                raise ValueError(f"Invalid {name} unit {getattr(self, name)!r}. Must be one of {list(units)}")
+
+    @property
+    def energy_factor(self) -> float:
+        return Config.SCALE_ENERGY_UNITS[self.energy]
+
+    @property
+    def money_factor(self) -> float:
+        return Config.SCALE_MONEY_UNITS[self.money]
+
+    @property
+    def capacity_factor(self) -> float:
+        return Config.SCALE_CAPACITY_UNITS[self.capacity]
+
+def scaling_factors(model, units: UnitSystem):
+    """
+    Scaling factor of each variable and row component: scaled value = factor * model value.
+
+    GenRev is scaled to the money unit of its objective term (Config.HOURS_PER_YEAR / 1e6 $m per unit).
+
+    Returns:
+    tuple: ({var name: factor}, {row name: factor}, objective factor)
+    """
+    genrev = units.money_factor * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    var_factors = {name: units.capacity_factor for name in _CAPACITY_VARS}
+    var_factors.update({name: genrev for name in _MONEY_VARS})
+    row_factors = {name: units.capacity_factor for name in _CAPACITY_ROWS}
+    row_factors.update({name: units.energy_factor for name in _ENERGY_ROWS})
+    row_factors.update({name: genrev for name in _MONEY_ROWS})
+    present = lambda names, ctype: {n: f for n, f in names.items()
+                                    if model.component(n) is not None and model.component(n).ctype is ctype}
+    return present(var_factors, Var), present(row_factors, Constraint), units.money_factor
+
+def _scaled_body(body, row_factor, var_factor):
+    """Linear body with every variable replaced by its scaled variable and the row multiplied by row_factor."""
+    if type(body) is LinearExpression:
+        constant, coefs, variables = body.constant, body.linear_coefs, body.linear_vars
+    else:
+        repn = generate_standard_repn(body, compute_values=True)
+        if not repn.is_linear():
+            raise ValueError(f"Cannot scale nonlinear expression {body}")
+        constant, coefs, variables = repn.constant, repn.linear_coefs, repn.linear_vars
+    return LinearExpression(
+        constant=value(constant) * row_factor,
+        linear_coefs=[value(c) * row_factor / var_factor(v) for c, v in zip(coefs, variables)],
+        linear_vars=list(variables))
+
+def _variables_of(body):
+    """Variables of a linear row body."""
+    if type(body) is LinearExpression:
+        return body.linear_vars
+    return generate_standard_repn(body, compute_values=True).linear_vars
+
+def _scale_variables(model, var_factors: Dict[str, float]):
+    """Multiply the bounds and values of scaled variables in place; returns {id(var): factor}."""
+    factor_of = {}
+    for name, factor in var_factors.items():
+        for var in model.component(name).values():
+            factor_of[id(var)] = factor
+            lb, ub = var.lb, var.ub
+            var.setlb(None if lb is None else lb * factor)
+            var.setub(None if ub is None else ub * factor)
+            if var.value is not None:
+                var.set_value(var.value * factor, skip_validation=True)
+    return factor_of
+
+def scale_model(model, units: UnitSystem):
+    """
+    Rescale a built model in place for the solver.
+
+    Variables and rows are expressed in the chosen units (see scaling_factors); the objective value is in
+    the money unit. Call unscale_model after the solve (process_model_results does it when needed).
+
+    Parameters:
+    model (ConcreteModel): Model returned by build_model, possibly presolved
+    units (UnitSystem): Units the solver sees
+    """
+    if getattr(model, "_scaling", None) is not None:
+        raise ValueError("Model is already scaled")
+    var_factors, row_factors, objective_factor = scaling_factors(model, units)
+    bounds = {name: [(var.lb, var.ub) for var in model.component(name).values()] for name in var_factors}
+    factor_of = _scale_variables(model, var_factors)
+    var_factor = lambda v: factor_of.get(id(v), 1.0)
+    # Original rows and objectives are kept so unscale_model restores them exactly (including mutable Params)
+    rows, objectives = [], []
+    for con in model.component_data_objects(Constraint):
+        row_factor = row_factors.get(con.parent_component().local_name, 1.0)
+        if row_factor == 1.0 and not any(id(v) in factor_of for v in _variables_of(con.body)):
+            continue
+        rows.append((con, con.expr))
+        lower = None if con.lower is None else value(con.lower) * row_factor
+        upper = None if con.upper is None else value(con.upper) * row_factor
+        body = _scaled_body(con.body, row_factor, var_factor)
+        con.set_value((lower, body) if con.equality else (lower, body, upper))
+    for obj in model.component_data_objects(Objective):
+        objectives.append((obj, obj.expr))
+        obj.expr = _scaled_body(obj.expr, objective_factor, var_factor)
+    model._scaling = (var_factors, bounds, rows, objectives)
+    logger.info(f"Scaled model to {units.energy}, {units.money}, {units.capacity}")
+
+def unscale_model(model):
+    """Undo scale_model: the original rows, objective and bounds are restored and solved values unscaled."""
+    scaling = getattr(model, "_scaling", None)
+    if scaling is None:
+        return
+    var_factors, bounds, rows, objectives = scaling
+    for name, factor in var_factors.items():
+        for var, (lb, ub) in zip(model.component(name).values(), bounds[name]):
+            var.setlb(lb)
+            var.setub(ub)
+            if var.value is not None:
+                var.set_value(var.value / factor, skip_validation=True)
+    for con, expr in rows:
+        con.set_value(expr)
+    for obj, expr in objectives:
+        obj.expr = expr
+    model._scaling = None
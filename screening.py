@@ -0,0 +1,204 @@
+import logging
+import time
+import numpy as np
+from pyomo.environ import TransformationFactory, value
+from config import Config
+from model import build_model, fix_retirements, refine_annual, solver_succeeded
+from result_processor import objective_value, process_model_results
+
+logger = logging.getLogger(__name__)
+
+def _decision_years(model):
+    """Decision years in which each plant has Retire/Cap variables, in order."""
+    years = {g: [] for g in model.g}
+    for g, y in model.gy:
+        years[g].append(y)
+    return years
+
+def round_retirements(model, threshold=Config.RELAX_ROUND_THRESHOLD):
+    """
+    Round the retirements of a solved LP relaxation to whole units.
+
+    The cumulative retirements of each plant are rounded rather than the yearly values, so a retirement spread
+    over several years by the relaxation happens once, in the first year its cumulative value reaches threshold
+    (for a cluster, unit k retires when it reaches k - 1 + threshold). The relaxation keeps fractions of plants
+    that earn their dispatch margin, so a threshold near 1 retires them late rather than early.
+
+    Parameters:
+    model (ConcreteModel): Solved model with relaxed Retire variables
+    threshold (float): Fraction of a unit retired by the relaxation from which it is retired
+
+    Returns:
+    dict: Cumulative retired units of each plant (ndarray over its decision years)
+    """
+    params = model._params
+    retired = {}
+    for g, years in _decision_years(model).items():
+        relaxed = np.cumsum([value(model.Retire[g, y]) for y in years])
+        limit = Config.MAX_RETIREMENTS_PER_PLANT * params.units[params.position[g]]
+        retired[g] = np.minimum(np.floor(relaxed + 1 - threshold + Config.TOLERANCE), limit)
+    return retired
+
+def repair_retirements(model, retired):
+    """
+    Change rounded retirements until the technology rows of every decision year can be met.
+
+    In each decision year, a technology short of capacity (MinCapacityTech) or of generation (TechGenGoal at
+    MaxPLF) keeps a retired unit through that year, and one whose kept capacity must generate more than its
+    target (MinPLF, TechBlockMinGen) retires a kept unit in that year. The unit changed is the one the rounding
+    moved furthest from the LP relaxation.
+
+    Parameters:
+    model (ConcreteModel): Solved model with relaxed Retire variables
+    retired (dict): Cumulative retired units of each plant, as returned by round_retirements (changed in place)
+
+    Returns:
+    int: Number of unit retirements changed, or None when the schedule could not be repaired
+    """
+    params = model._params
+    pos = params.position
+    twh_per_mw = Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+    years_of = _decision_years(model)
+    rank = {g: {y: k for k, y in enumerate(years)} for g, years in years_of.items()}
+    relaxed = {g: np.cumsum([value(model.Retire[g, y]) for y in years]) for g, years in years_of.items()}
+    limit = {g: Config.MAX_RETIREMENTS_PER_PLANT * params.units[pos[g]] for g in years_of}
+
+    def kept(g, y):
+        return params.total_capacity[pos[g]] - params.capacity[pos[g]] * retired[g][rank[g][y]]
+
+    def operating(g, y):
+        return bool(params.operating[pos[g], y - params.years[0]])
+
+    def keepable(g, y):
+        # MinPLF forces the capacity of a plant-year without generation to zero
+        return operating(g, y) or params.min_plf[pos[g]] <= 0
+
+    def bound(rows, y, tech, side):
+        if (y, tech) not in rows or not rows[y, tech].active:
+            return np.nan
+        return value(getattr(rows[y, tech], side))
+
+    changes = 0
+    for _ in range(Config.RELAX_REPAIR_PASSES):
+        changed = False
+        for y in model.y_rep:
+            for tech in model.tech:
+                plants = [g for g in model.plants_by_tech[tech] if (g, y) in model.gy]
+                if not plants:
+                    continue
+                goal = bound(model.TechGenGoal, y, tech, "upper")
+                required = bound(model.MinCapacityTech, y, tech, "lower")
+                limit_twh = bound(model.TechBlockMinGen, y, tech, "upper")
+                tolerance = Config.TOLERANCE * max(1.0, np.nan_to_num(abs(goal)), np.nan_to_num(abs(required)))
+                while True:
+                    cap = sum(kept(g, y) for g in plants)
+                    hi = sum(kept(g, y) * params.max_plf[pos[g]] for g in plants if operating(g, y)) * twh_per_mw
+                    short_energy = hi < goal - tolerance  # False for NaN (no row)
+                    if not (short_energy or cap < required - tolerance):
+                        break
+                    # Keep one more unit through y: cumulative retirements up to y drop below their value in y
+                    candidates = [g for g in plants if retired[g][rank[g][y]] > 0
+                                  and (operating(g, y) or not short_energy)
+                                  and all(keepable(g, yy) for yy in years_of[g][:rank[g][y] + 1]
+                                          if retired[g][rank[g][yy]] >= retired[g][rank[g][y]])]
+                    if not candidates:
+                        return None
+                    g = max(candidates, key=lambda g: retired[g][rank[g][y]] - relaxed[g][rank[g][y]])
+                    head = retired[g][:rank[g][y] + 1]
+                    retired[g][:rank[g][y] + 1] = np.minimum(head, head[-1] - 1)
+                    changes, changed = changes + 1, True
+                while True:
+                    lo = sum(kept(g, y) * params.min_plf[pos[g]] for g in plants if operating(g, y)) * twh_per_mw
+                    block = sum(kept(g, y) * params.min_plf[pos[g]] for g in plants) * twh_per_mw
+                    if not (lo > goal + tolerance or block > limit_twh + tolerance):
+                        break
+                    cap = sum(kept(g, y) for g in plants)
+                    hi = sum(kept(g, y) * params.max_plf[pos[g]] for g in plants if operating(g, y)) * twh_per_mw
+                    # Retire one more unit from y on, without leaving the technology short in y
+                    candidates = [g for g in plants if retired[g][rank[g][y]] < limit[g]
+                                  and (np.isnan(required) or cap - params.capacity[pos[g]] >= required - tolerance)
+                                  and (np.isnan(goal) or not operating(g, y)
+                                       or hi - params.capacity[pos[g]] * params.max_plf[pos[g]] * twh_per_mw
+                                       >= goal - tolerance)]
+                    if not candidates:
+                        return None
+                    g = max(candidates, key=lambda g: relaxed[g][rank[g][y]] - retired[g][rank[g][y]])
+                    tail = retired[g][rank[g][y]:]
+                    retired[g][rank[g][y]:] = np.maximum(tail, tail[0] + 1)
+                    changes, changed = changes + 1, True
+        if not changed:
+            return changes
+    return None
+
+def rounded_schedule(model, retired):
+    """
+    Retirement schedule of cumulative retired units, for fix_retirements.
+
+    Parameters:
+    model (ConcreteModel): Model the units were rounded on
+    retired (dict): Cumulative retired units of each plant over its decision years
+
+    Returns:
+    dict: Retirement by plant and decision year
+    """
+    return {g: dict(zip(years, np.diff(retired[g], prepend=0.0))) for g, years in _decision_years(model).items()}
+
+def run_relaxed_scenario(model_data, scenario, price_scenario, solver, build_options=None, refine=False,
+                         solver_tee=False):
+    """
+    Screen a scenario with the LP relaxation of its model and a rounded retirement schedule.
+
+    The model is solved with Retire continuous, which bounds the optimum from above. The cumulative retirements
+    are rounded (see round_retirements), repaired against the technology rows (see repair_retirements) and fixed
+    in the model, whose dispatch is solved again as an LP. The bound, the objective of the rounded schedule and
+    their gap are added to the results as DualityGap.
+
+    Parameters:
+    model_data: Initialized model data
+    scenario (str): Scenario to run
+    price_scenario (str): Price scenario to run
+    solver: Configured solver instance (any LP solver)
+    build_options (dict): Keyword options for build_model
+    refine (bool): Dispatch a representative-year schedule at annual resolution
+    solver_tee (bool): Show the solver output
+
+    Returns:
+    dict: Results for the scenario
+    """
+    start = time.perf_counter()
+    model = build_model(model_data, scenario, price_scenario, **(build_options or {}))
+    TransformationFactory('core.relax_integer_vars').apply_to(model)
+    result = solver.solve(model, tee=solver_tee)
+    if not solver_succeeded(result):
+        raise RuntimeError(f"LP relaxation of {scenario}_{price_scenario} has no solution "
+                           f"(termination={result.solver.termination_condition})")
+    upper = objective_value(model)
+    retired = round_retirements(model)
+    changes = repair_retirements(model, retired)
+    if changes is None:
+        raise RuntimeError(f"The rounded retirements of {scenario}_{price_scenario} could not be repaired to meet "
+                           f"the technology targets; solve it with the MIP solver")
+    # The rounded schedule is fixed in a fresh model, so only the dispatch is left to solve
+    schedule = rounded_schedule(model, retired)
+    model = build_model(model_data, scenario, price_scenario, **(build_options or {}))
+    fix_retirements(model, schedule)
+    result = solver.solve(model, tee=solver_tee)
+    if not solver_succeeded(result):
+        raise RuntimeError(f"The rounded schedule of {scenario}_{price_scenario} is infeasible "
+                           f"(termination={result.solver.termination_condition}); solve it with the MIP solver")
+    lower = objective_value(model)
+    summary = {"UpperBound": upper, "LowerBound": lower,
+               "Gap": (upper - lower) / max(abs(lower), Config.TOLERANCE), "RepairedUnits": changes}
+    if refine and len(model.y_rep) < len(model.y):
+        annual = refine_annual(model_data, scenario, price_scenario, model, solver, solver_tee, build_options)
+        if annual is not model:
+            model = annual
+            summary["AnnualObjective"] = objective_value(model)
+    summary["Seconds"] = time.perf_counter() - start
+    message = (f"{scenario}_{price_scenario}: LP bound {upper:,.2f}, rounded schedule {lower:,.2f} "
+               f"(gap {summary['Gap']:.2%}, {changes} unit retirements repaired) in {summary['Seconds']:.1f} s")
+    logger.info(message)
+    print(message)
+    results = process_model_results(model)
+    results["DualityGap"] = summary
+    return results
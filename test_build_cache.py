@@ -0,0 +1,52 @@
+"""
+Tests of the build cache: a cached model is reused until the data, options or the code of a builder module change.
+"""
+
+import pytest
+import build_cache
+import matrix_model
+from build_cache import BuildCache, fingerprint
+from model import _matrix_for
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Number of times the matrix model is built (rather than loaded from the cache)."""
+    calls = []
+    build = matrix_model.build_matrix_model
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(matrix_model, "build_matrix_model", counted)
+    return calls
+
+def test_cache_hit_reuses_the_model(model_data, tmp_path, builds):
+    cache = BuildCache(tmp_path / "cache")
+    matrix, key = _matrix_for(model_data, "AD_40", "AvgPPAPrice", cache=cache)
+    cached, cached_key = _matrix_for(model_data, "AD_40", "AvgPPAPrice", cache=cache)
+    assert len(builds) == 1 and cached_key == key
+    assert cached.row_keys == matrix.row_keys and (cached.data == matrix.data).all()
+
+def test_cache_misses_on_other_options(model_data, representative, tmp_path, builds):
+    cache = BuildCache(tmp_path / "cache")
+    _matrix_for(model_data, "AD_40", "AvgPPAPrice", cache=cache)
+    _matrix_for(model_data, "AD_40", "AvgPPAPrice", representative, cache=cache)
+    _matrix_for(model_data, "AD_40", "MarketPrice", cache=cache)
+    assert len(builds) == 3
+
+def test_builder_module_change_invalidates_the_cache(model_data, tmp_path, monkeypatch, builds):
+    module = tmp_path / "builder.py"
+    module.write_text("RATE = 1\n")
+    monkeypatch.setattr(build_cache, "_BUILDER_MODULES", build_cache._BUILDER_MODULES + (str(module),))
+    cache = BuildCache(tmp_path / "cache")
+    _, key = _matrix_for(model_data, "AD_40", "AvgPPAPrice", cache=cache)
+    module.write_text("RATE = 2\n")
+    assert fingerprint(model_data, "AD_40", "AvgPPAPrice", {}, "matrix") != key
+    _, new_key = _matrix_for(model_data, "AD_40", "AvgPPAPrice", cache=cache)
+    assert new_key != key and len(builds) == 2
+
+def test_data_processing_code_is_fingerprinted():
+    # The plant table and availability are not hashed, only the code that derives them
+    assert "energy_data_processor.py" in build_cache._BUILDER_MODULES
+    assert set(build_cache._DERIVED_FIELDS) <= {"plant_table", "tech_availability"}
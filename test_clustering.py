@@ -0,0 +1,43 @@
+"""
+Tests of plant clustering: at zero tolerance the clustered model has the optimum of the unit-level model, and its
+results are disaggregated to the units, whose retirements add up to the integer retirements of their cluster.
+"""
+
+import pytest
+from pyomo.environ import value
+from pyomo.opt import SolverFactory
+from energy_data_processor import cluster_plants
+from model import build_model
+from model_parameters import plant_table_of
+from result_processor import objective_value, process_model_results
+
+# Relative MIP gap of both solves (BAU is solved to optimality)
+SCENARIOS = [("BAU", "MarketPrice", 1e-6), ("AD_40", "AvgPPAPrice", 1e-4)]
+
+@pytest.fixture(scope="module")
+def clustered(model_data):
+    """Model data clustered at the default (zero) capacity and cost tolerances."""
+    return cluster_plants(model_data)
+
+def test_identical_units_are_clustered(model_data, clustered):
+    units = plant_table_of(model_data).names
+    assert len(units) == 89 and len(clustered.clusters) == 55
+    assert sorted(u for cluster in clustered.clusters.values() for u in cluster) == sorted(units)
+
+@pytest.mark.parametrize("scenario, price_scenario, mip_gap", SCENARIOS)
+def test_clustered_model_matches_the_unit_model(model_data, representative, clustered, scenario, price_scenario,
+                                                mip_gap):
+    solver = SolverFactory("appsi_highs")
+    solver.config.mip_gap = mip_gap
+    units = build_model(model_data, scenario, price_scenario, **representative)
+    solver.solve(units)
+    model = build_model(clustered, scenario, price_scenario, **representative)
+    solver.solve(model)
+    assert objective_value(model) == pytest.approx(objective_value(units), rel=mip_gap)
+
+    retire = process_model_results(model)["retire_sched"]
+    assert sorted(retire) == sorted(plant_table_of(model_data).names)
+    for (cluster, y), var in model.Retire.items():
+        retired = value(var)
+        assert retired == pytest.approx(round(retired))
+        assert sum(retire[unit][y] for unit in clustered.clusters[cluster]) == round(retired), (cluster, y)
@@ -0,0 +1,48 @@
+"""
+Tests of the per-technology decomposition: the shipped model separates by technology, a row linking technologies is
+detected, and the merged solution of the technology models matches the solve of the whole model.
+"""
+
+from argparse import Namespace
+import pytest
+from pyomo.environ import Constraint
+from decomposition import DecompositionOptions, coupling_rows, solve_by_technology
+from model import build_model, initialize_solver
+from model_parameters import plant_table_of
+from result_processor import objective_value
+
+# HiGHS through Pyomo at its default relative MIP gap (1e-4)
+SOLVER_ARGS = Namespace(solver="appsi_highs", mip_gap=1e-4, time_limit=None, solver_options=None)
+# The merged solution is within the sum of the absolute gaps of the technology models, whose objectives can have
+# mixed signs, so its relative gap can exceed the MIP gap (see solve_by_technology)
+MERGED_GAP = 1e-3
+
+def _plant_tech(model_data):
+    table = plant_table_of(model_data)
+    return dict(zip(table.names, table.technology))
+
+@pytest.mark.parametrize("scenario, price_scenario", [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice")])
+def test_shipped_model_separates_by_technology(model_data, representative, scenario, price_scenario):
+    model = build_model(model_data, scenario, price_scenario, **representative)
+    assert coupling_rows(model, _plant_tech(model_data)) == []
+
+def test_row_linking_technologies_is_coupling(model_data, representative):
+    model = build_model(model_data, "AD_40", "AvgPPAPrice", **representative)
+    plant_tech = _plant_tech(model_data)
+    first = {}
+    for g, y in model.Cap:
+        first.setdefault(plant_tech[g], (g, y))
+    (g1, y1), (g2, y2) = list(first.values())[:2]
+    model.Link = Constraint(expr=model.Cap[g1, y1] + model.Cap[g2, y2] >= 0)
+    assert coupling_rows(model, plant_tech) == ["Link"]
+    assert not solve_by_technology(model, model_data, "AD_40", "AvgPPAPrice", DecompositionOptions(SOLVER_ARGS, 1),
+                                   representative)
+
+@pytest.mark.parametrize("scenario, price_scenario", [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice")])
+def test_merged_objective_matches_the_whole_model(model_data, representative, scenario, price_scenario):
+    whole = build_model(model_data, scenario, price_scenario, **representative)
+    initialize_solver(SOLVER_ARGS).solve(whole)
+    merged = build_model(model_data, scenario, price_scenario, **representative)
+    assert solve_by_technology(merged, model_data, scenario, price_scenario, DecompositionOptions(SOLVER_ARGS, 1),
+                               representative)
+    assert objective_value(merged) == pytest.approx(objective_value(whole), rel=MERGED_GAP)
@@ -0,0 +1,29 @@
+"""
+Tests of the matrix backend: the MatrixModel has the rows, columns and objective of the Pyomo model and its
+results are processed the same way.
+"""
+
+import pytest
+from lagrangian import solve_lagrangian
+from matrix_model import (build_matrix_model, matrix_differences, load_matrix_solution, process_matrix_results,
+                          result_differences)
+from model import build_model
+from result_processor import process_model_results
+
+SCENARIOS = [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice"), ("AD_80", "MarketPrice")]
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+@pytest.mark.parametrize("annual", [True, False], ids=["annual", "representative"])
+def test_matrix_model_matches_pyomo_model(model_data, representative, scenario, price_scenario, annual):
+    options = {} if annual else representative
+    matrix = build_matrix_model(model_data, scenario, price_scenario, **options)
+    model = build_model(model_data, scenario, price_scenario, **options)
+    assert matrix_differences(matrix, model) == []
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_matrix_results_match_pyomo_results(model_data, scenario, price_scenario):
+    matrix = build_matrix_model(model_data, scenario, price_scenario)
+    model = build_model(model_data, scenario, price_scenario)
+    x = solve_lagrangian(matrix).x
+    load_matrix_solution(matrix, model, x)
+    assert result_differences(process_model_results(model), process_matrix_results(matrix, x)) == []
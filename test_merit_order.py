@@ -0,0 +1,35 @@
+"""
+Tests of the schedule evaluator: its dispatch of a retirement schedule has the results of the matrix backend for the
+same schedule, and a schedule that cannot meet the technology rows is reported infeasible.
+"""
+
+import numpy as np
+import pytest
+from lagrangian import fixed_schedule_solution, solve_lagrangian
+from matrix_model import build_matrix_model, process_matrix_results, result_differences
+from merit_order import ScheduleEvaluator
+
+SCENARIOS = [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice")]
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_evaluation_matches_the_matrix_results(model_data, representative, scenario, price_scenario):
+    matrix = build_matrix_model(model_data, scenario, price_scenario, **representative)
+    schedule = process_matrix_results(matrix, solve_lagrangian(matrix).x)["retire_sched"]
+    x = fixed_schedule_solution(matrix, schedule)
+    expected = process_matrix_results(matrix, x)
+
+    evaluator = ScheduleEvaluator.from_matrix(matrix)
+    evaluation = evaluator.evaluate(evaluator.schedule_matrix(schedule))
+    assert evaluation.feasible and evaluation.shortfall == 0
+    assert evaluation.objective == pytest.approx(float(matrix.objective @ x + matrix.objective_constant))
+    assert result_differences(expected["AnnualSummary"], evaluation.annual_summary()) == []
+    assert result_differences(expected["TechNetRev"], evaluation.tech_net_revenue()) == []
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_infeasible_schedule_has_a_shortfall(model_data, representative, scenario, price_scenario):
+    evaluator = ScheduleEvaluator(model_data, scenario, price_scenario, **representative)
+    retire = np.zeros((len(evaluator.plants), len(evaluator.years)))
+    retire[:, 0] = 1  # every plant retires in the first year
+    evaluation = evaluator.evaluate(retire)
+    assert not evaluation.feasible
+    assert evaluation.objective is None and evaluation.shortfall > 0
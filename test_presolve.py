@@ -0,0 +1,55 @@
+"""
+Tests of the presolve: on representative-year models of the example data each step only tightens the LP relaxation
+bound and keeps the MIP optimum, and the retirements fixed by the dominance step agree with the solution of the model
+without presolve.
+"""
+
+import pytest
+from pyomo.opt import SolverFactory
+from config import Config
+from model import build_model
+from presolve import PRESOLVE_STEPS, run_presolve
+from result_processor import objective_value
+
+SCENARIOS = [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice")]
+# HiGHS default relative MIP gap, of both the reference and the presolved solves
+MIP_GAP = 1e-4
+# Each step on its own, then all of them
+STEPS = [[step] for step in PRESOLVE_STEPS] + [list(PRESOLVE_STEPS)]
+
+@pytest.fixture(scope="module")
+def solver():
+    """HiGHS through Pyomo."""
+    return SolverFactory("appsi_highs")
+
+@pytest.fixture(scope="module")
+def reference(model_data, representative, solver):
+    """Representative-year model of a scenario solved without presolve, solved once per module."""
+    solved = {}
+
+    def solve(scenario, price_scenario):
+        if (scenario, price_scenario) not in solved:
+            model = build_model(model_data, scenario, price_scenario, **representative)
+            solver.solve(model)
+            solved[scenario, price_scenario] = model
+        return solved[scenario, price_scenario]
+
+    return solve
+
+@pytest.mark.parametrize("steps", STEPS, ids=lambda steps: "+".join(steps))
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_presolve_tightens_the_bound_and_keeps_the_optimum(reference, model_data, representative, solver, scenario,
+                                                           price_scenario, steps):
+    expected = reference(scenario, price_scenario)
+    model = build_model(model_data, scenario, price_scenario, **representative)
+    report = run_presolve(model, steps, solver, report=True)
+    # The objective is maximised: a tighter relaxation has a lower bound, which still bounds the optimum
+    tolerance = Config.TOLERANCE * abs(report.bound_before)
+    assert report.bound_after <= report.bound_before + tolerance
+    assert report.bound_after >= objective_value(expected) - tolerance
+    solver.solve(model)
+    assert objective_value(model) == pytest.approx(objective_value(expected), rel=MIP_GAP)
+    fixed = [key for key, var in model.Retire.items() if var.fixed]
+    assert bool(fixed) == ("dominance" in steps)  # the dominance step fixes retirements in both scenarios
+    for key in fixed:
+        assert model.Retire[key].value == pytest.approx(expected.Retire[key].value), key
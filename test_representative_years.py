@@ -0,0 +1,60 @@
+"""
+Tests of the representative-year targets: the target of a decision year is the mean of the annual targets of the
+years it stands for (that have one), so the expanded annual series meet the annual TechGenGoal totals of every
+block.
+"""
+
+import pytest
+from config import Config
+from lagrangian import solve_lagrangian
+from matrix_model import build_matrix_model, process_matrix_results
+from model_parameters import tech_availability_of
+
+SCENARIOS = [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice"), ("AD_80", "MarketPrice")]
+
+def _blocks(matrix):
+    """Model years of each decision year."""
+    blocks = {}
+    for y, rep in matrix.year_map.items():
+        blocks.setdefault(rep, []).append(y)
+    return blocks
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_block_targets_sum_to_annual_targets(model_data, representative, scenario, price_scenario):
+    matrix = build_matrix_model(model_data, scenario, price_scenario, **representative)
+    capped = {(d["Year"], d["Technology"]) for d in matrix.gen_goal_capped}
+    blocks = _blocks(matrix)
+    checked = 0
+    for (name, index), lower, upper in zip(matrix.row_keys, matrix.row_lower, matrix.row_upper):
+        if name != "TechGenGoal" or index in capped:
+            continue
+        rep, tech = index
+        # Years without a target have no TechGenGoal row in the annual model either
+        targets = [v for v in (matrix.targets.get((y, tech), 0.0) for y in blocks[rep]) if v > 0]
+        assert lower == upper
+        assert lower * len(targets) == pytest.approx(sum(targets), rel=1e-9)
+        checked += len(targets) > 1
+    assert checked  # some blocks stand for several years
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_expanded_generation_meets_annual_targets(model_data, representative, scenario, price_scenario):
+    # Blocks whose fleet changes inside them (plants commissioning or expiring) or whose targets exceed what the
+    # fleet can generate are not comparable with the annual model
+    matrix = build_matrix_model(model_data, scenario, price_scenario, **representative)
+    results = process_matrix_results(matrix, solve_lagrangian(matrix).x)
+    availability = tech_availability_of(model_data)
+    max_plf = {tech: model_data.tech_params.at[tech, "MaxPLF"] for tech in matrix.technologies}
+    checked = 0
+    for rep, years in _blocks(matrix).items():
+        for tech in matrix.technologies:
+            targets = [matrix.targets.get((y, tech), 0.0) for y in years]
+            fleet = {availability.available_mw(tech, y) for y in years}
+            if len(years) == 1 or len(fleet) > 1 or not all(targets):
+                continue
+            max_twh = fleet.pop() * max_plf[tech] * Config.HOURS_PER_YEAR / Config.USD_TO_MILLIONS
+            if max(targets) > max_twh:
+                continue
+            generated = sum(results["TechGen"][tech][y] for y in years) / Config.USD_TO_THOUSANDS  # GWh to TWh
+            assert generated == pytest.approx(sum(targets), rel=1e-6)
+            checked += 1
+    assert checked
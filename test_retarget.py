@@ -0,0 +1,23 @@
+"""
+Tests of re-targeting: a model built with retargetable=True and switched to another scenario and price scenario has
+the LP relaxation of a model built for them.
+"""
+
+import pytest
+from pyomo.opt import SolverFactory
+from model import build_model, retarget_model
+from presolve import relaxation_bound
+
+# Targets switched to in turn, from the AD_20/AvgPPAPrice build: the price regime changes, and switching between BAU
+# and an AD scenario toggles the capacity cost of the objective (BAU values it on nameplate capacity)
+TARGETS = [("AD_20", "AvgPPAPrice"), ("AD_40", "MarketPrice"), ("BAU", "MarketPrice"), ("BAU", "AvgPPAPrice"),
+           ("AD_80", "MarketPrice")]
+
+def test_retargeted_model_matches_a_fresh_build(model_data, representative):
+    solver = SolverFactory("appsi_highs")
+    model = build_model(model_data, "AD_20", "AvgPPAPrice", retargetable=True, **representative)
+    for scenario, price_scenario in TARGETS:
+        retarget_model(model, model_data, scenario, price_scenario)
+        fresh = build_model(model_data, scenario, price_scenario, **representative)
+        assert relaxation_bound(model, solver) == pytest.approx(relaxation_bound(fresh, solver), rel=1e-9), \
+            (scenario, price_scenario)
@@ -0,0 +1,54 @@
+"""
+Tests of model scaling: a model solved in scaled units and unscaled has the optimum of the unscaled model in model
+units, and its rows, objective and bounds are restored exactly.
+"""
+
+import pytest
+from pyomo.environ import Constraint, Objective, Var, value
+from pyomo.opt import SolverFactory
+from config import Config
+from model import build_model
+from result_processor import objective_value
+from scaling import UnitSystem, scale_model, unscale_model
+
+UNITS = UnitSystem("TWh", "mUSD", "GW")
+# BAU/MarketPrice solved to optimality has a unique retirement schedule (the dispatch is degenerate)
+MIP_GAP = 1e-6
+
+def _model_state(model):
+    """Rows, objectives and variable bounds of a model as text, to compare them exactly."""
+    return ({con.name: (str(con.expr), con.lower is None or value(con.lower), con.upper is None or value(con.upper))
+             for con in model.component_data_objects(Constraint)},
+            {obj.name: str(obj.expr) for obj in model.component_data_objects(Objective)},
+            {var.name: (var.lb, var.ub) for var in model.component_data_objects(Var)})
+
+def _max_violation(model):
+    """Largest relative violation of the active rows of a model at its variable values."""
+    worst = 0.0
+    for con in model.component_data_objects(Constraint, active=True):
+        body = value(con.body)
+        below = value(con.lower) - body if con.lower is not None else 0.0
+        above = body - value(con.upper) if con.upper is not None else 0.0
+        worst = max(worst, below / max(1.0, abs(body)), above / max(1.0, abs(body)))
+    return worst
+
+def test_unscaled_solution_and_rows_match_the_unscaled_model(model_data, representative):
+    solver = SolverFactory("appsi_highs")
+    solver.config.mip_gap = MIP_GAP
+    expected = build_model(model_data, "BAU", "MarketPrice", **representative)
+    solver.solve(expected)
+
+    model = build_model(model_data, "BAU", "MarketPrice", **representative)
+    state = _model_state(model)
+    scale_model(model, UNITS)
+    assert _model_state(model) != state
+    solver.solve(model)
+    unscale_model(model)
+    assert _model_state(model) == state
+
+    assert objective_value(model) == pytest.approx(objective_value(expected), rel=MIP_GAP)
+    for name in ("Retire", "Cap"):
+        for key, var in getattr(model, name).items():
+            assert var.value == pytest.approx(getattr(expected, name)[key].value, abs=Config.TOLERANCE), (name, key)
+    # The dispatch is not unique: its unscaled values must meet every row of the model in model units
+    assert _max_violation(model) <= Config.TOLERANCE
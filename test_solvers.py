@@ -0,0 +1,114 @@
+"""
+Tests of the solvers that avoid the full retirement MIP: their bounds hold against the HiGHS MIP solution and their
+schedules are feasible in the model, on representative-year models of the example data.
+"""
+
+import numpy as np
+import pytest
+from pyomo.opt import SolverFactory
+from annealing import solve_annealing
+from benders import solve_benders
+from config import Config
+from fast_path import solve_fast_path
+from lagrangian import fixed_schedule_solution, max_violation, solve_lagrangian
+from matrix_model import build_matrix_model, solve_matrix_model
+from merit_order import ScheduleEvaluator
+from model import run_fast_path_scenario, run_lagrangian_scenario
+from rolling_horizon import RollingHorizonOptions, run_rolling_horizon
+from screening import run_relaxed_scenario
+
+SCENARIOS = [("BAU", "MarketPrice"), ("AD_40", "AvgPPAPrice")]
+# Relative gap of the reference MIP solves (BAU is solved to optimality for the fast path)
+MIP_GAPS = {"BAU": 1e-6, "AD_40": 1e-4}
+
+@pytest.fixture(scope="module")
+def reference(model_data, representative):
+    """Representative-year MatrixModel of a scenario and its HiGHS MIP solution, solved once per module."""
+    solved = {}
+
+    def solve(scenario, price_scenario):
+        if (scenario, price_scenario) not in solved:
+            matrix = build_matrix_model(model_data, scenario, price_scenario, **representative)
+            solution = solve_matrix_model(matrix, MIP_GAPS[scenario])
+            assert solution.ok
+            solved[scenario, price_scenario] = matrix, solution
+        return solved[scenario, price_scenario]
+
+    return solve
+
+@pytest.fixture(scope="module")
+def solver():
+    """HiGHS through Pyomo, for the modes that solve the Pyomo model."""
+    return SolverFactory("appsi_highs")
+
+def assert_feasible(matrix, x):
+    """x meets every row and column bound and retires whole plants."""
+    assert x is not None
+    assert max_violation(matrix, x) <= Config.LAGRANGIAN_FEASIBILITY_TOL
+    retire = x[matrix.retire_col[matrix.retire_col >= 0]]
+    assert np.allclose(retire, np.round(retire))
+
+def schedule_objective(matrix, results):
+    """Objective of the best dispatch of the retirement schedule of results, which must be feasible in matrix."""
+    x = fixed_schedule_solution(matrix, results["retire_sched"])
+    assert_feasible(matrix, x)
+    return float(matrix.objective @ x + matrix.objective_constant)
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_lagrangian_bound_and_repaired_schedule(reference, scenario, price_scenario):
+    matrix, solution = reference(scenario, price_scenario)
+    result = solve_lagrangian(matrix)
+    assert result.upper_bound >= solution.objective - Config.TOLERANCE * abs(solution.objective)
+    assert_feasible(matrix, result.x)
+    assert result.lower_bound == pytest.approx(float(matrix.objective @ result.x + matrix.objective_constant))
+    assert result.lower_bound <= result.upper_bound
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_benders_bound_and_schedule(reference, scenario, price_scenario):
+    matrix, solution = reference(scenario, price_scenario)
+    result = solve_benders(matrix, 1e-4, initial=solve_lagrangian(matrix).x)
+    assert result.upper_bound >= solution.objective - Config.TOLERANCE * abs(solution.objective)
+    assert_feasible(matrix, result.x)
+    assert result.lower_bound <= result.upper_bound
+
+def test_refined_lagrangian_schedule_is_feasible_at_annual_resolution(model_data, representative):
+    results = run_lagrangian_scenario(model_data, "AD_40", "AvgPPAPrice", representative, refine=True)
+    annual = build_matrix_model(model_data, "AD_40", "AvgPPAPrice")
+    assert results["DualityGap"]["AnnualObjective"] == pytest.approx(schedule_objective(annual, results))
+
+def test_rolling_horizon_schedule_is_feasible(model_data, solver):
+    results = run_rolling_horizon(model_data, "AD_40", "AvgPPAPrice", solver, RollingHorizonOptions(10, 5))
+    annual = build_matrix_model(model_data, "AD_40", "AvgPPAPrice")
+    assert results["RollingHorizon"]["StitchedObjective"] == pytest.approx(schedule_objective(annual, results),
+                                                                           rel=1e-6)
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_relaxation_bound_and_rounded_schedule(reference, model_data, representative, solver, scenario,
+                                               price_scenario):
+    matrix, solution = reference(scenario, price_scenario)
+    results = run_relaxed_scenario(model_data, scenario, price_scenario, solver, representative)
+    summary = results["DualityGap"]
+    assert summary["UpperBound"] >= solution.objective - Config.TOLERANCE * abs(solution.objective)
+    assert summary["LowerBound"] == pytest.approx(schedule_objective(matrix, results), rel=1e-6)
+
+@pytest.mark.parametrize("scenario, price_scenario", SCENARIOS)
+def test_annealed_schedule_is_feasible(reference, scenario, price_scenario):
+    matrix, solution = reference(scenario, price_scenario)
+    result = solve_annealing(ScheduleEvaluator.from_matrix(matrix), solve_lagrangian(matrix).x, chains=2, workers=1,
+                             iterations=500)
+    assert_feasible(matrix, result.x)
+    assert result.objective == pytest.approx(float(matrix.objective @ result.x + matrix.objective_constant))
+    assert result.objective <= solution.bound + Config.TOLERANCE * abs(solution.bound)
+
+def test_fast_path_does_not_accept_a_schedule_worse_than_the_optimum(reference, model_data, representative):
+    # In BAU/MarketPrice keeping every plant is feasible but retiring some plants is better
+    matrix, solution = reference("BAU", "MarketPrice")
+    kept = solve_fast_path(matrix, lagrangian=False)
+    assert not kept.exact and kept.objective < solution.objective
+    assert run_fast_path_scenario(model_data, "BAU", "MarketPrice", representative) is None
+
+    result = solve_fast_path(matrix)
+    assert_feasible(matrix, result.x)
+    assert not result.kept_all and result.objective >= solution.objective - Config.TOLERANCE * abs(solution.objective)
+    results = run_fast_path_scenario(model_data, "BAU", "MarketPrice", representative, gap=1e-3)
+    assert results["FastPath"]["Objective"] == pytest.approx(result.objective)